@@ -0,0 +1,84 @@
+"""
+Run the pipeline benchmarks and store them as a JSON baseline, or compare two runs:
+
+    python -m benchmarks run --output baseline.json
+    python -m benchmarks run --profile deep --output current.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.2
+
+compare exits with status 1 when a benchmark regressed.
+"""
+
+import argparse
+import sys
+
+from benchmarks.pipeline import (
+    PROFILES,
+    compare_results,
+    load_results,
+    run_benchmarks,
+    store_results,
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument(
+        "--profile",
+        action="append",
+        choices=sorted(PROFILES),
+        help="Profiles to run (default: all).",
+    )
+    run_parser.add_argument("--width", type=int, help="Run a custom graph instead.")
+    run_parser.add_argument("--depth", type=int, default=2)
+    run_parser.add_argument("--payload-size", type=int, default=20)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--output", help="Where to store the JSON results.")
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Flag regressions against a baseline."
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        if args.width is not None:
+            profiles = {
+                "custom": {
+                    "width": args.width,
+                    "depth": args.depth,
+                    "payload_size": args.payload_size,
+                }
+            }
+        else:
+            profiles = {name: PROFILES[name] for name in args.profile or PROFILES}
+        results = run_benchmarks(profiles, repeat=args.repeat)
+        for name, result in results["results"].items():
+            print(
+                f"{name:40} {result['median_seconds'] * 1000:10.3f} ms "
+                f"(min {result['min_seconds'] * 1000:.3f} ms)"
+            )
+        if args.output:
+            store_results(results, args.output)
+        return 0
+
+    comparisons = compare_results(
+        load_results(args.baseline), load_results(args.current), args.threshold
+    )
+    for comparison in comparisons:
+        print(
+            f"{comparison['name']:40} "
+            f"{comparison['baseline_seconds'] * 1000:10.3f} ms -> "
+            f"{comparison['current_seconds'] * 1000:10.3f} ms "
+            f"({comparison['ratio']:.2f}x)"
+            f"{'  REGRESSED' if comparison['regressed'] else ''}"
+        )
+    return 1 if any(comparison["regressed"] for comparison in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
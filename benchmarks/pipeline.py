@@ -0,0 +1,230 @@
+"""
+Benchmarks of the library's own overhead on a synthetic dependency graph: every
+node has `width` methods returning a child node, down to `depth` levels, and the
+leaves return a payload dict with `payload_size` fields.
+"""
+
+import json
+import statistics
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable
+
+from mock_isolator.mock_recording_encoder import (
+    DictMockRecordingEncoder,
+    JsonMockRecordingInteractionSerializer,
+)
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+
+PROFILES: dict[str, dict[str, int]] = {
+    "wide": {"width": 8, "depth": 2, "payload_size": 20},
+    "deep": {"width": 1, "depth": 60, "payload_size": 5},
+    "large_payload": {"width": 2, "depth": 2, "payload_size": 2000},
+}
+
+
+class SyntheticDependency:
+    def __init__(self, width: int, depth: int, payload_size: int):
+        self.width = width
+        self.depth = depth
+        self.payload_size = payload_size
+        self.name = f"dependency-{depth}"
+
+    def fetch(self, index: int) -> Any:
+        if self.depth <= 1:
+            return make_payload(self.payload_size, seed=index)
+        return SyntheticDependency(self.width, self.depth - 1, self.payload_size)
+
+
+def make_payload(payload_size: int, seed: int = 0) -> dict[str, Any]:
+    payload: dict[str, Any] = {}
+    for i in range(payload_size):
+        kind = i % 5
+        if kind == 0:
+            payload[f"field_{i}"] = f"value-{seed}-{i}"
+        elif kind == 1:
+            payload[f"field_{i}"] = seed * i
+        elif kind == 2:
+            payload[f"field_{i}"] = seed + i / 7
+        elif kind == 3:
+            payload[f"field_{i}"] = Decimal(f"{seed}.{i}")
+        else:
+            payload[f"field_{i}"] = [datetime(2024, 1, 1, i % 24), None, True]
+    return payload
+
+
+def traverse(dependency: Any, width: int, depth: int) -> int:
+    """Exercise the whole graph the same way in every mode, returning a checksum."""
+    total = len(dependency.name)
+    children = [dependency.fetch(i) for i in range(width)]
+    for child in children:
+        if depth <= 1:
+            total += len(child)
+        else:
+            total += traverse(child, width, depth - 1)
+    return total
+
+
+class BenchmarkStage:
+    """
+    A benchmarked step of the pipeline. setup builds a fresh input outside of the
+    timed region, since replaying consumes the recording.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        setup: Callable[[], Any],
+        run: Callable[[Any], Any],
+        operations: int = 1,
+    ):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.operations = operations
+
+
+def build_stages(width: int, depth: int, payload_size: int) -> list[BenchmarkStage]:
+    encoder = DictMockRecordingEncoder()
+    serializer = JsonMockRecordingInteractionSerializer()
+
+    def record() -> RecordingMock:
+        mock = RecordingMock(
+            SyntheticDependency(width, depth, payload_size), BasicRecordingMocker()
+        )
+        traverse(mock, width, depth)
+        return mock
+
+    recorded = record()
+    encoded = encoder.encode_recording_mock_interactions(recorded)
+    serialized = serializer.serialize_encoded_mock_interactions(encoded)
+    payload = make_payload(payload_size)
+    access_count = 10_000
+
+    def access_attributes(mock: RecordingMock) -> None:
+        for _ in range(access_count):
+            mock.name  # noqa: B018
+
+    def call(mock: RecordingMock) -> None:
+        for i in range(access_count):
+            mock(i)
+
+    return [
+        BenchmarkStage(
+            "recording_mock_access",
+            setup=lambda: RecordingMock(
+                SyntheticDependency(width, depth, payload_size), BasicRecordingMocker()
+            ),
+            run=access_attributes,
+            operations=access_count,
+        ),
+        BenchmarkStage(
+            "recording_mock_call",
+            setup=lambda: RecordingMock(str, BasicRecordingMocker()),
+            run=call,
+            operations=access_count,
+        ),
+        BenchmarkStage(
+            "mocker_wrap",
+            setup=BasicRecordingMocker,
+            run=lambda mocker: mocker.wrap_item_with_recording_mocks(payload),
+        ),
+        BenchmarkStage("record", setup=lambda: None, run=lambda _: record()),
+        BenchmarkStage(
+            "encode",
+            setup=lambda: recorded,
+            run=encoder.encode_recording_mock_interactions,
+        ),
+        BenchmarkStage(
+            "serialize",
+            setup=lambda: encoded,
+            run=serializer.serialize_encoded_mock_interactions,
+        ),
+        BenchmarkStage(
+            "deserialize",
+            setup=lambda: serialized,
+            run=serializer.deserialize_encoded_mock_interactions,
+        ),
+        BenchmarkStage(
+            "decode",
+            setup=lambda: serializer.deserialize_encoded_mock_interactions(serialized),
+            run=encoder.decode_recording_mock_interactions,
+        ),
+        BenchmarkStage(
+            "decode_trusted",
+            setup=lambda: serializer.deserialize_encoded_mock_interactions(serialized),
+            run=lambda encoded: encoder.decode_recording_mock_interactions(
+                encoded, trusted=True
+            ),
+        ),
+        BenchmarkStage(
+            "replay",
+            setup=lambda: encoder.decode_recording_mock_interactions(
+                serializer.deserialize_encoded_mock_interactions(serialized)
+            ),
+            run=lambda mock: traverse(mock, width, depth),
+        ),
+    ]
+
+
+def run_stage(stage: BenchmarkStage, repeat: int) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        argument = stage.setup()
+        started_at = time.perf_counter()
+        stage.run(argument)
+        timings.append(time.perf_counter() - started_at)
+    return {
+        "min_seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "operations": stage.operations,
+    }
+
+
+def run_benchmarks(
+    profiles: dict[str, dict[str, int]], repeat: int = 5
+) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for profile_name, config in profiles.items():
+        for stage in build_stages(**config):
+            results[f"{profile_name}.{stage.name}"] = run_stage(stage, repeat)
+    return {"profiles": profiles, "repeat": repeat, "results": results}
+
+
+def compare_results(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """
+    Compare the fastest timings of the benchmarks present in both results, which are
+    the least sensitive to noise. A benchmark regressed when it is slower than the
+    baseline by more than threshold (ie. 0.2 for 20%).
+    """
+    comparisons = []
+    for name, baseline_result in baseline["results"].items():
+        current_result = current["results"].get(name)
+        if current_result is None:
+            continue
+        ratio = current_result["min_seconds"] / max(
+            baseline_result["min_seconds"], 1e-12
+        )
+        comparisons.append(
+            {
+                "name": name,
+                "baseline_seconds": baseline_result["min_seconds"],
+                "current_seconds": current_result["min_seconds"],
+                "ratio": ratio,
+                "regressed": ratio > 1 + threshold,
+            }
+        )
+    return comparisons
+
+
+def load_results(filepath: str) -> dict[str, Any]:
+    with open(filepath, "r") as file:
+        return json.load(file)
+
+
+def store_results(results: dict[str, Any], filepath: str) -> None:
+    with open(filepath, "w") as file:
+        json.dump(results, file, indent=2)
@@ -0,0 +1,24 @@
+"""Run with `pytest benchmarks` when pytest-benchmark is installed."""
+
+import pytest
+
+from benchmarks.pipeline import PROFILES, build_stages
+
+pytest.importorskip("pytest_benchmark")
+
+STAGES = [
+    (profile_name, stage)
+    for profile_name, config in PROFILES.items()
+    for stage in build_stages(**config)
+]
+
+
+@pytest.mark.parametrize(
+    "stage",
+    [stage for _, stage in STAGES],
+    ids=[f"{profile_name}.{stage.name}" for profile_name, stage in STAGES],
+)
+def test_pipeline_stage(benchmark, stage) -> None:
+    benchmark.pedantic(
+        stage.run, setup=lambda: ((stage.setup(),), {}), rounds=5, iterations=1
+    )
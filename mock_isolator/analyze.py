@@ -0,0 +1,485 @@
+"""
+Report what recordings are made of:
+
+    python -m mock_isolator.analyze tests/recordings/ tests/test_foo_files/test_bar_
+
+Each argument is a directory (searched recursively for .json recordings) or a
+recording_filepath_prefix. The report lists the bytes per patch path, per attribute
+of the patched object and per nested mock path (ie. "get().json"), the largest
+subtrees, how many attributes were compacted with __repeat__, and the savings to
+expect from deduplicating identical subtrees or from another format.
+
+Recordings are read as a stream of JSON events rather than loaded, and only the
+largest entries of each section and a capped set of subtree digests are kept, so the
+memory use is bounded by the largest scalar of a recording. The sizes of the segment,
+blob and .npy files next to a recording are counted as part of it.
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import re
+import sys
+import zlib
+from typing import IO, Any, Iterator
+
+from mock_isolator.recording_checksum import CHECKSUM_KEY
+from mock_isolator.recording_files import GZIP_MAGIC, is_compressed_recording
+from mock_isolator.recording_stats import RECORDING_STATS_FILENAME
+
+# Subtrees smaller than this are not worth replacing with a reference.
+MIN_DEDUPLICATED_SUBTREE_BYTES = 64
+# The approximate size of a reference replacing a duplicated subtree.
+REFERENCE_BYTES = 32
+MAX_TRACKED_SUBTREES = 250_000
+# Beyond this, the nested mock paths of a recording are accounted together.
+MAX_TRACKED_MOCK_PATHS = 10_000
+SIDECAR_EXTENSIONS = ["segment", "blob", "npy"]
+READ_CHUNK_SIZE = 1 << 16
+
+_SEPARATORS = re.compile(r"[\s,:]*")
+_DELIMITERS = " \t\n\r,:]}"
+_SCALAR_DECODER = json.JSONDecoder()
+
+
+def iter_recording_filepaths(paths: list[str]) -> Iterator[tuple[str, str]]:
+    """Yield the patch path (or dependency name) and filepath of each recording."""
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, filenames in sorted(os.walk(path)):
+                for filename in sorted(filenames):
+                    # The stats are written to {prefix}__recording_stats__.json.
+                    if filename.endswith(".json") and not filename.endswith(
+                        RECORDING_STATS_FILENAME
+                    ):
+                        filepath = os.path.join(directory, filename)
+                        yield os.path.relpath(filepath, path)[: -len(".json")], filepath
+        else:
+            for filepath in sorted(glob.glob(f"{glob.escape(path)}*.json")):
+                if not filepath.endswith(RECORDING_STATS_FILENAME):
+                    yield filepath[len(path) : -len(".json")], filepath
+
+
+class RecordingAnalysis:
+    def __init__(self, top: int = 20):
+        self._top = top
+        self.files = 0
+        self.file_bytes = 0
+        self.sidecar_bytes = 0
+        self.compact_bytes = 0
+        self.gzip_bytes = 0
+        self.repeated_attributes = 0
+        self.listed_attributes = 0
+        self.listed_accesses = 0
+        self.deduplication_savings = 0
+        # Min-heaps of the largest (bytes, path) entries.
+        self._largest_patch_paths: list[tuple[int, str]] = []
+        self._largest_attributes: list[tuple[int, str]] = []
+        self._largest_mock_paths: list[tuple[int, str]] = []
+        self._largest_subtrees: list[tuple[int, str, str]] = []
+        # About 60 bytes per digest, ie. 15MB when full.
+        self._subtree_digests: set[bytes] = set()
+        # The bytes per nested mock path of the recording being analyzed.
+        self._mock_path_bytes: dict[str, int] = {}
+
+    def add_recording(self, patch_path: str, filepath: str) -> None:
+        json_bytes = os.path.getsize(filepath)
+        sidecar_bytes = sum(
+            os.path.getsize(sidecar_filepath)
+            for extension in SIDECAR_EXTENSIONS
+            for sidecar_filepath in glob.glob(f"{glob.escape(filepath)}.*.{extension}")
+        )
+        self.files += 1
+        self.file_bytes += json_bytes
+        self.sidecar_bytes += sidecar_bytes
+        self._track_largest(
+            self._largest_patch_paths, (json_bytes + sidecar_bytes, patch_path)
+        )
+        with _open_recording_file(filepath) as file:
+            self._analyze_events(patch_path, _iter_json_events(file))
+        for mock_path, size in self._mock_path_bytes.items():
+            self._track_largest(self._largest_mock_paths, (size, mock_path))
+        self._mock_path_bytes.clear()
+
+    def _analyze_events(
+        self, patch_path: str, events: Iterator[tuple[str, Any]]
+    ) -> None:
+        """
+        Compute the compact JSON size and a digest of every subtree from those of its
+        children as the events of the recording are read, keeping only the frames of
+        the containers being read. The compact JSON is compressed as it is produced.
+        """
+        compact = _CompressedSize()
+        stack: list[_Frame] = []
+        skipping_checksum = False
+        for event, value in events:
+            if event == "key":
+                stack[-1].read_key(value)
+                # The checksum is not part of the serialization it is computed on.
+                skipping_checksum = len(stack) == 1 and value == CHECKSUM_KEY
+                continue
+            if skipping_checksum:
+                skipping_checksum = False
+                continue
+            if event == "end":
+                frame = stack.pop()
+                compact.write(b"}" if frame.is_dict else b"]")
+                subtree = self._close(patch_path, frame)
+                if stack:
+                    self._add_child(patch_path, stack[-1], subtree, frame)
+                else:
+                    self.deduplication_savings += subtree.savings
+                continue
+            parent = stack[-1] if stack else None
+            if parent is not None:
+                compact.write(b"," if parent.children else b"")
+                if parent.is_dict:
+                    compact.write(json.dumps(parent.key).encode() + b":")
+            if event == "start":
+                compact.write(value.encode())
+                stack.append(
+                    _Frame(value == "{", "$", patch_path)
+                    if parent is None
+                    else _Frame.child_of(parent, value == "{")
+                )
+            else:
+                encoded = json.dumps(value).encode()
+                compact.write(encoded)
+                if parent is not None:
+                    self._add_scalar(patch_path, parent, value, encoded)
+        self.compact_bytes += compact.size
+        self.gzip_bytes += compact.finish()
+
+    def _add_scalar(
+        self, patch_path: str, parent: "_Frame", value: Any, encoded: bytes
+    ) -> None:
+        if parent.is_dict and parent.key == "length" and type(value) is int:
+            parent.length = value
+        if parent.is_dict and parent.key == "__type__":
+            parent.is_mock = value == "RecordingMock"
+        subtree = _Subtree(
+            len(encoded), hashlib.blake2b(encoded, digest_size=8).digest()
+        )
+        self._add_child(patch_path, parent, subtree, None)
+
+    def _add_child(
+        self,
+        patch_path: str,
+        parent: "_Frame",
+        subtree: "_Subtree",
+        frame: "_Frame | None",
+    ) -> None:
+        if parent.children:
+            parent.size += 1
+        if parent.is_dict:
+            encoded_key = json.dumps(parent.key).encode()
+            parent.size += len(encoded_key) + 1
+            parent.hasher.update(encoded_key)
+        parent.hasher.update(subtree.digest)
+        parent.size += subtree.size
+        parent.savings += subtree.savings
+        parent.mock_bytes += subtree.mock_bytes
+        parent.children += 1
+        if parent.json_path == "$.recorded_attribute_accesses":
+            self._track_largest(
+                self._largest_attributes, (subtree.size, f"{patch_path}.{parent.key}")
+            )
+        if parent.is_attributes and frame is not None:
+            if frame.is_repeat:
+                self.repeated_attributes += 1
+            else:
+                # A dict is stored in stream segments next to the recording.
+                self.listed_attributes += 1
+                self.listed_accesses += (
+                    frame.length if frame.is_dict else frame.children
+                )
+
+    def _close(self, patch_path: str, frame: "_Frame") -> "_Subtree":
+        digest = frame.hasher.digest()
+        size = frame.size
+        savings = frame.savings
+        mock_bytes = frame.mock_bytes
+        if size >= MIN_DEDUPLICATED_SUBTREE_BYTES:
+            if digest in self._subtree_digests:
+                # The savings within a duplicated subtree are part of its own.
+                savings = size - REFERENCE_BYTES
+            elif len(self._subtree_digests) < MAX_TRACKED_SUBTREES:
+                self._subtree_digests.add(digest)
+        if frame.is_mock:
+            # The nested mocks are accounted to their own mock paths.
+            mock_path = frame.mock_path
+            if (
+                mock_path not in self._mock_path_bytes
+                and len(self._mock_path_bytes) >= MAX_TRACKED_MOCK_PATHS
+            ):
+                mock_path = f"{patch_path} (other mock paths)"
+            self._mock_path_bytes[mock_path] = (
+                self._mock_path_bytes.get(mock_path, 0) + size - mock_bytes
+            )
+            mock_bytes = size
+        if frame.json_path == "$.recorded_calls":
+            self._track_largest(self._largest_attributes, (size, f"{patch_path}()"))
+        self._track_largest(self._largest_subtrees, (size, patch_path, frame.json_path))
+        return _Subtree(size, digest, savings, mock_bytes)
+
+    def _track_largest(self, heap: list[Any], entry: tuple[Any, ...]) -> None:
+        if len(heap) < self._top:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def to_dict(self) -> dict[str, Any]:
+        def top(heap: list[tuple[int, str]]) -> dict[str, int]:
+            return {path: size for size, path in sorted(heap, reverse=True)}
+
+        total_attributes = self.repeated_attributes + self.listed_attributes
+        return {
+            "files": self.files,
+            "file_bytes": self.file_bytes + self.sidecar_bytes,
+            "sidecar_bytes": self.sidecar_bytes,
+            "bytes_per_patch_path": top(self._largest_patch_paths),
+            "bytes_per_attribute": top(self._largest_attributes),
+            "bytes_per_mock_path": top(self._largest_mock_paths),
+            "largest_subtrees": [
+                {"patch_path": patch_path, "json_path": json_path, "bytes": size}
+                for size, patch_path, json_path in sorted(
+                    self._largest_subtrees, reverse=True
+                )
+            ],
+            "repeat_compaction": {
+                "repeated_attributes": self.repeated_attributes,
+                "listed_attributes": self.listed_attributes,
+                "listed_accesses": self.listed_accesses,
+                "repeated_ratio": (
+                    self.repeated_attributes / total_attributes
+                    if total_attributes
+                    else None
+                ),
+            },
+            # The sidecar files are left as they are by both.
+            "estimated_savings": {
+                "deduplicated_subtrees_bytes": self.deduplication_savings,
+                "compact_json_bytes": self.file_bytes - self.compact_bytes,
+                "gzip_compact_json_bytes": self.file_bytes - self.gzip_bytes,
+            },
+        }
+
+
+class _CompressedSize:
+    """The size of bytes written in pieces, and of their compression."""
+
+    def __init__(self):
+        self.size = 0
+        self._compressor = zlib.compressobj(6)
+        self._compressed_size = 0
+
+    def write(self, piece: bytes) -> None:
+        self.size += len(piece)
+        self._compressed_size += len(self._compressor.compress(piece))
+
+    def finish(self) -> int:
+        return self._compressed_size + len(self._compressor.flush())
+
+
+class _Subtree:
+    __slots__ = ("size", "digest", "savings", "mock_bytes")
+
+    def __init__(self, size: int, digest: bytes, savings: int = 0, mock_bytes: int = 0):
+        self.size = size
+        self.digest = digest
+        # The bytes saved by deduplicating identical subtrees within this one.
+        self.savings = savings
+        # The bytes of the mocks within this subtree.
+        self.mock_bytes = mock_bytes
+
+
+class _Frame:
+    """A container being read, with what is known of it so far."""
+
+    __slots__ = (
+        "is_dict",
+        "json_path",
+        "mock_path",
+        "is_attributes",
+        "is_mock",
+        "is_repeat",
+        "length",
+        "key",
+        "children",
+        "size",
+        "savings",
+        "mock_bytes",
+        "hasher",
+    )
+
+    def __init__(
+        self,
+        is_dict: bool,
+        json_path: str,
+        mock_path: str,
+        is_attributes: bool = False,
+    ):
+        self.is_dict = is_dict
+        self.json_path = json_path
+        self.mock_path = mock_path
+        # Whether it is the recorded_attribute_accesses of a mock.
+        self.is_attributes = is_attributes
+        # MockRecordingStore writes the __type__ of a mock as its first key.
+        self.is_mock = False
+        self.is_repeat = False
+        self.length = 0
+        self.key: Any = None
+        self.children = 0
+        self.size = 2
+        self.savings = 0
+        self.mock_bytes = 0
+        self.hasher = hashlib.blake2b(b"d" if is_dict else b"l", digest_size=8)
+
+    def read_key(self, key: Any) -> None:
+        self.key = key
+        if key == "__repeat__":
+            self.is_repeat = True
+
+    @classmethod
+    def child_of(cls, parent: "_Frame", is_dict: bool) -> "_Frame":
+        """
+        The frame of a container read as the next child of the parent, with its JSON
+        path and the path of the mock it was recorded by.
+        """
+        if not parent.is_dict:
+            json_path = f"{parent.json_path}[{parent.children}]"
+            return cls(is_dict, json_path, parent.mock_path)
+        key = parent.key
+        json_path = f"{parent.json_path}.{key}"
+        if parent.is_attributes:
+            return cls(is_dict, json_path, f"{parent.mock_path}.{key}")
+        if parent.is_mock and key == "recorded_attribute_accesses":
+            return cls(is_dict, json_path, parent.mock_path, is_attributes=True)
+        if parent.is_mock and key == "recorded_calls":
+            return cls(is_dict, json_path, f"{parent.mock_path}()")
+        return cls(is_dict, json_path, parent.mock_path)
+
+
+def _open_recording_file(filepath: str) -> IO[str]:
+    """The recording file opened as text, decompressed when it is compressed."""
+    with open(filepath, "rb") as file:
+        is_compressed = is_compressed_recording(file.read(len(GZIP_MAGIC)))
+    return gzip.open(filepath, "rt") if is_compressed else open(filepath)
+
+
+def _iter_json_events(
+    file: IO[str], chunk_size: int = READ_CHUNK_SIZE
+) -> Iterator[tuple[str, Any]]:
+    """
+    Yield ("start", "{" or "["), ("key", key), ("value", value) and ("end", None)
+    for the JSON document in the file, reading it in chunks so that only the largest
+    scalar of the document has to fit in memory. The document is not validated.
+    """
+    buffer = ""
+    position = 0
+    is_read = False
+    # Whether each open container is a dict.
+    is_dict_stack: list[bool] = []
+    is_key = False
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()  # type: ignore
+        if position < len(buffer) and buffer[position] in "{[":
+            is_dict = buffer[position] == "{"
+            yield "start", buffer[position]
+            is_dict_stack.append(is_dict)
+            is_key = is_dict
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] in "}]":
+            yield "end", None
+            is_dict_stack.pop()
+            is_key = bool(is_dict_stack) and is_dict_stack[-1]
+            position += 1
+            continue
+        if position < len(buffer):
+            try:
+                value, end = _SCALAR_DECODER.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if is_read:
+                    raise
+                end = len(buffer)
+            # A scalar that is not followed by a delimiter (ie. 12 of 12.5) may
+            # continue in the next chunk.
+            if is_read or (end < len(buffer) and buffer[end] in _DELIMITERS):
+                yield ("key" if is_key else "value"), value
+                is_key = not is_key and bool(is_dict_stack) and is_dict_stack[-1]
+                position = end
+                continue
+        elif is_read:
+            return
+        # Read at least as much as is buffered, so that a long scalar is read in
+        # a logarithmic number of chunks.
+        chunk = file.read(max(chunk_size, len(buffer) - position))
+        is_read = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def format_report(report: dict[str, Any]) -> str:
+    lines = [
+        f"{report['files']} recordings, {report['file_bytes']:,} bytes "
+        f"({report['sidecar_bytes']:,} in sidecar files)",
+        "",
+    ]
+    for title, key in [
+        ("Bytes per patch path", "bytes_per_patch_path"),
+        ("Bytes per attribute", "bytes_per_attribute"),
+        ("Bytes per nested mock path", "bytes_per_mock_path"),
+    ]:
+        lines.append(f"{title}:")
+        lines.extend(f"  {size:>14,}  {path}" for path, size in report[key].items())
+        lines.append("")
+    lines.append("Largest subtrees:")
+    lines.extend(
+        f"  {subtree['bytes']:>14,}  {subtree['patch_path']} {subtree['json_path']}"
+        for subtree in report["largest_subtrees"]
+    )
+    compaction = report["repeat_compaction"]
+    ratio = compaction["repeated_ratio"]
+    lines += [
+        "",
+        "__repeat__ compaction:",
+        f"  {compaction['repeated_attributes']:,} repeated attributes, "
+        f"{compaction['listed_attributes']:,} listed attributes with "
+        f"{compaction['listed_accesses']:,} accesses"
+        + ("" if ratio is None else f" ({ratio:.0%} repeated)"),
+        "",
+        "Estimated savings:",
+    ]
+    lines.extend(
+        f"  {size:>14,}  {name}" for name, size in report["estimated_savings"].items()
+    )
+    return "\n".join(lines)
+
+
+def analyze_recordings(paths: list[str], top: int = 20) -> dict[str, Any]:
+    analysis = RecordingAnalysis(top=top)
+    for patch_path, filepath in iter_recording_filepaths(paths):
+        analysis.add_recording(patch_path, filepath)
+    return analysis.to_dict()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mock_isolator.analyze")
+    parser.add_argument(
+        "paths", nargs="+", help="Recording directories or filepath prefixes."
+    )
+    parser.add_argument("--top", type=int, default=20, help="Entries per section.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+    report = analyze_recordings(args.paths, top=args.top)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
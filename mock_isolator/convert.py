@@ -0,0 +1,121 @@
+"""
+Rewrite recordings in another format, ie. to compact and compress them:
+
+    python -m mock_isolator.convert --format compact --gzip tests/recordings/
+
+Each argument is a directory (searched recursively for .json recordings) or a
+recording_filepath_prefix, as for mock_isolator.analyze. The recordings are
+converted in a process pool, and each file is replaced atomically, so an
+interrupted conversion is resumed by running it again: the recordings that are
+already in the target format are left as they are. Recordings whose checksum does
+not match (ie. edited by hand) are validated before they are given a new one.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Tuple
+
+from mock_isolator.analyze import iter_recording_filepaths
+from mock_isolator.mock_recording_encoder import validate_recording
+from mock_isolator.recording_checksum import add_checksum, split_checksum
+from mock_isolator.recording_files import (
+    compress_recording,
+    decompress_recording,
+    replace_recording_file,
+)
+
+# The json.dumps arguments of each format. The json format is the one written by
+# MockRecordingStore.
+FORMATS: dict[str, dict[str, Any]] = {
+    "json": {"indent": 2},
+    "compact": {"separators": (",", ":")},
+}
+
+
+def convert_recording(
+    filepath: str, format: str = "json", compress: bool = False, dry_run: bool = False
+) -> Tuple[int, int, bool]:
+    """
+    Rewrite the recording in the format, gzip-compressed with compress, and return
+    its size before and after, and whether it changed. A recording already in that
+    format is not rewritten.
+    """
+    with open(filepath, "rb") as file:
+        content = file.read()
+    serialized, is_checksum_valid = split_checksum(decompress_recording(content))
+    encoding = json.loads(serialized)
+    if not is_checksum_valid:
+        validate_recording(encoding)
+    converted = add_checksum(json.dumps(encoding, **FORMATS[format])).encode()
+    if compress:
+        converted = compress_recording(converted)
+    is_changed = converted != content
+    if is_changed and not dry_run:
+        replace_recording_file(filepath, converted)
+    return len(content), len(converted), is_changed
+
+
+def _convert_recording(
+    filepath: str, format: str, compress: bool, dry_run: bool
+) -> Tuple[int, int, bool] | str:
+    """The result of convert_recording, or the error that stopped the conversion."""
+    try:
+        return convert_recording(filepath, format, compress, dry_run)
+    except (ValueError, TypeError) as error:
+        return f"{type(error).__name__}: {error}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mock_isolator.convert")
+    parser.add_argument(
+        "paths", nargs="+", help="Recording directories or filepath prefixes."
+    )
+    parser.add_argument("--format", choices=sorted(FORMATS), default="json")
+    parser.add_argument(
+        "--gzip", action="store_true", help="Compress the recordings with gzip."
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="Worker processes (default: CPUs)."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report without rewriting."
+    )
+    args = parser.parse_args(argv)
+    filepaths = [filepath for _, filepath in iter_recording_filepaths(args.paths)]
+    started_at = time.perf_counter()
+    total_before = total_after = converted = unchanged = failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = executor.map(
+            _convert_recording,
+            filepaths,
+            [args.format] * len(filepaths),
+            [args.gzip] * len(filepaths),
+            [args.dry_run] * len(filepaths),
+            chunksize=16,
+        )
+        for filepath, result in zip(filepaths, results):
+            if isinstance(result, str):
+                failed += 1
+                print(f"{result}  {filepath}", file=sys.stderr)
+                continue
+            before, after, is_changed = result
+            total_before += before
+            total_after += after
+            if not is_changed:
+                unchanged += 1
+                continue
+            converted += 1
+            print(f"{before:>14,} -> {after:>14,}  {filepath}")
+    print(f"{total_before:>14,} -> {total_after:>14,}  total")
+    print(
+        f"Converted {converted} recordings in {time.perf_counter() - started_at:.1f}s"
+        f" ({unchanged} already converted, {failed} failed)."
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+A sys.meta_path finder that serves mocks in place of whole modules, so that in
+replay mode the mocked modules, and their import-time side effects, are never
+imported. See isolate_modules_with_import_hook in mock_isolator.isolator.
+"""
+
+import importlib
+import sys
+import threading
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import ModuleSpec
+from types import ModuleType
+from typing import Any, Callable, Sequence
+
+
+class MockedModule(ModuleType):
+    """
+    A module whose attributes are read from a RecordingMock or ReplayingMock.
+    Dunder attributes (ie. __path__, read by the import system) are left to the
+    module object.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return getattr(self.__dict__["__mock__"], name)
+
+
+class MockModuleFinder(MetaPathFinder, Loader):
+    """
+    Serves a MockedModule for each of the modules_to_mock and their submodules,
+    with the mock returned by create_mock(module name, real module). With
+    import_real_modules (ie. in record mode), the real module is imported first.
+    """
+
+    def __init__(
+        self,
+        modules_to_mock: Sequence[str],
+        create_mock: Callable[[str, ModuleType | None], Any],
+        import_real_modules: bool,
+    ) -> None:
+        self._modules_to_mock = tuple(modules_to_mock)
+        self._create_mock = create_mock
+        self._import_real_modules = import_real_modules
+        self._importing_real_module = threading.local()
+        self._modules_before: set[str] = set()
+        self._replaced_modules: dict[str, ModuleType] = {}
+        # The real modules imported for the mocks, and the modules they imported.
+        self._real_modules: dict[str, ModuleType] = {}
+        self._real_module_dependencies: set[str] = set()
+        self.mocks: dict[str, Any] = {}
+
+    def is_mocked(self, name: str) -> bool:
+        return any(
+            name == module or name.startswith(f"{module}.")
+            for module in self._modules_to_mock
+        )
+
+    def install(self) -> None:
+        """
+        Add the finder to the start of sys.meta_path. The mocked modules that were
+        already imported are set aside, so that they are imported through it.
+        """
+        self._replaced_modules = {
+            name: module for name, module in sys.modules.items() if self.is_mocked(name)
+        }
+        for name in self._replaced_modules:
+            del sys.modules[name]
+        self._modules_before = set(sys.modules)
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        """
+        Remove the finder, and unload the modules imported since it was installed
+        (ie. the modules under test, which hold the mocks), except for the real
+        modules. The mocked modules are restored to what they were before.
+        """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        unloaded_modules = {
+            name: sys.modules.pop(name)
+            for name in set(sys.modules) - self._modules_before
+            if name not in self._real_module_dependencies
+        }
+        sys.modules.update(self._real_modules)
+        sys.modules.update(self._replaced_modules)
+        # The import system set the modules as attributes of their packages.
+        for name, module in unloaded_modules.items():
+            parent_name, _, child_name = name.rpartition(".")
+            parent = sys.modules.get(parent_name)
+            if parent is None or getattr(parent, child_name, None) is not module:
+                continue
+            if name in sys.modules:
+                setattr(parent, child_name, sys.modules[name])
+            else:
+                delattr(parent, child_name)
+
+    def find_spec(
+        self, fullname: str, path: Any, target: ModuleType | None = None
+    ) -> ModuleSpec | None:
+        if getattr(self._importing_real_module, "value", False):
+            # ie. the real module imports its own submodules.
+            return None
+        if not self.is_mocked(fullname):
+            return None
+        return ModuleSpec(fullname, self, is_package=True)
+
+    def create_module(self, spec: ModuleSpec) -> ModuleType:
+        real_module = None
+        if self._import_real_modules:
+            real_module = self._real_modules.get(spec.name)
+            if real_module is None:
+                real_module = self._import_real_module(spec.name)
+        mock = self._create_mock(spec.name, real_module)
+        self.mocks[spec.name] = mock
+        module = MockedModule(spec.name)
+        module.__dict__["__mock__"] = mock
+        if real_module is not None and hasattr(real_module, "__path__"):
+            # So that the real submodules are found when recording them.
+            module.__path__ = real_module.__path__
+        return module
+
+    def exec_module(self, module: ModuleType) -> None:
+        pass
+
+    def _import_real_module(self, name: str) -> ModuleType:
+        modules_before = set(sys.modules)
+        self._importing_real_module.value = True
+        try:
+            real_module = importlib.import_module(name)
+        finally:
+            self._importing_real_module.value = False
+        for imported_name in set(sys.modules) - modules_before:
+            module = sys.modules[imported_name]
+            if self.is_mocked(imported_name):
+                # ie. submodules imported by the real package, which are mocked
+                # when imported by the modules under test.
+                self._real_modules[imported_name] = module
+                del sys.modules[imported_name]
+            else:
+                self._real_module_dependencies.add(imported_name)
+        return real_module
@@ -1,16 +1,29 @@
 import ast
+import asyncio
 import glob
 import importlib
 import os
-from contextlib import ExitStack
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import AbstractContextManager, AsyncExitStack, ExitStack, nullcontext
 from enum import Enum
+from functools import partial
+from types import ModuleType
 from typing import Any, Tuple
 from unittest.mock import patch
 
+from mock_isolator.import_hook import MockModuleFinder
 from mock_isolator.mock_recording_encoder import (
+    MockRecordingStore,
     get_json_file_mock_interaction_recording_store,
 )
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.recording_budget import RecordingBudget
 from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.recording_stats import (
+    RECORDING_STATS_FILENAME,
+    write_recording_stats,
+)
+from mock_isolator.replaying_mock import ReplayingMock
 from mock_isolator.types import MockIsolatorMode
 
 
@@ -84,67 +97,315 @@ def _load_item(module_path: str, alias: str | None) -> Any:
     return getattr(module_imported, alias)
 
 
+def _patch_with_recording_mocks(
+    exit_stack: ExitStack | AsyncExitStack,
+    patch_paths: list[Tuple[str, str, str | None]],
+    mocker: BasicRecordingMocker,
+) -> dict[str, RecordingMock]:
+    patch_path_modules = {
+        patch_path: _load_item(module_path, alias)
+        for patch_path, module_path, alias in patch_paths
+    }
+    return {
+        patch_path: exit_stack.enter_context(
+            cm=patch(
+                patch_path,
+                new=RecordingMock(wrapped_item=real_object, mocker=mocker),
+            )
+        )
+        for patch_path, real_object in patch_path_modules.items()
+    }
+
+
+def _write_recorded_mocks_to_files(
+    recording_store: MockRecordingStore,
+    recording_filepath_prefix: str,
+    mocks: dict[str, RecordingMock],
+    record_stats: bool,
+) -> None:
+    for file in glob.glob(pathname=f"{recording_filepath_prefix}*"):
+        # ie. the __mockcache__ directory when the prefix is a directory.
+        if not os.path.isdir(file):
+            os.remove(path=file)
+    for name, mock in mocks.items():
+        recording_store.store_recorded_mock_interactions_to_file(
+            mock=mock,
+            filepath=f"{recording_filepath_prefix}{name}.json",
+        )
+    if record_stats:
+        write_recording_stats(
+            mocks=mocks,
+            filepath=f"{recording_filepath_prefix}{RECORDING_STATS_FILENAME}",
+        )
+
+
+def _replay_span(name: str) -> AbstractContextManager[None]:
+    """Time the replay setup when MockRecordingSettings has a ReplayTelemetry."""
+    telemetry = MockRecordingSettings.get_replay_telemetry()
+    return nullcontext() if telemetry is None else telemetry.span(name)
+
+
+async def _load_recorded_mocks_from_files_async(
+    recording_store: MockRecordingStore,
+    recording_filepath_prefix: str,
+    names: list[str],
+    executor: Executor | None,
+) -> dict[str, ReplayingMock]:
+    mocks = await asyncio.gather(
+        *(
+            recording_store.load_recorded_mock_interactions_from_file_async(
+                filepath=f"{recording_filepath_prefix}{name}.json", executor=executor
+            )
+            for name in names
+        )
+    )
+    return dict(zip(names, mocks))
+
+
 def isolate_module_with_mocks(
     exit_stack: ExitStack,
     module_filepath: str,
     modules_to_mock: list[str],
     mode: MockIsolatorMode,
     recording_filepath_prefix: str,
+    record_durations: bool = False,
+    record_stats: bool = False,
+    budget: RecordingBudget | None = None,
 ) -> None:
     """
     Stores/loads mock interaction recordings from the recording_filepath_prefix where
-    each mocked module gets a separate file.
+    each mocked module gets a separate file. With record_durations, the recordings
+    include how long each call took so that it can be replayed with
+    MockRecordingSettings.set_replay_latency. With record_stats, durations are
+    recorded and a summary of the call counts, latency and payload sizes per patch
+    path and attribute is written next to the recordings (see
+    mock_isolator.recording_stats). The budget bounds what is recorded (see
+    RecordingBudget).
     """
     patch_paths = _get_imports_to_patch_for_module_filepath(
         filepath=module_filepath,
         imports_to_mock=modules_to_mock,
     )
-    recording_filepaths = {
-        patch_path: f"{recording_filepath_prefix}{patch_path}.json"
-        for patch_path, module_path, _ in patch_paths
-    }
     recording_store = get_json_file_mock_interaction_recording_store()
     if mode == MockIsolatorMode.REPLAY:
-        [
-            exit_stack.enter_context(
-                cm=patch(
-                    module_path,
-                    new=recording_store.load_recorded_mock_interactions_from_file(
-                        filepath=recording_filepath
-                    ),
-                )
-            )
-            for module_path, recording_filepath in recording_filepaths.items()
-        ]
-    elif mode == MockIsolatorMode.RECORD:
-        patch_path_modules = {
-            patch_path: _load_item(module_path, alias)
-            for patch_path, module_path, alias in patch_paths
-        }
-        mocker = BasicRecordingMocker()
-        module_path_mocks = [
-            (
-                module_path,
+        with _replay_span("isolate_module_with_mocks"):
+            for patch_path, _, _ in patch_paths:
                 exit_stack.enter_context(
                     cm=patch(
-                        module_path,
-                        new=RecordingMock(wrapped_item=real_object, mocker=mocker),
+                        patch_path,
+                        new=recording_store.load_recorded_mock_interactions_from_file(
+                            filepath=f"{recording_filepath_prefix}{patch_path}.json"
+                        ),
                     )
+                )
+    elif mode == MockIsolatorMode.RECORD:
+        mocker = BasicRecordingMocker(
+            record_durations=record_durations or record_stats, budget=budget
+        )
+        mocks = _patch_with_recording_mocks(exit_stack, patch_paths, mocker)
+        exit_stack.callback(
+            _write_recorded_mocks_to_files,
+            recording_store,
+            recording_filepath_prefix,
+            mocks,
+            record_stats,
+        )
+
+
+async def isolate_module_with_mocks_async(
+    exit_stack: AsyncExitStack,
+    module_filepath: str,
+    modules_to_mock: list[str],
+    mode: MockIsolatorMode,
+    recording_filepath_prefix: str,
+    record_durations: bool = False,
+    record_stats: bool = False,
+    budget: RecordingBudget | None = None,
+    executor: Executor | None = None,
+) -> None:
+    """
+    Like isolate_module_with_mocks, for async fixtures. The recordings are read,
+    parsed and decoded concurrently in the executor (by default the event loop's),
+    and written in it when the AsyncExitStack exits, so the event loop keeps
+    running other fixtures meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    patch_paths = await loop.run_in_executor(
+        executor,
+        partial(
+            _get_imports_to_patch_for_module_filepath,
+            filepath=module_filepath,
+            imports_to_mock=modules_to_mock,
+        ),
+    )
+    recording_store = get_json_file_mock_interaction_recording_store()
+    if mode == MockIsolatorMode.REPLAY:
+        with _replay_span("isolate_module_with_mocks_async"):
+            replaying_mocks = await _load_recorded_mocks_from_files_async(
+                recording_store,
+                recording_filepath_prefix,
+                [patch_path for patch_path, _, _ in patch_paths],
+                executor,
+            )
+        for patch_path, replaying_mock in replaying_mocks.items():
+            exit_stack.enter_context(cm=patch(patch_path, new=replaying_mock))
+    elif mode == MockIsolatorMode.RECORD:
+        mocker = BasicRecordingMocker(
+            record_durations=record_durations or record_stats, budget=budget
+        )
+        mocks = _patch_with_recording_mocks(exit_stack, patch_paths, mocker)
+        exit_stack.push_async_callback(
+            loop.run_in_executor,
+            executor,
+            partial(
+                _write_recorded_mocks_to_files,
+                recording_store,
+                recording_filepath_prefix,
+                mocks,
+                record_stats,
+            ),
+        )
+
+
+def _get_dependency_path(module_path: str, alias: str | None) -> str:
+    return module_path if alias is None else f"{module_path}.{alias}"
+
+
+def isolate_modules_with_mocks(
+    exit_stack: ExitStack,
+    module_filepaths: list[str],
+    modules_to_mock: list[str],
+    mode: MockIsolatorMode,
+    recording_filepath_prefix: str,
+    record_durations: bool = False,
+    record_stats: bool = False,
+    budget: RecordingBudget | None = None,
+    share_dependencies: bool = False,
+    max_workers: int | None = None,
+) -> None:
+    """
+    Like isolate_module_with_mocks, for many modules at once. The modules are scanned
+    and the recordings loaded in parallel, and the recordings are written once for
+    all the modules. By default, each module gets the same mocks and recordings as
+    with isolate_module_with_mocks. With share_dependencies, a dependency imported by
+    several of the modules is a single mock, recorded in a single file named after
+    its import path (ie. {recording_filepath_prefix}mybig.dep.json), which does not
+    match the recordings made without it.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        module_patch_paths = list(
+            executor.map(
+                partial(
+                    _get_imports_to_patch_for_module_filepath,
+                    imports_to_mock=modules_to_mock,
                 ),
+                module_filepaths,
+            )
+        )
+        # The patch paths, module path and alias of each recording.
+        recordings: dict[str, Tuple[dict[str, None], str, str | None]] = {}
+        for patch_paths in module_patch_paths:
+            for patch_path, module_path, alias in patch_paths:
+                name = (
+                    _get_dependency_path(module_path, alias)
+                    if share_dependencies
+                    else patch_path
+                )
+                recording_patch_paths = recordings.setdefault(
+                    name, ({}, module_path, alias)
+                )[0]
+                recording_patch_paths[patch_path] = None
+        recording_store = get_json_file_mock_interaction_recording_store()
+        if mode == MockIsolatorMode.REPLAY:
+            with _replay_span("isolate_modules_with_mocks"):
+                mocks = dict(
+                    zip(
+                        recordings,
+                        executor.map(
+                            recording_store.load_recorded_mock_interactions_from_file,
+                            [
+                                f"{recording_filepath_prefix}{name}.json"
+                                for name in recordings
+                            ],
+                        ),
+                    )
+                )
+        elif mode == MockIsolatorMode.RECORD:
+            mocker = BasicRecordingMocker(
+                record_durations=record_durations or record_stats, budget=budget
             )
-            for module_path, real_object in patch_path_modules.items()
-        ]
-
-        def write_recorded_mocks_to_file():
-            for file in glob.glob(pathname=f"{recording_filepath_prefix}*"):
-                os.remove(path=file)
-            for module_path, mock in module_path_mocks:
-                recording_store.store_recorded_mock_interactions_to_file(
-                    mock=mock,
-                    filepath=f"{recording_filepath_prefix}{module_path}.json",
+            mocks = {
+                name: RecordingMock(
+                    wrapped_item=_load_item(module_path, alias), mocker=mocker
                 )
+                for name, (_, module_path, alias) in recordings.items()
+            }
+            exit_stack.callback(
+                _write_recorded_mocks_to_files,
+                recording_store,
+                recording_filepath_prefix,
+                mocks,
+                record_stats,
+            )
+        else:
+            return
+    for name, (patch_paths, _, _) in recordings.items():
+        for patch_path in patch_paths:
+            exit_stack.enter_context(cm=patch(patch_path, new=mocks[name]))
+
+
+def isolate_modules_with_import_hook(
+    exit_stack: ExitStack,
+    modules_to_mock: list[str],
+    mode: MockIsolatorMode,
+    recording_filepath_prefix: str,
+    record_durations: bool = False,
+    record_stats: bool = False,
+    budget: RecordingBudget | None = None,
+) -> None:
+    """
+    Replaces the modules_to_mock, and their submodules, with mocked modules served
+    by a sys.meta_path finder rather than patching the names imported by a module
+    under test. In replay mode, the real modules are never imported. Each mocked
+    module is recorded in its own file ({recording_filepath_prefix}{module}.json).
+
+    The modules under test must be imported after this is called. They are
+    unloaded when the exit_stack exits, since they hold the mocks. See
+    isolate_module_with_mocks for record_durations, record_stats and budget.
+    """
+    recording_store = get_json_file_mock_interaction_recording_store()
+    if mode == MockIsolatorMode.REPLAY:
+
+        def create_mock(name: str, real_module: ModuleType | None) -> Any:
+            return recording_store.load_recorded_mock_interactions_from_file(
+                filepath=f"{recording_filepath_prefix}{name}.json"
+            )
+
+    elif mode == MockIsolatorMode.RECORD:
+        mocker = BasicRecordingMocker(
+            record_durations=record_durations or record_stats, budget=budget
+        )
+
+        def create_mock(name: str, real_module: ModuleType | None) -> Any:
+            return RecordingMock(wrapped_item=real_module, mocker=mocker)
 
-        exit_stack.callback(write_recorded_mocks_to_file)
+    else:
+        return
+    finder = MockModuleFinder(
+        modules_to_mock,
+        create_mock=create_mock,
+        import_real_modules=mode == MockIsolatorMode.RECORD,
+    )
+    if mode == MockIsolatorMode.RECORD:
+        exit_stack.callback(
+            _write_recorded_mocks_to_files,
+            recording_store,
+            recording_filepath_prefix,
+            finder.mocks,
+            record_stats,
+        )
+    finder.install()
+    exit_stack.callback(finder.uninstall)
 
 
 def isolate_dependencies_with_mocks(
@@ -153,40 +414,81 @@ def isolate_dependencies_with_mocks(
     dependency_names: list[str],
     mode: MockIsolatorMode,
     recording_filepath_prefix: str,
+    record_durations: bool = False,
+    record_stats: bool = False,
+    budget: RecordingBudget | None = None,
 ) -> None:
     """
     Records/replays mock interactions from the recording_filepath_prefix where
-    each mocked module gets a separate file.
+    each mocked module gets a separate file. See isolate_module_with_mocks for
+    record_durations, record_stats and budget.
     """
     recording_store = get_json_file_mock_interaction_recording_store()
-    dependency_name_to_filepath = {
-        dependency_name: f"{recording_filepath_prefix}{dependency_name}.json"
-        for dependency_name in dependency_names
-    }
     if mode == MockIsolatorMode.REPLAY:
-        return {
-            mock_name: recording_store.load_recorded_mock_interactions_from_file(
-                filepath=dependency_name_to_filepath[mock_name]
-            )
-            for mock_name in dependency_names
-        }
+        with _replay_span("isolate_dependencies_with_mocks"):
+            return {
+                mock_name: recording_store.load_recorded_mock_interactions_from_file(
+                    filepath=f"{recording_filepath_prefix}{mock_name}.json"
+                )
+                for mock_name in dependency_names
+            }
     elif mode == MockIsolatorMode.RECORD:
-        mocker = BasicRecordingMocker()
+        mocker = BasicRecordingMocker(
+            record_durations=record_durations or record_stats, budget=budget
+        )
         dependency_name_to_recording_mock = {
             dependency_name: RecordingMock(wrapped_item=dependency, mocker=mocker)
             for dependency_name, dependency in zip(dependency_names, dependencies)
         }
+        exit_stack.callback(
+            _write_recorded_mocks_to_files,
+            recording_store,
+            recording_filepath_prefix,
+            dependency_name_to_recording_mock,
+            record_stats,
+        )
+        return dependency_name_to_recording_mock
 
-        def write_recorded_mocks_to_file():
-            for file in glob.glob(pathname=f"{recording_filepath_prefix}*"):
-                os.remove(path=file)
-            for dependency_name, recording_mock in dependency_name_to_recording_mock.items():
-                recording_store.store_recorded_mock_interactions_to_file(
-                    mock=recording_mock,
-                    filepath=dependency_name_to_filepath[dependency_name],
-                )
 
-        exit_stack.callback(write_recorded_mocks_to_file)
+async def isolate_dependencies_with_mocks_async(
+    exit_stack: AsyncExitStack,
+    dependencies: list[Any],
+    dependency_names: list[str],
+    mode: MockIsolatorMode,
+    recording_filepath_prefix: str,
+    record_durations: bool = False,
+    record_stats: bool = False,
+    budget: RecordingBudget | None = None,
+    executor: Executor | None = None,
+) -> dict[str, Any] | None:
+    """
+    Like isolate_dependencies_with_mocks, for async fixtures. See
+    isolate_module_with_mocks_async for the executor.
+    """
+    recording_store = get_json_file_mock_interaction_recording_store()
+    if mode == MockIsolatorMode.REPLAY:
+        with _replay_span("isolate_dependencies_with_mocks_async"):
+            return await _load_recorded_mocks_from_files_async(
+                recording_store, recording_filepath_prefix, dependency_names, executor
+            )
+    elif mode == MockIsolatorMode.RECORD:
+        mocker = BasicRecordingMocker(
+            record_durations=record_durations or record_stats, budget=budget
+        )
+        dependency_name_to_recording_mock = {
+            dependency_name: RecordingMock(wrapped_item=dependency, mocker=mocker)
+            for dependency_name, dependency in zip(dependency_names, dependencies)
+        }
+        exit_stack.push_async_callback(
+            asyncio.get_running_loop().run_in_executor,
+            executor,
+            partial(
+                _write_recorded_mocks_to_files,
+                recording_store,
+                recording_filepath_prefix,
+                dependency_name_to_recording_mock,
+                record_stats,
+            ),
+        )
         return dependency_name_to_recording_mock
-    
-    
\ No newline at end of file
+    return None
@@ -1,31 +1,121 @@
+import asyncio
+import glob
+import hashlib
 import json
+import mmap
 import os
+import sys
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Dict, Generic, List, Set, Tuple, TypeVar
+from functools import partial
+from typing import Any, Dict, Generic, Iterable, List, Set, Tuple, TypeVar
 
 from bson import ObjectId
 
+from mock_isolator import numpy_arrays
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.recording_budget import TruncatedList
+from mock_isolator.recording_cache import (
+    get_cache_filepath,
+    read_cached_encoding,
+    write_cached_encoding,
+)
+from mock_isolator.recording_checksum import (
+    add_checksum,
+    get_checksum,
+    split_checksum,
+)
+from mock_isolator.recording_files import read_recording_file
 from mock_isolator.recording_mock import RecordingMock
+from mock_isolator.replay_coverage import RecordingUsage
+from mock_isolator.replay_telemetry import RecordingLoad
 from mock_isolator.replaying_mock import ReplayingMock
+from mock_isolator.shared_recordings import (
+    get_shared_recording_name,
+    publish_shared_encoding,
+    read_shared_encoding,
+)
+from mock_isolator.stream_segments import (
+    DEFAULT_STREAM_SEGMENT_LENGTH,
+    SEGMENTED_ATTRIBUTES,
+    SegmentedStream,
+)
+from mock_isolator.type_codecs import (
+    DEFAULT_BLOB_THRESHOLD,
+    DEFAULT_CODEC_REGISTRY,
+    CodecRegistry,
+    DecodeContext,
+    EncodeContext,
+    TypeCodec,
+)
 
 EncodingType = TypeVar("EncodingType")
 SerializedType = TypeVar("SerializedType", str, bytes)
 
 
+class RecordingSidecarStore(ABC, Generic[EncodingType]):
+    """
+    Stores the parts of a recording kept outside of it: the segments of long streams
+    and large binary blobs.
+    """
+
+    @abstractmethod
+    def write_segment(self, encoded_segment: EncodingType) -> str:
+        """Store the segment and return its name."""
+
+    @abstractmethod
+    def read_segment(self, segment_name: str) -> EncodingType:
+        pass
+
+    @abstractmethod
+    def remove_segment(self, segment_name: str) -> None:
+        """Remove a segment written by an encoding that was aborted."""
+
+    @abstractmethod
+    def write_blob(self, blob: bytes | bytearray | memoryview) -> str:
+        """Store the blob and return its name."""
+
+    @abstractmethod
+    def read_blob(self, blob_name: str) -> memoryview:
+        """A read-only view of the blob, ideally without copying it."""
+
+    @abstractmethod
+    def write_array(self, array: Any) -> str:
+        """Store the NumPy array and return its name."""
+
+    @abstractmethod
+    def read_array(self, array_name: str) -> Any:
+        """A read-only NumPy array, ideally memory-mapped."""
+
+
 class MockRecordingEncoder(ABC, Generic[EncodingType]):
     @abstractmethod
     def encode_recording_mock_interactions(
-        self, mock: RecordingMock
+        self,
+        mock: RecordingMock,
+        sidecar_store: RecordingSidecarStore[EncodingType] | None = None,
     ) -> EncodingType | None:
         pass
 
     @abstractmethod
     def decode_recording_mock_interactions(
-        self, encoded_interactions: EncodingType
+        self,
+        encoded_interactions: EncodingType,
+        sidecar_store: RecordingSidecarStore[EncodingType] | None = None,
+        trusted: bool = False,
+        coverage: RecordingUsage | None = None,
+        decoded_mocks: List[ReplayingMock] | None = None,
     ) -> ReplayingMock:
-        pass
+        """
+        Unless trusted (ie. the recording was written as is by the store, see
+        recording_checksum), the structure of the recording is validated first. With
+        coverage, what the mocks consume is tracked (see replay_coverage). The
+        decoded mocks, except those of stream segments, are appended to
+        decoded_mocks.
+        """
 
 
 class MockRecordingInteractionSerializer(ABC, Generic[EncodingType, SerializedType]):
@@ -61,6 +151,9 @@ DictMockRecordingEncoderValueType = (
     | date
     | datetime
     | ObjectId
+    | bytes
+    | bytearray
+    | memoryview
     | Tuple["DictMockRecordingEncoderValueType", ...]
     | List["DictMockRecordingEncoderValueType"]
     | frozenset["DictMockRecordingEncoderValueType"]
@@ -69,203 +162,917 @@ DictMockRecordingEncoderValueType = (
     | None
 )
 
+# Kept for importers: the value types of the default codec registry. Custom types
+# registered in other registries are not included.
 DictMockRecordingEncoderValueTypes = (
-    bool,
-    int,
-    float,
-    str,
-    Decimal,
-    date,
-    datetime,
-    ObjectId,
+    *DEFAULT_CODEC_REGISTRY.concrete_types,
     tuple,
     list,
     frozenset,
     set,
     dict,
-    type(None),
 )
 
+DEFAULT_INTERN_MAX_LENGTH = 64
+# How deep the decoder recurses before deferring the rest of the recording to its
+# explicit stack, which bounds its recursion whatever the depth of the recording.
+MAX_DECODE_RECURSION_DEPTH = 64
+# The immutable types of leaf codecs whose equal values are decoded once.
+_INTERNED_TYPES = (Decimal, date, datetime, ObjectId)
+
 
 class DictMockRecordingEncoder(MockRecordingEncoder[DictEncodingType]):
+    """
+    When given a sidecar store, the recorded items of streams (see
+    SEGMENTED_ATTRIBUTES) longer than stream_segment_length are written to it in
+    segments of that length, and replayed lazily with read_ahead segments loaded in
+    the background. Binary values of at least blob_threshold bytes are written to it
+    as blobs, which are replayed from a memory map, and smaller ones are inlined as
+    base64. The types of values are encoded by the codecs of codec_registry, see
+    type_codecs.
+
+    While decoding, attribute names are interned, and equal strings and immutable
+    values (ie. datetimes) of at most intern_max_length characters are decoded into
+    a single shared object per recording.
+    """
+
+    def __init__(
+        self,
+        stream_segment_length: int = DEFAULT_STREAM_SEGMENT_LENGTH,
+        read_ahead: int = 1,
+        blob_threshold: int = DEFAULT_BLOB_THRESHOLD,
+        codec_registry: CodecRegistry | None = None,
+        intern_max_length: int = DEFAULT_INTERN_MAX_LENGTH,
+    ):
+        self._stream_segment_length = stream_segment_length
+        self._read_ahead = read_ahead
+        self._blob_threshold = blob_threshold
+        self._codec_registry = codec_registry or DEFAULT_CODEC_REGISTRY
+        self._intern_max_length = intern_max_length
+
     def encode_recording_mock_interactions(  # noqa: C901
-        self, mock: RecordingMock
+        self,
+        mock: RecordingMock,
+        sidecar_store: RecordingSidecarStore[DictEncodingType] | None = None,
     ) -> DictEncodingType:
         if not mock.recorded_attribute_accesses and not mock.recorded_calls:
             return None
+        stream_segment_length = self._stream_segment_length
+        codec_registry = self._codec_registry
+        # Mocks reached more than once are encoded in full the first time, with an
+        # __id__, and as a {"__type__": "ref"} to it afterwards.
+        shared_mock_ids = _find_shared_mock_ids(mock)
+        reference_ids: Dict[int, int] = {}
+        is_encoding_segment = False
+        # The names of the segments written so far, in order.
+        written_segment_names: List[str] = []
+
+        def encode_stream_segments(
+            mock: RecordingMock, name: str
+        ) -> Dict[str, DictEncodingType] | None:
+            """
+            Segments are decoded lazily, so they cannot refer to other mocks. Returns
+            None when the stream reaches a shared mock and is kept in the recording.
+            """
+            nonlocal is_encoding_segment
+            assert sidecar_store is not None
+            accesses = mock.recorded_attribute_accesses[name]
+            async_indexes = mock.recorded_async_attribute_access_indexes.get(
+                name, set()
+            )
+            durations = mock.recorded_attribute_access_durations.get(name)
+            segment_names: List[DictEncodingType] = []
+            was_encoding_segment = is_encoding_segment
+            is_encoding_segment = True
+            written_segment_count = len(written_segment_names)
+            try:
+                for start in range(0, len(accesses), stream_segment_length):
+                    end = min(start + stream_segment_length, len(accesses))
+                    segment: Dict[str, DictEncodingType] = {
+                        "values": [
+                            encode_item(accesses[i], i in async_indexes)
+                            for i in range(start, end)
+                        ]
+                    }
+                    if durations:
+                        segment["durations"] = _encode_durations(  # type: ignore
+                            durations, end - start, start=start
+                        )
+                    segment_name = sidecar_store.write_segment(segment)
+                    written_segment_names.append(segment_name)
+                    segment_names.append(segment_name)
+            except _SharedMockInSegmentError:
+                if was_encoding_segment:
+                    raise
+                # Segments are named after their content, so those also written by
+                # the streams encoded before are kept.
+                kept_segment_names = set(written_segment_names[:written_segment_count])
+                for segment_name in written_segment_names[written_segment_count:]:
+                    if segment_name not in kept_segment_names:
+                        sidecar_store.remove_segment(segment_name)
+                del written_segment_names[written_segment_count:]
+                return None
+            finally:
+                is_encoding_segment = was_encoding_segment
+            return {"__segments__": segment_names, "length": len(accesses)}
 
         def encode_item(  # noqa: C901
             item: Any,
             is_async: bool = False,
         ) -> DictEncodingType:
-            if not isinstance(
-                item, DictMockRecordingEncoderValueTypes + (RecordingMock,)
-            ):
-                raise TypeError(
-                    f"Item of type {type(item)} is not a supported value type of "
-                    "DictMockRecordingEncoder. Supported types are "
-                    f"{DictMockRecordingEncoderValueType | RecordingMock}"
-                )
-            if isinstance(item, RecordingMock):
-                serialized: Dict[str, DictEncodingType] = {
-                    "__type__": "RecordingMock",
-                }
-                if item.recorded_attribute_accesses:
-                    encoded_attribute_accesses = {
-                        k: [encode_item(attr, is_async) for (attr, is_async) in zip(v, (i in item.recorded_async_attribute_access_indexes.get(k, set()) for i in range(len(v))))]
-                        for k, v in item.recorded_attribute_accesses.items()
-                    }
-                    encoded_attribute_accesses_compacted = {
-                        k: (
-                            {"__repeat__": v[0]}
-                            if len(v) > 0
-                            and all(
-                                v[0] == attr for attr in v
-                            )
-                            else v
+            """
+            Encode the item with an explicit stack rather than recursion, so that the
+            depth of a recording is not bounded by the recursion limit. A task
+            encodes an item into its place in the encoding of its container and
+            pushes the tasks of the items within it, in reverse so that items are
+            encoded in the same order as a depth-first traversal. Callables are run
+            once the tasks pushed after them are done.
+            """
+            root: List[DictEncodingType] = [None]
+            tasks: List[Any] = [(root, 0, item, is_async)]
+            while tasks:
+                task = tasks.pop()
+                if type(task) is not tuple:
+                    task()
+                    continue
+                container, key, item, is_async = task
+                item_type = type(item)
+                encoded: Any
+                if is_async:
+                    encoded = {"__type__": "async_value", "value": None}
+                    tasks.append((encoded, "value", item, False))
+                elif item_type is dict or item_type is list:
+                    encoded = push_items(tasks, item)
+                elif item_type is RecordingMock:
+                    encoded = encode_recording_mock(item, tasks)
+                elif item_type in as_is_types:
+                    encoded = item
+                else:
+                    codec = codec_registry.get_codec(item_type)
+                    if codec is None:
+                        if isinstance(item, RecordingMock):
+                            encoded = encode_recording_mock(item, tasks)
+                            container[key] = encoded
+                            continue
+                        raise TypeError(
+                            f"Item of type {item_type} is not a supported value type "
+                            "of DictMockRecordingEncoder. Supported types are "
+                            f"{codec_registry.types}, and others can be added with "
+                            "register_type_codec."
                         )
-                        for k, v in encoded_attribute_accesses.items()
-                    }
+                    if codec.type is dict or codec.type is list:
+                        encoded = push_items(tasks, item)
+                    elif codec.tag is None:
+                        encoded = codec.encode(item, context)
+                    else:
+                        encoded = {"__type__": codec.tag, **codec.encode(item, context)}
+                        for field in codec.nested_fields:
+                            if field in encoded:
+                                encoded[field] = push_items(tasks, encoded[field])
+                container[key] = encoded
+            return root[0]
 
-                    serialized["recorded_attribute_accesses"] = encoded_attribute_accesses_compacted
-                if item.recorded_calls:
-                    serialized["recorded_calls"] = [
-                        encode_item(call) for call in item.recorded_calls
-                    ]
-                return serialized
-            elif isinstance(item, Decimal):
-                return {"__type__": "Decimal", "value": str(item)}
-            elif isinstance(item, datetime):
-                return {"__type__": "datetime", "value": item.isoformat()}
-            elif isinstance(item, date):
-                return {"__type__": "date", "value": item.isoformat()}
-            elif isinstance(item, ObjectId):
-                return {"__type__": "ObjectId", "value": str(item)}
-            elif isinstance(item, tuple):
-                return {"__type__": "tuple", "value": [encode_item(i) for i in item]}
-            elif isinstance(item, frozenset):
-                return {
-                    "__type__": "frozenset",
-                    "value": [encode_item(i) for i in item],
+        def push_items(tasks: List[Any], items: Any) -> Any:
+            """The encoding of a list or dict, with its items still to be encoded."""
+            if isinstance(items, dict):
+                encoded: Any = dict.fromkeys(items)
+                for key, value in reversed(items.items()):
+                    if type(value) in as_is_types:
+                        encoded[key] = value
+                    else:
+                        tasks.append((encoded, key, value, False))
+                return encoded
+            encoded = list(items)
+            for index in range(len(encoded) - 1, -1, -1):
+                if type(encoded[index]) not in as_is_types:
+                    tasks.append((encoded, index, encoded[index], False))
+            return encoded
+
+        def encode_recording_mock(
+            item: RecordingMock, tasks: List[Any]
+        ) -> Dict[str, DictEncodingType]:
+            serialized: Dict[str, DictEncodingType] = {
+                "__type__": "RecordingMock",
+            }
+            if id(item) in shared_mock_ids:
+                if is_encoding_segment:
+                    raise _SharedMockInSegmentError()
+                if id(item) in reference_ids:
+                    return {"__type__": "ref", "id": reference_ids[id(item)]}
+                reference_ids[id(item)] = len(reference_ids)
+                serialized["__id__"] = reference_ids[id(item)]
+            # Read once, rather than through RecordingMock.__getattribute__.
+            state = item.__dict__
+            recorded_attribute_accesses = state["recorded_attribute_accesses"]
+            recorded_calls = state["recorded_calls"]
+            segmented_attribute_accesses = {
+                k: encoded_segments
+                for k, v in recorded_attribute_accesses.items()
+                if sidecar_store is not None
+                and k in SEGMENTED_ATTRIBUTES
+                and len(v) > stream_segment_length
+                # Streams are replayed in order, not by stream key.
+                and k not in state["recorded_attribute_access_stream_keys"]
+                and (encoded_segments := encode_stream_segments(item, k)) is not None
+            }
+            encoded_attribute_accesses = {
+                k: list(v)
+                for k, v in recorded_attribute_accesses.items()
+                if k not in segmented_attribute_accesses
+            }
+            encoded_calls = list(recorded_calls)
+            # The rest of the mock is encoded once its interactions are.
+            tasks.append(
+                partial(
+                    finish_recording_mock,
+                    state,
+                    serialized,
+                    encoded_attribute_accesses,
+                    segmented_attribute_accesses,
+                    encoded_calls,
+                )
+            )
+            for i in range(len(encoded_calls) - 1, -1, -1):
+                tasks.append((encoded_calls, i, encoded_calls[i], False))
+            async_attribute_access_indexes = state[
+                "recorded_async_attribute_access_indexes"
+            ]
+            for k, encoded_accesses in reversed(encoded_attribute_accesses.items()):
+                async_indexes = async_attribute_access_indexes.get(k, ())
+                for i in range(len(encoded_accesses) - 1, -1, -1):
+                    tasks.append(
+                        (encoded_accesses, i, encoded_accesses[i], i in async_indexes)
+                    )
+            return serialized
+
+        def finish_recording_mock(
+            state: Dict[str, Any],
+            serialized: Dict[str, DictEncodingType],
+            encoded_attribute_accesses: Dict[str, List[DictEncodingType]],
+            segmented_attribute_accesses: Dict[str, DictEncodingType],
+            encoded_calls: List[DictEncodingType],
+        ) -> None:
+            recorded_attribute_accesses = state["recorded_attribute_accesses"]
+            if recorded_attribute_accesses:
+                compacted: Dict[str, DictEncodingType] = {
+                    k: (
+                        {"__repeat__": v[0]}
+                        if v and all(_is_same_encoding(v[0], attr) for attr in v)
+                        else v
+                    )
+                    for k, v in encoded_attribute_accesses.items()
                 }
-            elif isinstance(item, set):
-                return {"__type__": "set", "value": [encode_item(i) for i in item]}
-            elif isinstance(item, (int, str, float, bool, type(None))):
-                if is_async:
-                    return {"__type__": "async_value", "value": item}
-                return item
-            elif isinstance(item, dict):
-                return {k: encode_item(v) for k, v in item.items()}
-            elif isinstance(item, list) and not isinstance(item, (str, bytes)):
-                return [encode_item(i) for i in item]
-            else:
-                return str(item)
+                compacted.update(segmented_attribute_accesses)
+                serialized["recorded_attribute_accesses"] = compacted
+                stream_keys = state["recorded_attribute_access_stream_keys"]
+                encoded_stream_keys = {
+                    k: [keys.get(i) for i in range(len(v))]
+                    for k, v in recorded_attribute_accesses.items()
+                    if (keys := stream_keys.get(k)) and isinstance(compacted[k], list)
+                }
+                if encoded_stream_keys:
+                    serialized["recorded_attribute_access_stream_keys"] = (
+                        encoded_stream_keys  # type: ignore
+                    )
+                access_durations = state["recorded_attribute_access_durations"]
+                encoded_durations = {
+                    k: _encode_durations(
+                        durations,
+                        len(v),
+                        is_repeated=not isinstance(compacted[k], list),
+                    )
+                    for k, v in recorded_attribute_accesses.items()
+                    if (durations := access_durations.get(k))
+                    and k not in segmented_attribute_accesses
+                }
+                if encoded_durations:
+                    serialized["recorded_attribute_access_durations"] = (
+                        encoded_durations  # type: ignore
+                    )
+            if encoded_calls:
+                serialized["recorded_calls"] = encoded_calls
+                recorded_call_stream_keys = state["recorded_call_stream_keys"]
+                if recorded_call_stream_keys:
+                    serialized["recorded_call_stream_keys"] = [
+                        recorded_call_stream_keys.get(i)
+                        for i in range(len(encoded_calls))
+                    ]
+                recorded_call_durations = state["recorded_call_durations"]
+                if recorded_call_durations:
+                    serialized["recorded_call_durations"] = _encode_durations(
+                        recorded_call_durations, len(encoded_calls)
+                    )
 
+        as_is_types = codec_registry.as_is_types
+        context = EncodeContext(encode_item, sidecar_store, self._blob_threshold)
         return encode_item(mock)
 
     def decode_recording_mock_interactions(  # noqa: C901
-        self, encoded_interactions: DictEncodingType
+        self,
+        encoded_interactions: DictEncodingType,
+        sidecar_store: RecordingSidecarStore[DictEncodingType] | None = None,
+        trusted: bool = False,
+        coverage: RecordingUsage | None = None,
+        decoded_mocks: List[ReplayingMock] | None = None,
     ) -> ReplayingMock:
-        def decode_replaying_mock(item: DictEncodingType) -> ReplayingMock:
-            if not isinstance(item, dict):
-                raise TypeError(f"Expected dict for replaying mock, got {type(item)}")
-            item_type = item["__type__"]
-            if item_type != "RecordingMock":
-                raise ValueError(
-                    f'Expected __type__ set to "RecordingMock" instead of {item_type}'
-                )
-            recorded_attribute_accesses = item.get("recorded_attribute_accesses", {})
-            if not isinstance(recorded_attribute_accesses, dict):
+        def load_stream_segment(
+            segment_name: str,
+        ) -> Tuple[List[Any], List[float | None] | None]:
+            assert sidecar_store is not None
+            segment = sidecar_store.read_segment(segment_name)
+            if not isinstance(segment, dict) or not isinstance(
+                segment.get("values"), list
+            ):
                 raise TypeError(
-                    "Expected dict for recorded_attribute_accesses, got "
-                    f"{type(recorded_attribute_accesses)}"
+                    f"Expected dict with a values list for segment {segment_name}"
                 )
-            recorded_calls = item.get("recorded_calls", [])
-            if not isinstance(recorded_calls, list):
-                raise TypeError(
-                    f"Expected list for recorded_calls, got {type(recorded_calls)}"
+            if not trusted:
+                _validate_encoded_item(
+                    segment["values"],
+                    f"{segment_name}.segment:$.values",
+                    codec_registry,
                 )
-            decoded_recorded_attribute_accesses: Dict[
-                str,
-                List[DictMockRecordingEncoderValueType | ReplayingMock]
-                | Dict[str, DictMockRecordingEncoderValueType | ReplayingMock],
-            ] = {}
-            for attribute_name, accesses in recorded_attribute_accesses.items():
-                if not isinstance(attribute_name, str):
-                    raise TypeError(
-                        f"Expected str for recorded_attribute_accesses attribute_name, "
-                        f"got {type(attribute_name)}"
+            values: List[Any] = [None]
+            decode_tasks([(values, 0, segment["values"])])
+            return values[0], segment.get("durations")  # type: ignore
+
+        referenced_mocks: Dict[int, ReplayingMock] = {}
+
+        def decode_tasks(  # noqa: C901
+            tasks: List[Any], covered_mocks: List[ReplayingMock] | None = None
+        ) -> None:
+            """
+            Decode the items of the tasks recursively, in depth-first order so that
+            mocks are defined before they are referred to. Past
+            MAX_DECODE_RECURSION_DEPTH, an item is deferred to a task instead, and so
+            is every item after it, which keeps that order. A task decodes an item
+            into its place in its decoded container, or is a callable that builds a
+            value from its decoded items (ie. a tuple).
+            """
+            deferred: List[Any] = []
+
+            def decode_into(
+                container: Any, key: Any, item: List[Any] | Dict[str, Any], depth: int
+            ) -> None:
+                if deferred or depth >= MAX_DECODE_RECURSION_DEPTH:
+                    deferred.append((container, key, item))
+                    return
+                decoded: Any
+                entries: Any
+                if type(item) is list:
+                    container[key] = decoded = list(item)
+                    entries = enumerate(item)
+                elif "__type__" in item:
+                    decode_tagged(container, key, item, depth)
+                    return
+                else:
+                    container[key] = decoded = dict(item)
+                    entries = item.items()
+                decode_values(decoded, entries, depth + 1)
+
+            def decode_values(
+                decoded: Any, entries: Iterable[Tuple[Any, Any]], depth: int
+            ) -> None:
+                """
+                Decode the entries into decoded, a copy of their list or dict, in
+                which only the strings to intern and the lists and dicts are replaced.
+                """
+                for key, value in entries:
+                    value_type = type(value)
+                    if value_type is str:
+                        if len(value) <= intern_max_length:
+                            decoded[key] = interned_values.setdefault(value, value)
+                    elif value_type is dict or value_type is list:
+                        decode_into(decoded, key, value, depth)
+
+            def decode_tagged(
+                container: Any, key: Any, item: Dict[str, Any], depth: int
+            ) -> None:
+                tag = item["__type__"]
+                codec = leaf_codecs_by_tag.get(tag)
+                if codec is not None:
+                    if tag in interned_tags:
+                        container[key] = decode_interned(tag, codec, item)
+                    else:
+                        container[key] = codec.decode(item, context)
+                elif tag in nested_codecs_by_tag:
+                    decode_nested_fields(
+                        container, key, nested_codecs_by_tag[tag], item, depth + 1
                     )
-                if isinstance(accesses, list):
-                    decoded_recorded_attribute_accesses[attribute_name] = [
-                        decode_item(attribute_value) for attribute_value in accesses
-                    ]
-                elif isinstance(accesses, dict):
-                    repeated_value = decode_item(accesses["__repeat__"])
-                    decoded_recorded_attribute_accesses[attribute_name] = {
-                        "__repeat__": repeated_value
-                    }
+                elif tag == "RecordingMock":
+                    container[key] = decode_replaying_mock(item, depth + 1)
+                elif tag == "ref":
+                    if item["id"] not in referenced_mocks:
+                        raise ValueError(f"Reference to undefined mock {item['id']}")
+                    container[key] = referenced_mocks[item["id"]]  # type: ignore
+                elif tag == "async_value":
+                    decoded = {"__type__": "async_value", "value": item["value"]}
+                    container[key] = decoded
+                    if isinstance(item["value"], (list, dict)):
+                        decode_into(decoded, "value", item["value"], depth)
                 else:
-                    raise TypeError(
-                        "Expected list or dict for recorded_attribute_accesses "
-                        f"accesses, got {type(accesses)}"
+                    raise ValueError(f"Unknown __type__ {tag} in the recording")
+
+            def decode_nested_fields(
+                container: Any,
+                key: Any,
+                codec: TypeCodec,
+                item: Dict[str, Any],
+                depth: int,
+            ) -> None:
+                """
+                Decode the value once its nested fields are decoded, which is
+                deferred too when some of their items were deferred.
+                """
+                fields = dict(item)
+                for field in codec.nested_fields:
+                    if field not in fields:
+                        continue
+                    value = fields[field]
+                    if type(value) is list:
+                        fields[field] = decoded = list(value)
+                        decode_values(decoded, enumerate(value), depth)
+                    elif isinstance(value, dict):
+                        decode_into(fields, field, value, depth)
+                    else:
+                        raise TypeError(
+                            f"Expected list or dict for {item['__type__']} {field}, "
+                            f"got {type(value)}"
+                        )
+                if deferred:
+                    deferred.append(
+                        partial(decode_codec, container, key, codec, fields)
                     )
-            mock = ReplayingMock(
-                recorded_attribute_accesses=decoded_recorded_attribute_accesses,
-                recorded_calls=[
-                    decode_item(call) for call in recorded_calls  # type: ignore
-                ],
-            )
-            return mock
+                else:
+                    container[key] = codec.decode(fields, context)
 
-        def decode_item(  # noqa: C901
-            item: DictEncodingType,
-        ) -> DictMockRecordingEncoderValueType | ReplayingMock:
-            if isinstance(item, dict):
-                if "__type__" in item:
-                    if item["__type__"] == "RecordingMock":
-                        return decode_replaying_mock(item)
-                    elif item["__type__"] == "Decimal":
-                        return Decimal(str(item["value"]))
-                    elif item["__type__"] == "datetime":
-                        return datetime.fromisoformat(str(item["value"]))
-                    elif item["__type__"] == "date":
-                        return date.fromisoformat(str(item["value"]))
-                    elif item["__type__"] == "ObjectId":
-                        return ObjectId(str(item["value"]))
-                    elif item["__type__"] == "async_value":
-                        return item["value"]
-                    elif item["__type__"] in ["frozenset", "set", "tuple"]:
-                        item_value = item["value"]
-                        if not isinstance(item_value, list):
-                            raise TypeError(
-                                "Expected list for tuple item value, got "
-                                f"{type(item_value)}"
+            def decode_replaying_mock(
+                item: Dict[str, Any], depth: int
+            ) -> ReplayingMock:
+                recorded_attribute_accesses = item.get(
+                    "recorded_attribute_accesses", {}
+                )
+                recorded_calls = item.get("recorded_calls", [])
+                recorded_attribute_access_stream_keys = item.get(
+                    "recorded_attribute_access_stream_keys", {}
+                )
+                recorded_call_stream_keys = item.get("recorded_call_stream_keys")
+                recorded_attribute_access_durations = item.get(
+                    "recorded_attribute_access_durations", {}
+                )
+                recorded_call_durations = item.get("recorded_call_durations")
+                decoded_recorded_attribute_accesses: Dict[
+                    str,
+                    List[DictMockRecordingEncoderValueType | ReplayingMock]
+                    | Dict[str, DictMockRecordingEncoderValueType | ReplayingMock],
+                ] = {
+                    sys.intern(name): None for name in recorded_attribute_accesses
+                }  # type: ignore
+                decoded_recorded_calls = list(recorded_calls)
+                # The mock is created and registered before its interactions are
+                # decoded, since they may refer back to it.
+                mock = ReplayingMock(
+                    recorded_attribute_accesses=decoded_recorded_attribute_accesses,
+                    recorded_calls=decoded_recorded_calls,
+                    recorded_attribute_access_stream_keys=(
+                        {
+                            sys.intern(k): list(v)  # type: ignore
+                            for k, v in recorded_attribute_access_stream_keys.items()
+                        }
+                        if recorded_attribute_access_stream_keys
+                        else None
+                    ),
+                    recorded_call_stream_keys=(
+                        None
+                        if recorded_call_stream_keys is None
+                        else list(recorded_call_stream_keys)  # type: ignore
+                    ),
+                    recorded_attribute_access_durations=(
+                        {
+                            sys.intern(k): (
+                                list(v) if isinstance(v, list) else v  # type: ignore
                             )
-                        if item["__type__"] == "frozenset":
-                            return frozenset(
-                                [decode_item(i) for i in item_value]  # type: ignore
+                            for k, v in recorded_attribute_access_durations.items()
+                        }
+                        if recorded_attribute_access_durations
+                        else None
+                    ),
+                    recorded_call_durations=recorded_call_durations,  # type: ignore
+                )
+                if covered_mocks is not None:
+                    covered_mocks.append(mock)
+                if "__id__" in item:
+                    referenced_mocks[item["__id__"]] = mock  # type: ignore
+                for attribute_name, accesses in recorded_attribute_accesses.items():
+                    if type(accesses) is list:
+                        decode_into(
+                            decoded_recorded_attribute_accesses,
+                            attribute_name,
+                            accesses,
+                            depth,
+                        )
+                    elif "__segments__" in accesses:
+                        if sidecar_store is None:
+                            raise ValueError(
+                                f"Recorded attribute {attribute_name} is stored in "
+                                "segments, but no sidecar store was given."
                             )
-                        if item["__type__"] == "set":
-                            return {decode_item(i) for i in item_value}  # type: ignore
-                        return tuple(decode_item(i) for i in item_value)  # type: ignore
-                else:
-                    return {k: decode_item(v) for k, v in item.items()}  # type: ignore
-            elif isinstance(item, list):
-                return [decode_item(i) for i in item]  # type: ignore
-            else:
-                return item
+                        decoded_recorded_attribute_accesses[attribute_name] = (
+                            SegmentedStream(  # type: ignore
+                                segment_names=list(accesses["__segments__"]),
+                                length=int(accesses["length"]),
+                                load_segment=load_stream_segment,
+                                read_ahead=self._read_ahead,
+                            )
+                        )
+                    else:
+                        value = accesses["__repeat__"]
+                        repeated = {"__repeat__": value}
+                        decoded_recorded_attribute_accesses[attribute_name] = repeated
+                        if isinstance(value, (list, dict)):
+                            decode_into(repeated, "__repeat__", value, depth)
+                        elif type(value) is str and len(value) <= intern_max_length:
+                            repeated["__repeat__"] = interned_values.setdefault(
+                                value, value
+                            )
+                decode_values(decoded_recorded_calls, enumerate(recorded_calls), depth)
+                return mock
+
+            while tasks:
+                task = tasks.pop()
+                if type(task) is not tuple:
+                    task()
+                    continue
+                decode_into(*task, 0)
+                if deferred:
+                    deferred.reverse()
+                    tasks.extend(deferred)
+                    deferred.clear()
+
+        def decode_interned(tag: str, codec: TypeCodec, item: Dict[str, Any]) -> Any:
+            """
+            The decoded value, shared with the equal values of the recording, which
+            are identified by their encoding so that ie. Decimal("1.0") and
+            Decimal("1.00") stay distinct.
+            """
+            encoded_value = item.get("value")
+            if type(encoded_value) is not str or len(encoded_value) > intern_max_length:
+                return codec.decode(item, context)
+            interned_key = (tag, encoded_value)
+            decoded = interned_values.get(interned_key)
+            if decoded is None:
+                decoded = interned_values[interned_key] = codec.decode(item, context)
+            return decoded
+
+        def decode_codec(
+            container: Any, key: Any, codec: TypeCodec, fields: Dict[str, Any]
+        ) -> None:
+            container[key] = codec.decode(fields, context)  # type: ignore
+
+        def decode_item(
+            item: DictEncodingType,
+        ) -> DictMockRecordingEncoderValueType | ReplayingMock:
+            if not isinstance(item, (list, dict)):
+                return item  # type: ignore
+            root: List[Any] = [None]
+            decode_tasks([(root, 0, item)])
+            return root[0]
+
+        codec_registry = self._codec_registry
+        leaf_codecs_by_tag = codec_registry.leaf_codecs_by_tag
+        nested_codecs_by_tag = codec_registry.nested_codecs_by_tag
+        intern_max_length = self._intern_max_length
+        interned_tags = frozenset(
+            tag
+            for tag, codec in leaf_codecs_by_tag.items()
+            if issubclass(codec.type, _INTERNED_TYPES)
+        )
+        # Keyed by the strings themselves, and by (tag, encoded value) for the
+        # values of interned_tags.
+        interned_values: Dict[Any, Any] = {}
+        context = DecodeContext(decode_item, sidecar_store)
+        if not trusted:
+            validate_recording(encoded_interactions, codec_registry)
+        # The mocks of stream segments are decoded later, and are not tracked.
+        covered_mocks: List[ReplayingMock] | None = (
+            None if coverage is None and decoded_mocks is None else []
+        )
+        root: List[Any] = [None]
+        decode_tasks([(root, 0, encoded_interactions)], covered_mocks)
+        mock = root[0]
+        if coverage is not None:
+            coverage.cover(covered_mocks)  # type: ignore
+        if decoded_mocks is not None:
+            decoded_mocks.extend(covered_mocks)  # type: ignore
+        return mock
+
+
+class _SharedMockInSegmentError(Exception):
+    pass
+
+
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _find_shared_mock_ids(mock: RecordingMock) -> Set[int]:
+    """
+    The ids of the mocks reached more than once from the mock, ie. from different
+    attributes or through a cycle.
+    """
+    seen_mock_ids: Set[int] = set()
+    shared_mock_ids: Set[int] = set()
+    pending: List[Any] = [mock]
+    while pending:
+        item = pending.pop()
+        item_type = type(item)
+        if item_type in _SCALAR_TYPES:
+            continue
+        if isinstance(item, RecordingMock):
+            if id(item) in seen_mock_ids:
+                shared_mock_ids.add(id(item))
+                continue
+            seen_mock_ids.add(id(item))
+            # Read once, rather than through RecordingMock.__getattribute__.
+            state = item.__dict__
+            for accesses in state["recorded_attribute_accesses"].values():
+                pending.extend(accesses)
+            pending.extend(state["recorded_calls"])
+        elif isinstance(item, dict):
+            pending.extend(item.values())
+        elif isinstance(item, TruncatedList):
+            pending.extend(item.recorded_items)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+    return shared_mock_ids
+
+
+# The fields of an encoded mock, their type and whether they can be null.
+_RECORDING_MOCK_FIELD_TYPES = [
+    ("recorded_attribute_accesses", dict, False),
+    ("recorded_calls", list, False),
+    ("recorded_attribute_access_stream_keys", dict, False),
+    ("recorded_call_stream_keys", list, True),
+    ("recorded_attribute_access_durations", dict, False),
+    ("recorded_call_durations", list, True),
+]
+
+
+def validate_recording(
+    encoding: Any, codec_registry: CodecRegistry = DEFAULT_CODEC_REGISTRY
+) -> None:
+    """
+    Check the structure that decoding relies on (ie. of a recording edited by
+    hand), raising a TypeError or ValueError with the JSON path (ie.
+    "$.recorded_calls[0].value") of the invalid node.
+    """
+    if not isinstance(encoding, dict):
+        raise TypeError(f"Expected dict for replaying mock, got {type(encoding)} at $")
+    if encoding.get("__type__") != "RecordingMock":
+        raise ValueError(
+            'Expected __type__ set to "RecordingMock" instead of '
+            f"{encoding.get('__type__')} at $"
+        )
+    _validate_encoded_item(encoding, "$", codec_registry)
+
+
+# A JSON path, as the path of the parent and the key or index within it. It is only
+# formatted when a node is invalid.
+_Path = str | Tuple["_Path", str | int]
+
+
+def _format_path(path: _Path) -> str:
+    keys: List[str] = []
+    while isinstance(path, tuple):
+        path, key = path
+        keys.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return path + "".join(reversed(keys))
+
+
+def _validate_encoded_item(  # noqa: C901
+    item: Any, path: _Path, codec_registry: CodecRegistry
+) -> None:
+    """
+    Validate the encoded item at path and the items within it, iteratively. Only
+    lists and dicts are pushed, since the other values are valid as they are.
+    """
+    pending: List[Tuple[Any, _Path]] = [(item, path)]
+    while pending:
+        item, path = pending.pop()
+        if type(item) is list:
+            for i in range(len(item) - 1, -1, -1):
+                if isinstance(item[i], (list, dict)):
+                    pending.append((item[i], (path, i)))
+            continue
+        tag = item.get("__type__")
+        if tag is None:
+            for key, value in reversed(item.items()):
+                if isinstance(value, (list, dict)):
+                    pending.append((value, (path, key)))
+        elif tag == "RecordingMock":
+            _validate_recording_mock(item, path, pending)
+        elif tag == "ref":
+            if not isinstance(item.get("id"), int):
+                raise TypeError(
+                    f"Expected int for the id of a ref, got {type(item.get('id'))} "
+                    f"at {_format_path(path)}"
+                )
+        elif tag == "async_value":
+            if isinstance(item.get("value"), (list, dict)):
+                pending.append((item["value"], (path, "value")))
+        else:
+            codec = codec_registry.get_codec_by_tag(tag)
+            if codec is None or codec.decode is None:
+                raise ValueError(
+                    f"Unknown __type__ {tag} in the recording at {_format_path(path)}"
+                )
+            for field in reversed(codec.nested_fields):
+                if isinstance(item.get(field), (list, dict)):
+                    pending.append((item[field], (path, field)))
+
+
+def _validate_recording_mock(  # noqa: C901
+    item: Dict[str, Any], path: _Path, pending: List[Tuple[Any, _Path]]
+) -> None:
+    for field, field_type, is_nullable in _RECORDING_MOCK_FIELD_TYPES:
+        if field not in item or (is_nullable and item[field] is None):
+            continue
+        if not isinstance(item[field], field_type):
+            raise TypeError(
+                f"Expected {field_type.__name__} for {field}, got "
+                f"{type(item[field])} at {_format_path((path, field))}"
+            )
+    if "recorded_calls" in item:
+        pending.append((item["recorded_calls"], (path, "recorded_calls")))
+    attributes_path = (path, "recorded_attribute_accesses")
+    recorded_attribute_accesses = item.get("recorded_attribute_accesses", {})
+    for attribute_name, accesses in reversed(recorded_attribute_accesses.items()):
+        accesses_path = (attributes_path, attribute_name)
+        if not isinstance(attribute_name, str):
+            raise TypeError(
+                "Expected str for recorded_attribute_accesses attribute_name, got "
+                f"{type(attribute_name)} at {_format_path(accesses_path)}"
+            )
+        if isinstance(accesses, list):
+            pending.append((accesses, accesses_path))
+        elif isinstance(accesses, dict) and "__segments__" in accesses:
+            if not isinstance(accesses["__segments__"], list) or not isinstance(
+                accesses.get("length"), int
+            ):
+                raise TypeError(
+                    "Expected a list of __segments__ and an int length at "
+                    f"{_format_path(accesses_path)}"
+                )
+        elif isinstance(accesses, dict) and "__repeat__" in accesses:
+            if isinstance(accesses["__repeat__"], (list, dict)):
+                pending.append((accesses["__repeat__"], (accesses_path, "__repeat__")))
+        else:
+            raise TypeError(
+                "Expected list, __repeat__ or __segments__ dict for "
+                f"recorded_attribute_accesses accesses, got {type(accesses)} at "
+                f"{_format_path(accesses_path)}"
+            )
+
+
+def _is_same_encoding(first: DictEncodingType, other: DictEncodingType) -> bool:
+    """Whether other is equal to first or a reference to the mock defined by first."""
+    if first == other:
+        return True
+    if not isinstance(first, dict) or not isinstance(other, dict):
+        return False
+    if first.get("__type__") == other.get("__type__") == "async_value":
+        return _is_same_encoding(first["value"], other["value"])
+    return (
+        other.get("__type__") == "ref"
+        and first.get("__type__") == "RecordingMock"
+        and first.get("__id__") == other["id"]
+    )
+
+
+def _encode_durations(
+    durations: dict[int, float], count: int, is_repeated: bool = False, start: int = 0
+) -> List[float | None] | float:
+    """
+    Durations are stored to the microsecond. The accesses of a repeated attribute
+    are replayed from a single value, so they share their mean duration.
+    """
+    if is_repeated:
+        return round(sum(durations.values()) / len(durations), 6)
+    return [
+        None if (duration := durations.get(i)) is None else round(duration, 6)
+        for i in range(start, start + count)
+    ]
+
 
-        return decode_replaying_mock(encoded_interactions)
+_BYTES_SEGMENT_SUFFIX = ".bytes"
+
+
+class FileRecordingSidecarStore(RecordingSidecarStore[EncodingType]):
+    """
+    Stores the segments, blobs and NumPy arrays of a recording next to it, as
+    {recording_filepath}.{content hash}.segment, .blob and .npy files. Blobs and
+    arrays are read back by memory-mapping their file. The names of segments
+    serialized as bytes end with .bytes, so that they are read back as bytes.
+    """
+
+    def __init__(
+        self,
+        serializer: "MockRecordingInteractionSerializer[EncodingType, Any]",
+        recording_filepath: str,
+    ):
+        self._serializer = serializer
+        self._recording_filepath = recording_filepath
+
+    def _get_segment_filepath(self, segment_name: str) -> str:
+        return f"{self._recording_filepath}.{segment_name}.segment"
+
+    def write_segment(self, encoded_segment: EncodingType) -> str:
+        serialized_segment = self._serializer.serialize_encoded_mock_interactions(
+            encoded_segment
+        )
+        is_bytes = isinstance(serialized_segment, bytes)
+        segment_name = hashlib.sha256(
+            serialized_segment if is_bytes else serialized_segment.encode()
+        ).hexdigest()[:32]
+        if is_bytes:
+            segment_name += _BYTES_SEGMENT_SUFFIX
+        with open(
+            self._get_segment_filepath(segment_name), "wb" if is_bytes else "w"
+        ) as file:
+            file.write(serialized_segment)
+        return segment_name
+
+    def read_segment(self, segment_name: str) -> EncodingType:
+        with open(
+            self._get_segment_filepath(segment_name),
+            "rb" if segment_name.endswith(_BYTES_SEGMENT_SUFFIX) else "r",
+        ) as file:
+            serialized_segment = file.read()
+        return self._serializer.deserialize_encoded_mock_interactions(
+            serialized_segment
+        )
+
+    def remove_segment(self, segment_name: str) -> None:
+        segment_filepath = self._get_segment_filepath(segment_name)
+        if os.path.exists(segment_filepath):
+            os.remove(segment_filepath)
+
+    def _get_blob_filepath(self, blob_name: str) -> str:
+        return f"{self._recording_filepath}.{blob_name}.blob"
+
+    def write_blob(self, blob: bytes | bytearray | memoryview) -> str:
+        blob_name = hashlib.sha256(blob).hexdigest()[:32]
+        blob_filepath = self._get_blob_filepath(blob_name)
+        if not os.path.exists(blob_filepath):
+            with open(blob_filepath, "wb") as file:
+                file.write(blob)
+        return blob_name
+
+    def read_blob(self, blob_name: str) -> memoryview:
+        with open(self._get_blob_filepath(blob_name), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(b"")
+            # The map stays valid after the file is closed.
+            return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _get_array_filepath(self, array_name: str) -> str:
+        return f"{self._recording_filepath}.{array_name}.npy"
+
+    def write_array(self, array: Any) -> str:
+        array_name = numpy_arrays.get_array_name(array)
+        array_filepath = self._get_array_filepath(array_name)
+        if not os.path.exists(array_filepath):
+            numpy_arrays.save_array(array_filepath, array)
+        return array_name
+
+    def read_array(self, array_name: str) -> Any:
+        return numpy_arrays.load_array(self._get_array_filepath(array_name))
+
+    def remove_sidecar_files(self) -> None:
+        recording_filepath = glob.escape(self._recording_filepath)
+        for extension in ["segment", "blob", "npy"]:
+            for filepath in glob.glob(f"{recording_filepath}.*.{extension}"):
+                os.remove(filepath)
 
 
 class MockRecordingStore(Generic[EncodingType, SerializedType]):
+    """
+    With use_cache (by default MockRecordingSettings.get_recording_cache()),
+    recordings are loaded from the cache of their encoding when it has one, and
+    added to it otherwise (see mock_isolator.recording_cache).
+
+    The async variants run the file I/O, parsing and decoding in the executor (by
+    default the event loop's), so that independent loads run concurrently with the
+    rest of the event loop.
+    """
+
     def __init__(
         self,
         interaction_encoder: MockRecordingEncoder[EncodingType],
         serializer: MockRecordingInteractionSerializer[EncodingType, SerializedType],
+        use_cache: bool | None = None,
     ) -> None:
         self._interaction_encoder = interaction_encoder
+        self._use_cache = use_cache
         self._serializer: MockRecordingInteractionSerializer[
             EncodingType, SerializedType
         ] = serializer
@@ -273,15 +1080,19 @@ class MockRecordingStore(Generic[EncodingType, SerializedType]):
     def store_recorded_mock_interactions_to_file(
         self, mock: RecordingMock, filepath: str
     ) -> None:
+        sidecar_store = FileRecordingSidecarStore(self._serializer, filepath)
+        sidecar_store.remove_sidecar_files()
         encoded_interactions = (
-            self._interaction_encoder.encode_recording_mock_interactions(mock)
+            self._interaction_encoder.encode_recording_mock_interactions(
+                mock, sidecar_store=sidecar_store
+            )
         )
         if encoded_interactions is None:
             if os.path.exists(filepath):
                 os.remove(filepath)
             return
-        serialized_interactions = self._serializer.serialize_encoded_mock_interactions(
-            encoded_interactions
+        serialized_interactions = add_checksum(
+            self._serializer.serialize_encoded_mock_interactions(encoded_interactions)
         )
         with open(
             filepath, "wb" if isinstance(serialized_interactions, bytes) else "w"
@@ -291,13 +1102,125 @@ class MockRecordingStore(Generic[EncodingType, SerializedType]):
     def load_recorded_mock_interactions_from_file(self, filepath: str) -> ReplayingMock:
         if not os.path.exists(filepath):
             return ReplayingMock(recorded_attribute_accesses={}, recorded_calls=[])
-        with open(filepath, "rb" if SerializedType is bytes else "r") as file:
-            serialized_interactions = file.read()
-        encoded_interactions = self._serializer.deserialize_encoded_mock_interactions(
-            serialized_interactions
+        telemetry = MockRecordingSettings.get_replay_telemetry()
+        if telemetry is None:
+            return self._load_recorded_mock_interactions_from_file(filepath, None)
+        load = telemetry.start_load(filepath)
+        try:
+            return self._load_recorded_mock_interactions_from_file(filepath, load)
+        finally:
+            # Also when the load fails, which would otherwise leave tracemalloc on.
+            telemetry.finish_load(load)
+
+    def _load_recorded_mock_interactions_from_file(  # noqa: C901
+        self, filepath: str, load: RecordingLoad | None
+    ) -> ReplayingMock:
+        sidecar_store = FileRecordingSidecarStore(self._serializer, filepath)
+        replay_coverage = MockRecordingSettings.get_replay_coverage()
+        decoded_mocks = None if load is None else []
+        started_at = time.perf_counter()
+        shared_recording_name = (
+            get_shared_recording_name(filepath)
+            if MockRecordingSettings.get_shared_recordings()
+            else None
+        )
+        if shared_recording_name is not None:
+            shared_recording = read_shared_encoding(shared_recording_name)
+            if shared_recording is not None:
+                recording_checksum, shared_interactions = shared_recording
+                coverage = (
+                    None
+                    if replay_coverage is None
+                    else replay_coverage.add_recording_checksum(
+                        filepath, recording_checksum
+                    )
+                )
+                read_at = time.perf_counter()
+                # Only recordings that were decoded successfully are published.
+                mock = self._interaction_encoder.decode_recording_mock_interactions(
+                    shared_interactions,
+                    sidecar_store=sidecar_store,
+                    trusted=True,
+                    coverage=coverage,
+                    decoded_mocks=decoded_mocks,
+                )
+                if load is not None:
+                    load.source = "shared"
+                    load.read_seconds = read_at - started_at
+                    load.decode_seconds = time.perf_counter() - read_at
+                    load.decoded_mocks = len(decoded_mocks)  # type: ignore
+                return mock
+        serialized_interactions = serialized_recording = read_recording_file(filepath)
+        coverage = (
+            None
+            if replay_coverage is None
+            else replay_coverage.add_recording(filepath, serialized_interactions)
+        )
+        use_cache = (
+            MockRecordingSettings.get_recording_cache()
+            if self._use_cache is None
+            else self._use_cache
         )
-        return self._interaction_encoder.decode_recording_mock_interactions(
-            encoded_interactions
+        encoded_interactions = None
+        if use_cache:
+            cache_filepath = get_cache_filepath(filepath, serialized_interactions)
+            # Only recordings that were decoded successfully are cached.
+            encoded_interactions = read_cached_encoding(cache_filepath)
+        is_cached = encoded_interactions is not None
+        is_trusted = is_cached
+        read_at = time.perf_counter()
+        if not is_cached:
+            serialized_interactions, is_trusted = split_checksum(
+                serialized_interactions
+            )
+            encoded_interactions = (
+                self._serializer.deserialize_encoded_mock_interactions(
+                    serialized_interactions
+                )
+            )
+        parsed_at = time.perf_counter()
+        mock = self._interaction_encoder.decode_recording_mock_interactions(
+            encoded_interactions,  # type: ignore
+            sidecar_store=sidecar_store,
+            trusted=is_trusted,
+            coverage=coverage,
+            decoded_mocks=decoded_mocks,
+        )
+        if load is not None:
+            load.bytes_read = os.path.getsize(filepath)
+            if is_cached:
+                load.source = "cache"
+                load.bytes_read += os.path.getsize(cache_filepath)
+            load.read_seconds = read_at - started_at
+            load.parse_seconds = parsed_at - read_at
+            load.decode_seconds = time.perf_counter() - parsed_at
+            load.decoded_mocks = len(decoded_mocks)  # type: ignore
+        if use_cache and not is_cached:
+            write_cached_encoding(cache_filepath, encoded_interactions)
+        if shared_recording_name is not None:
+            recording_checksum = (
+                get_checksum(serialized_recording)
+                if coverage is None
+                else coverage.checksum
+            )
+            publish_shared_encoding(
+                shared_recording_name, recording_checksum, encoded_interactions
+            )
+        return mock
+
+    async def store_recorded_mock_interactions_to_file_async(
+        self, mock: RecordingMock, filepath: str, executor: Executor | None = None
+    ) -> None:
+        await asyncio.get_running_loop().run_in_executor(
+            executor,
+            partial(self.store_recorded_mock_interactions_to_file, mock, filepath),
+        )
+
+    async def load_recorded_mock_interactions_from_file_async(
+        self, filepath: str, executor: Executor | None = None
+    ) -> ReplayingMock:
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, partial(self.load_recorded_mock_interactions_from_file, filepath)
         )
 
 
@@ -1,3 +1,5 @@
+from mock_isolator.replay_coverage import ReplayCoverage
+from mock_isolator.replay_telemetry import ReplayTelemetry
 from mock_isolator.types import MockIsolatorMode
 
 
@@ -13,6 +15,12 @@ class MockRecordingSettings:
     """
 
     _mode = MockIsolatorMode.REPLAY
+    _replay_latency_scale: float | None = None
+    _replay_latency_max_delay: float | None = None
+    _use_recording_cache = False
+    _replay_coverage: ReplayCoverage | None = None
+    _use_shared_recordings = False
+    _replay_telemetry: ReplayTelemetry | None = None
 
     @classmethod
     def set_mode(cls, mode: MockIsolatorMode):
@@ -21,3 +29,73 @@ class MockRecordingSettings:
     @classmethod
     def get_mode(cls) -> MockIsolatorMode:
         return cls._mode
+
+    @classmethod
+    def set_replay_latency(
+        cls, scale: float | None = 1.0, max_delay: float | None = None
+    ):
+        """
+        Replay the recorded durations of calls and awaited results (see
+        BasicRecordingMocker's record_durations) as delays multiplied by scale and
+        capped at max_delay seconds. A scale of None replays without delays.
+        """
+        cls._replay_latency_scale = scale
+        cls._replay_latency_max_delay = max_delay
+
+    @classmethod
+    def get_replay_delay(cls, recorded_duration: float | None) -> float | None:
+        if cls._replay_latency_scale is None or recorded_duration is None:
+            return None
+        delay = recorded_duration * cls._replay_latency_scale
+        if cls._replay_latency_max_delay is not None:
+            delay = min(delay, cls._replay_latency_max_delay)
+        return delay
+
+    @classmethod
+    def set_recording_cache(cls, enabled: bool):
+        """
+        Load recordings from (and add them to) the cache of their decoded JSON, see
+        mock_isolator.recording_cache.
+        """
+        cls._use_recording_cache = enabled
+
+    @classmethod
+    def get_recording_cache(cls) -> bool:
+        return cls._use_recording_cache
+
+    @classmethod
+    def set_replay_coverage(cls, coverage: ReplayCoverage | None):
+        """
+        Track which recorded interactions are consumed by the recordings loaded from
+        now on, see mock_isolator.replay_coverage. None stops tracking.
+        """
+        cls._replay_coverage = coverage
+
+    @classmethod
+    def get_replay_coverage(cls) -> ReplayCoverage | None:
+        return cls._replay_coverage
+
+    @classmethod
+    def set_shared_recordings(cls, enabled: bool):
+        """
+        Share the recordings parsed by the worker processes of a test session (ie.
+        with pytest-xdist) through shared memory, once the process that starts them
+        started a session, see mock_isolator.shared_recordings.
+        """
+        cls._use_shared_recordings = enabled
+
+    @classmethod
+    def get_shared_recordings(cls) -> bool:
+        return cls._use_shared_recordings
+
+    @classmethod
+    def set_replay_telemetry(cls, telemetry: ReplayTelemetry | None):
+        """
+        Measure how the recordings are loaded from now on, see
+        mock_isolator.replay_telemetry. None stops measuring.
+        """
+        cls._replay_telemetry = telemetry
+
+    @classmethod
+    def get_replay_telemetry(cls) -> ReplayTelemetry | None:
+        return cls._replay_telemetry
@@ -0,0 +1,55 @@
+"""
+Optional NumPy support: arrays are recorded as concrete values when numpy is
+installed (`pip install module_mocking_isolator[numpy]`).
+"""
+
+import hashlib
+import io
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None  # type: ignore
+
+ARRAY_TYPES: tuple[type, ...] = () if np is None else (np.ndarray,)
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ImportError("numpy is required to replay recorded NumPy arrays.")
+    return np
+
+
+def check_array_is_encodable(array: Any) -> None:
+    if array.dtype.hasobject:
+        raise TypeError(
+            "NumPy arrays of Python objects are not supported, since loading them "
+            "would require pickle."
+        )
+
+
+def get_array_name(array: Any) -> str:
+    """A content hash of the array, including its dtype and shape."""
+    hasher = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    hasher.update(np.ascontiguousarray(array).reshape(-1).view(np.uint8))
+    return hasher.hexdigest()[:32]
+
+
+def save_array(filepath: str, array: Any) -> None:
+    np.save(filepath, array, allow_pickle=False)
+
+
+def load_array(filepath: str) -> Any:
+    """Memory-map the array read-only, so that only the pages read are loaded."""
+    return _require_numpy().load(filepath, mmap_mode="r", allow_pickle=False)
+
+
+def array_to_npy_bytes(array: Any) -> bytes:
+    file = io.BytesIO()
+    np.save(file, array, allow_pickle=False)
+    return file.getvalue()
+
+
+def array_from_npy_bytes(data: bytes) -> Any:
+    return _require_numpy().load(io.BytesIO(data), allow_pickle=False)
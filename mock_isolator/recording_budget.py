@@ -0,0 +1,335 @@
+import threading
+import weakref
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterator
+
+from mock_isolator import numpy_arrays
+from mock_isolator.types import RecordingBudgetPolicy
+
+
+class RecordingBudgetExceededError(Exception):
+    """Raised while recording when a budget with the FAIL policy is exceeded."""
+
+
+class RecordingTruncatedError(Exception):
+    """Raised while replaying past the point where a recording was truncated."""
+
+
+class RecordingSampledError(RecordingTruncatedError):
+    """Raised while replaying past the point where a recording was sampled."""
+
+
+class TruncatedRecording:
+    """
+    Recorded in place of the accesses of an attribute (or calls) once a budget with
+    the TRUNCATE policy is exceeded. ReplayingMock raises RecordingTruncatedError when
+    it reaches it.
+    """
+
+    def __repr__(self) -> str:
+        return "TRUNCATED"
+
+
+TRUNCATED = TruncatedRecording()
+
+
+class SampledRecording(TruncatedRecording):
+    """
+    Recorded in place of the first entry of an attribute (or calls) past a budget
+    with the SAMPLE policy. The entries sampled after it are kept to inspect the
+    recording, but the entries between them are missing, so ReplayingMock raises
+    RecordingSampledError when it reaches it.
+    """
+
+    def __repr__(self) -> str:
+        return "SAMPLED"
+
+
+SAMPLED = SampledRecording()
+
+
+class TruncatedList(list):
+    """
+    The first items of a list that was longer than max_container_length. len() is
+    the original length, and reading past the recorded items raises
+    RecordingTruncatedError.
+    """
+
+    def __init__(self, items: list[Any], length: int):
+        super().__init__(items)
+        self.length = length
+
+    @property
+    def recorded_items(self) -> list[Any]:
+        return list.__getitem__(self, slice(None))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from list.__iter__(self)
+        raise RecordingTruncatedError(
+            f"List was truncated to {list.__len__(self)} of {self.length} items while "
+            "recording."
+        )
+
+    def __getitem__(self, index: Any) -> Any:
+        # Negative indexes count from the end, which was not recorded.
+        if isinstance(index, int) and (
+            list.__len__(self) <= index < self.length or -self.length <= index < 0
+        ):
+            raise RecordingTruncatedError(
+                f"Item {index} of a list truncated to {list.__len__(self)} of "
+                f"{self.length} items while recording."
+            )
+        return list.__getitem__(self, index)
+
+    def __repr__(self) -> str:
+        return f"TruncatedList({list.__repr__(self)}, length={self.length})"
+
+
+class TruncatedDict(dict):
+    """
+    The first items of a dict that was longer than max_container_length. Reading a
+    key that was not recorded or iterating past the recorded keys raises
+    RecordingTruncatedError.
+    """
+
+    def __init__(self, items: dict[Any, Any], length: int):
+        super().__init__(items)
+        self.length = length
+
+    def __missing__(self, key: Any) -> Any:
+        raise RecordingTruncatedError(
+            f"Key {key!r} is not in a dict truncated to {dict.__len__(self)} of "
+            f"{self.length} items while recording."
+        )
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from dict.__iter__(self)
+        raise RecordingTruncatedError(
+            f"Dict was truncated to {dict.__len__(self)} of {self.length} items while "
+            "recording."
+        )
+
+    def __repr__(self) -> str:
+        return f"TruncatedDict({dict.__repr__(self)}, length={self.length})"
+
+
+# Returned by RecordingBudget.admit for entries that are not recorded.
+SKIP = object()
+
+
+class _MockBudgetUsage:
+    __slots__ = (
+        "entries",
+        "bytes",
+        "attribute_entries",
+        "attribute_bytes",
+        "attribute_overflows",
+        "truncated_attributes",
+    )
+
+    def __init__(self) -> None:
+        self.entries = 0
+        self.bytes = 0
+        # Keyed by attribute name, or None for the calls of the mock.
+        self.attribute_entries: dict[str | None, int] = {}
+        self.attribute_bytes: dict[str | None, int] = {}
+        self.attribute_overflows: dict[str | None, int] = {}
+        self.truncated_attributes: set[str | None] = set()
+
+
+class RecordingBudget:
+    """
+    Bounds what a recording session (ie. a BasicRecordingMocker and the mocks it
+    creates) keeps in memory. Every recorded attribute access or call is an entry,
+    and its encoded size is estimated as it is recorded. The limits apply per
+    attribute (or to the calls of a mock), per mock and per session, and lists and
+    dicts longer than max_container_length are cut down as they are recorded.
+
+    When a limit is exceeded, the policy decides:
+      - FAIL raises RecordingBudgetExceededError in the code being recorded.
+      - TRUNCATE records a TRUNCATED marker in place of the attribute's remaining
+        entries and keeps the first max_container_length items of containers, so
+        replaying past them raises RecordingTruncatedError.
+      - SAMPLE records a SAMPLED marker in place of the first entry past the limit,
+        then keeps the 2nd, 4th, 8th, ... entry past it, so that the recording
+        grows logarithmically, and an evenly spaced sample of containers. The
+        sampled entries are only kept to inspect the recording (ie. with
+        mock_isolator.analyze): replaying past the marker raises
+        RecordingSampledError.
+
+    The values returned to the code being recorded are never affected.
+    """
+
+    def __init__(
+        self,
+        max_entries_per_attribute: int | None = None,
+        max_entries_per_mock: int | None = None,
+        max_entries_per_session: int | None = None,
+        max_bytes_per_attribute: int | None = None,
+        max_bytes_per_mock: int | None = None,
+        max_bytes_per_session: int | None = None,
+        max_container_length: int | None = None,
+        policy: RecordingBudgetPolicy = RecordingBudgetPolicy.FAIL,
+    ):
+        self.max_entries_per_attribute = max_entries_per_attribute
+        self.max_entries_per_mock = max_entries_per_mock
+        self.max_entries_per_session = max_entries_per_session
+        self.max_bytes_per_attribute = max_bytes_per_attribute
+        self.max_bytes_per_mock = max_bytes_per_mock
+        self.max_bytes_per_session = max_bytes_per_session
+        self.max_container_length = max_container_length
+        self.policy = policy
+        self.session_entries = 0
+        self.session_bytes = 0
+        self._lock = threading.Lock()
+        # Keyed by the id of the mock, and removed once the mock is collected.
+        self._mock_usage: dict[int, _MockBudgetUsage] = {}
+
+    def admit(self, mock: Any, name: str | None, value: Any) -> Any:
+        """
+        Account for an entry of the mock's attribute (or a call when name is None)
+        and return the value to record, TRUNCATED, SAMPLED or SKIP.
+        """
+        if self.max_container_length is not None:
+            value = self._limit_containers(value)
+        size = (
+            estimate_encoded_size(value)
+            if self.max_bytes_per_attribute is not None
+            or self.max_bytes_per_mock is not None
+            or self.max_bytes_per_session is not None
+            else 0
+        )
+        with self._lock:
+            usage = self._mock_usage.get(id(mock))
+            if usage is None:
+                usage = self._mock_usage[id(mock)] = _MockBudgetUsage()
+                # Without the lock, since the mock may be collected while it is held.
+                weakref.finalize(mock, self._mock_usage.pop, id(mock), None)
+            if name in usage.truncated_attributes:
+                return SKIP
+            exceeded = self._find_exceeded_limit(name, usage, size)
+            if exceeded is not None:
+                if self.policy is RecordingBudgetPolicy.FAIL:
+                    raise RecordingBudgetExceededError(
+                        f"Recording budget {exceeded} exceeded by "
+                        f"{_describe_entry(mock, name)}."
+                    )
+                if self.policy is RecordingBudgetPolicy.TRUNCATE:
+                    usage.truncated_attributes.add(name)
+                    return TRUNCATED
+                overflows = usage.attribute_overflows.get(name, 0) + 1
+                usage.attribute_overflows[name] = overflows
+                if overflows & (overflows - 1):
+                    return SKIP
+                if overflows == 1:
+                    value = SAMPLED
+                    size = estimate_encoded_size(value)
+            usage.attribute_entries[name] = usage.attribute_entries.get(name, 0) + 1
+            usage.attribute_bytes[name] = usage.attribute_bytes.get(name, 0) + size
+            usage.entries += 1
+            usage.bytes += size
+            self.session_entries += 1
+            self.session_bytes += size
+        return value
+
+    def _find_exceeded_limit(
+        self, name: str | None, usage: _MockBudgetUsage, size: int
+    ) -> str | None:
+        for limit_name, limit, used in [
+            (
+                "max_entries_per_attribute",
+                self.max_entries_per_attribute,
+                usage.attribute_entries.get(name, 0) + 1,
+            ),
+            ("max_entries_per_mock", self.max_entries_per_mock, usage.entries + 1),
+            (
+                "max_entries_per_session",
+                self.max_entries_per_session,
+                self.session_entries + 1,
+            ),
+            (
+                "max_bytes_per_attribute",
+                self.max_bytes_per_attribute,
+                usage.attribute_bytes.get(name, 0) + size,
+            ),
+            ("max_bytes_per_mock", self.max_bytes_per_mock, usage.bytes + size),
+            (
+                "max_bytes_per_session",
+                self.max_bytes_per_session,
+                self.session_bytes + size,
+            ),
+        ]:
+            if limit is not None and used > limit:
+                return f"{limit_name}={limit}"
+        return None
+
+    def _limit_containers(self, value: Any) -> Any:
+        max_length = self.max_container_length
+        assert max_length is not None
+        if isinstance(value, (list, dict)) and len(value) > max_length:
+            if self.policy is RecordingBudgetPolicy.FAIL:
+                raise RecordingBudgetExceededError(
+                    f"Recording budget max_container_length={max_length} exceeded by "
+                    f"a {type(value).__name__} of {len(value)} items."
+                )
+            if isinstance(value, list):
+                if self.policy is RecordingBudgetPolicy.TRUNCATE:
+                    return TruncatedList(
+                        [self._limit_containers(i) for i in value[:max_length]],
+                        len(value),
+                    )
+                step = -(-len(value) // max_length)
+                return [self._limit_containers(i) for i in value[::step]]
+            items = list(value.items())
+            if self.policy is RecordingBudgetPolicy.TRUNCATE:
+                return TruncatedDict(
+                    {k: self._limit_containers(v) for k, v in items[:max_length]},
+                    len(value),
+                )
+            step = -(-len(value) // max_length)
+            return {k: self._limit_containers(v) for k, v in items[::step]}
+        if isinstance(value, list):
+            return [self._limit_containers(i) for i in value]
+        if isinstance(value, dict):
+            return {k: self._limit_containers(v) for k, v in value.items()}
+        if isinstance(value, tuple):
+            return tuple(self._limit_containers(i) for i in value)
+        return value
+
+
+def estimate_encoded_size(value: Any) -> int:
+    """
+    A cheap estimate of the size of the value once encoded as JSON. Nested mocks
+    count as their own entries, so only their reference is counted here.
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, (bool, int, float)) or value is None:
+        return 8
+    if isinstance(value, (Decimal, date)):
+        return 48
+    if isinstance(value, (bytes, bytearray)):
+        # Inlined as base64.
+        return len(value) * 4 // 3 + 40
+    if isinstance(value, memoryview) or isinstance(value, numpy_arrays.ARRAY_TYPES):
+        return value.nbytes * 4 // 3 + 40
+    if isinstance(value, dict):
+        return 2 + sum(
+            estimate_encoded_size(k) + estimate_encoded_size(v) + 2
+            for k, v in value.items()
+        )
+    if isinstance(value, TruncatedList):
+        return 48 + sum(estimate_encoded_size(i) + 1 for i in value.recorded_items)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return 32 + sum(estimate_encoded_size(i) + 1 for i in value)
+    return 32
+
+
+def _describe_entry(mock: Any, name: str | None) -> str:
+    wrapped_item = object.__getattribute__(mock, "_wrapped_item")
+    target = getattr(wrapped_item, "__name__", type(wrapped_item).__name__)
+    return f"the calls of {target}" if name is None else f"{target}.{name}"
@@ -0,0 +1,104 @@
+"""
+A cache of recordings in their decoded JSON form, so that replaying loads each one
+with a single marshal.loads rather than parsing its JSON. Enable it with
+MockRecordingSettings.set_recording_cache(True), and warm it ahead of the tests (ie.
+in CI) with:
+
+    python -m mock_isolator.recording_cache tests/recordings/ tests/test_foo_files/
+
+Each argument is a directory or a recording_filepath_prefix, as for
+mock_isolator.analyze. Like .pyc files in __pycache__, cached recordings are stored
+in a __mockcache__ directory next to the recordings, and keyed by the hash of the
+recording file, the mock_isolator version and the Python implementation, so that
+they are never stale.
+"""
+
+import argparse
+import glob
+import hashlib
+import marshal
+import os
+import sys
+from typing import Any
+
+from mock_isolator import __version__
+
+RECORDING_CACHE_DIRNAME = "__mockcache__"
+
+
+def get_cache_filepath(recording_filepath: str, serialized: str | bytes) -> str:
+    hasher = hashlib.sha256(
+        f"{__version__}:{sys.implementation.cache_tag}:{marshal.version}\n".encode()
+    )
+    hasher.update(serialized if isinstance(serialized, bytes) else serialized.encode())
+    directory, filename = os.path.split(recording_filepath)
+    return os.path.join(
+        directory,
+        RECORDING_CACHE_DIRNAME,
+        f"{filename}.{hasher.hexdigest()[:32]}.marshal",
+    )
+
+
+def read_cached_encoding(cache_filepath: str) -> Any | None:
+    """The cached encoding, or None when the recording is not cached."""
+    try:
+        with open(cache_filepath, "rb") as file:
+            return marshal.loads(file.read())
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+        # ie. a cache file truncated by an interrupted run.
+        return None
+
+
+def write_cached_encoding(cache_filepath: str, encoding: Any) -> None:
+    """Cache the encoding, replacing those cached for older versions of the file."""
+    directory, filename = os.path.split(cache_filepath)
+    recording_filename = filename.rsplit(".", 2)[0]
+    os.makedirs(directory, exist_ok=True)
+    for stale_filepath in glob.glob(
+        os.path.join(
+            glob.escape(directory), f"{glob.escape(recording_filename)}.*.marshal"
+        )
+    ):
+        if stale_filepath != cache_filepath:
+            os.remove(stale_filepath)
+    # Written to a temporary file first, since tests running in parallel may read it.
+    temporary_filepath = f"{cache_filepath}.{os.getpid()}.tmp"
+    with open(temporary_filepath, "wb") as file:
+        file.write(marshal.dumps(encoding))
+    os.replace(temporary_filepath, cache_filepath)
+
+
+def warm_recording_cache(paths: list[str]) -> int:
+    """Cache the recordings found in the paths and return how many there were."""
+    from mock_isolator.analyze import iter_recording_filepaths
+    from mock_isolator.mock_recording_encoder import (
+        DictMockRecordingEncoder,
+        JsonMockRecordingInteractionSerializer,
+        MockRecordingStore,
+    )
+
+    recording_store = MockRecordingStore(
+        DictMockRecordingEncoder(),
+        JsonMockRecordingInteractionSerializer(),
+        use_cache=True,
+    )
+    count = 0
+    for _, filepath in iter_recording_filepaths(paths):
+        recording_store.load_recorded_mock_interactions_from_file(filepath)
+        count += 1
+    return count
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mock_isolator.recording_cache")
+    parser.add_argument(
+        "paths", nargs="+", help="Recording directories or filepath prefixes."
+    )
+    args = parser.parse_args(argv)
+    count = warm_recording_cache(args.paths)
+    print(f"Cached {count} recordings.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Recordings written by MockRecordingStore hold the sha256 of their serialization as
+the first key of their root object, so that they stay JSON:
+
+    {
+      "__sha256__": "5f2b...",
+      "__type__": "RecordingMock",
+      ...
+    }
+
+The checksum is that of the file without the __sha256__ key, which is found without
+parsing the file. When it matches on load, the recording was written as is by the
+store, so it is decoded without validating its structure. Recordings without a
+checksum (ie. written by hand or by older versions) or edited since they were
+written are validated.
+"""
+
+import hashlib
+import re
+from typing import Tuple, TypeVar
+
+CHECKSUM_KEY = "__sha256__"
+
+SerializedType = TypeVar("SerializedType", str, bytes)
+
+_CHECKSUM_PATTERN = re.compile(r'\{(\s*)"__sha256__": ?"([0-9a-f]{64})",')
+_BYTES_CHECKSUM_PATTERN = re.compile(_CHECKSUM_PATTERN.pattern.encode())
+
+
+def get_checksum(serialized: str | bytes) -> str:
+    if isinstance(serialized, str):
+        serialized = serialized.encode()
+    return hashlib.sha256(serialized).hexdigest()
+
+
+def add_checksum(serialized: SerializedType) -> SerializedType:
+    """
+    The serialized recording with its checksum as the first key of its root object,
+    indented as its other keys. Serializations that are not a non-empty JSON object
+    are returned as they are.
+    """
+    is_bytes = isinstance(serialized, bytes)
+    rest = serialized[1:]
+    keys = rest.lstrip()
+    if serialized[:1] != (b"{" if is_bytes else "{") or keys[:1] in ("}", b"}"):
+        return serialized
+    whitespace = rest[: len(rest) - len(keys)]
+    if is_bytes:
+        whitespace = whitespace.decode()  # type: ignore
+    checksum_entry = f'{whitespace}"{CHECKSUM_KEY}": "{get_checksum(serialized)}",'
+    if is_bytes:
+        return b"{" + checksum_entry.encode() + rest  # type: ignore
+    return "{" + checksum_entry + rest  # type: ignore
+
+
+def split_checksum(serialized: SerializedType) -> Tuple[SerializedType, bool]:
+    """
+    The serialized recording without its checksum, and whether the checksum
+    matched. Recordings without a checksum are returned as they are.
+    """
+    pattern = (
+        _BYTES_CHECKSUM_PATTERN if isinstance(serialized, bytes) else _CHECKSUM_PATTERN
+    )
+    match = pattern.match(serialized)  # type: ignore
+    if match is None:
+        return serialized, False
+    body = serialized[:1] + serialized[match.end() :]
+    checksum = match.group(2)
+    if isinstance(checksum, bytes):
+        checksum = checksum.decode()
+    return body, checksum == get_checksum(body)  # type: ignore
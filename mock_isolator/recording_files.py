@@ -0,0 +1,44 @@
+"""
+Reading and writing recording files. Recordings may be gzip-compressed (see
+mock_isolator.convert). They keep their .json filenames, and are told apart by the
+gzip magic number.
+"""
+
+import gzip
+import io
+import os
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_compressed_recording(content: bytes) -> bool:
+    return content[: len(GZIP_MAGIC)] == GZIP_MAGIC
+
+
+def compress_recording(serialized: bytes) -> bytes:
+    # Without a timestamp, so that compressing the same recording gives the same file.
+    return gzip.compress(serialized, mtime=0)
+
+
+def decompress_recording(content: bytes) -> bytes:
+    return gzip.decompress(content) if is_compressed_recording(content) else content
+
+
+def read_recording_file(filepath: str) -> str:
+    """The serialized recording, decompressed when the file is compressed."""
+    with open(filepath, "rb") as file:
+        if is_compressed_recording(file.peek(len(GZIP_MAGIC))):
+            return gzip.decompress(file.read()).decode()
+        # Read as text, like the files written by MockRecordingStore.
+        return io.TextIOWrapper(file).read()
+
+
+def replace_recording_file(filepath: str, content: bytes) -> None:
+    """
+    Replace the file atomically, so that an interrupted rewrite leaves the previous
+    recording rather than a partial one.
+    """
+    temporary_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(temporary_filepath, "wb") as file:
+        file.write(content)
+    os.replace(temporary_filepath, filepath)
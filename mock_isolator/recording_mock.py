@@ -1,83 +1,195 @@
 from abc import ABC, abstractmethod
-from datetime import date, datetime
-from decimal import Decimal
-from types import TracebackType
-from typing import Any, Tuple, Type
+from types import MethodType, TracebackType
+from typing import Any, Callable, Tuple, Type
 import asyncio
+import threading
+import time
+import weakref
 
-from bson import ObjectId
+from mock_isolator.recording_budget import SKIP, RecordingBudget, TruncatedRecording
+from mock_isolator.streams import get_stream_key
+from mock_isolator.type_codecs import DEFAULT_CODEC_REGISTRY, CodecRegistry
 
 
 class RecordingMocker(ABC):
+    # Whether RecordingMocks measure how long calls and awaited results take.
+    record_durations: bool = False
+    # Bounds what RecordingMocks keep in memory, see RecordingBudget.
+    budget: RecordingBudget | None = None
+
     @abstractmethod
     def wrap_item_with_recording_mocks(self, item: Any) -> Any:
         pass
 
 
+# The attributes of a RecordingMock itself, rather than of the wrapped item.
+_RECORDING_MOCK_STATE = frozenset(
+    {
+        "_wrapped_item",
+        "_mocker",
+        "_lock",
+        "recorded_attribute_accesses",
+        "recorded_async_attribute_access_indexes",
+        "recorded_attribute_access_stream_keys",
+        "recorded_attribute_access_durations",
+        "recorded_calls",
+        "recorded_call_stream_keys",
+        "recorded_call_durations",
+    }
+)
+_RECORDING_MOCK_ATTRIBUTES = _RECORDING_MOCK_STATE | {
+    "_record_attribute_access",
+    "__class__",
+    "__dict__",
+    "__getattribute__",
+}
+
+# Whether the callable attributes are coroutine functions, per type of the wrapped
+# item and attribute name. Each entry holds a weak reference to the function it was
+# computed for, so it is ignored once the attribute is overridden (ie. on the
+# instance, or by patching the class).
+_coroutine_functions: weakref.WeakKeyDictionary[
+    type, dict[str, Tuple[weakref.ref[Any], bool]]
+] = weakref.WeakKeyDictionary()
+
+
+def _is_coroutine_function(item: Any, name: str, attribute: Any) -> bool:
+    function = attribute.__func__ if type(attribute) is MethodType else attribute
+    item_type = type(item)
+    attributes = _coroutine_functions.get(item_type)
+    if attributes is None:
+        attributes = _coroutine_functions.setdefault(item_type, {})
+    entry = attributes.get(name)
+    if entry is not None and entry[0]() is function:
+        return entry[1]
+    is_coroutine_function = asyncio.iscoroutinefunction(attribute)
+    try:
+        attributes[name] = (weakref.ref(function), is_coroutine_function)
+    except TypeError:
+        # ie. callable objects that do not support weak references.
+        pass
+    return is_coroutine_function
+
+
 class RecordingMock:
     """
     Wrap an item (ie. class, function, module, etc.) in a mock that will record the
     values it returns. The returned values are also wrapped in a RecordingMock by using
-    the mocker.
+    the mocker. Items whose type has iteration or container methods are wrapped in a
+    subclass that records them, see _RecordingSpecialMethods.
     """
 
+    def __new__(cls, wrapped_item: Any, mocker: RecordingMocker) -> "RecordingMock":
+        if cls is RecordingMock:
+            cls = _get_recording_mock_class(type(wrapped_item))
+        return object.__new__(cls)
+
     def __init__(self, wrapped_item: Any, mocker: RecordingMocker):
         self._wrapped_item = wrapped_item
         self._mocker = mocker
+        self._lock = threading.Lock()
         self.recorded_attribute_accesses: dict[str, list[Any]] = {}
         self.recorded_async_attribute_access_indexes: dict[str, set[int]] = {}
+        self.recorded_attribute_access_stream_keys: dict[str, dict[int, str]] = {}
+        self.recorded_attribute_access_durations: dict[str, dict[int, float]] = {}
         self.recorded_calls: list[Tuple[Tuple[Any, ...], dict[str, Any]]] = []
+        self.recorded_call_stream_keys: dict[int, str] = {}
+        self.recorded_call_durations: dict[int, float] = {}
 
     def __getattribute__(self, name: str) -> Any:
-        if name in [
-            "_wrapped_item",
-            "recorded_attribute_accesses",
-            "recorded_async_attribute_access_indexes",
-            "recorded_calls",
-            "_mocker",
-            "__class__",
-            "__dict__",
-            "__getattribute__",
-        ]:
+        if name in _RECORDING_MOCK_ATTRIBUTES:
             return object.__getattribute__(self, name)
         wrapped_item = object.__getattribute__(self, "_wrapped_item")
         attribute = getattr(wrapped_item, name)
         
         # Handle coroutines
-        if callable(attribute) and asyncio.iscoroutinefunction(attribute):
+        if callable(attribute) and _is_coroutine_function(
+            wrapped_item, name, attribute
+        ):
             async def wrapped_coroutine(*args, **kwargs):
+                started_at = time.perf_counter()
                 result = await attribute(*args, **kwargs)
+                duration = time.perf_counter() - started_at
                 wrapped_result = self._mocker.wrap_item_with_recording_mocks(item=result)
-                if name not in self.recorded_attribute_accesses:
-                    self.recorded_attribute_accesses[name] = []
-                    self.recorded_async_attribute_access_indexes[name] = set()
-                self.recorded_async_attribute_access_indexes[name].add(len(self.recorded_attribute_accesses[name]))
-                self.recorded_attribute_accesses[name].append(wrapped_result)
+                self._record_attribute_access(
+                    name, wrapped_result, is_async=True, duration=duration
+                )
                 return wrapped_result
             return wrapped_coroutine
             
         wrapped_attribute = self._mocker.wrap_item_with_recording_mocks(item=attribute)
-        if name not in self.recorded_attribute_accesses:
-            self.recorded_attribute_accesses[name] = []
-        self.recorded_attribute_accesses[name].append(wrapped_attribute)
+        self._record_attribute_access(name, wrapped_attribute)
         return wrapped_attribute
 
     def __setattr__(self, name: str, value: Any) -> None:
-        if name in [
-            "_wrapped_item",
-            "_mocker",
-            "recorded_attribute_accesses",
-            "recorded_async_attribute_access_indexes",
-            "recorded_calls",
-        ]:
+        if name in _RECORDING_MOCK_STATE:
             object.__setattr__(self, name, value)
         else:
             setattr(self._wrapped_item, name, value)
 
+    def _record_attribute_access(
+        self,
+        name: str,
+        value: Any,
+        is_async: bool = False,
+        duration: float | None = None,
+    ) -> None:
+        """
+        Append the value to the attribute's accesses, tagged with the stream key of
+        the running task or thread (see mock_isolator.streams) when there is one, and
+        with how long it took when the mocker records durations. The mocker's budget
+        may skip the value or record a TRUNCATED or SAMPLED marker instead.
+        """
+        budget = self._mocker.budget
+        if budget is not None:
+            value = budget.admit(self, name, value)
+            if value is SKIP:
+                return
+            if isinstance(value, TruncatedRecording):
+                is_async = False
+        key = get_stream_key()
+        with self._lock:
+            accesses = self.recorded_attribute_accesses.setdefault(name, [])
+            if is_async:
+                self.recorded_async_attribute_access_indexes.setdefault(
+                    name, set()
+                ).add(len(accesses))
+            if key is not None:
+                self.recorded_attribute_access_stream_keys.setdefault(name, {})[
+                    len(accesses)
+                ] = key
+            if duration is not None and self._mocker.record_durations:
+                self.recorded_attribute_access_durations.setdefault(name, {})[
+                    len(accesses)
+                ] = duration
+            accesses.append(value)
+
     def __call__(self, *args: Any, **kwargs: dict[str, Any]) -> Any:
+        started_at = time.perf_counter()
         result = self._wrapped_item(*args, **kwargs)
+        duration = time.perf_counter() - started_at
         wrapped_result = self._mocker.wrap_item_with_recording_mocks(item=result)
-        self.recorded_calls.append(((args, kwargs), wrapped_result))
+        recorded_call = ((args, kwargs), wrapped_result)
+        budget = self._mocker.budget
+        if budget is not None:
+            recorded_result = budget.admit(self, None, wrapped_result)
+            if recorded_result is SKIP:
+                return wrapped_result
+            recorded_call = (
+                (
+                    ((), {})
+                    if isinstance(recorded_result, TruncatedRecording)
+                    else (args, kwargs)
+                ),
+                recorded_result,
+            )
+        key = get_stream_key()
+        with self._lock:
+            if key is not None:
+                self.recorded_call_stream_keys[len(self.recorded_calls)] = key
+            if self._mocker.record_durations:
+                self.recorded_call_durations[len(self.recorded_calls)] = duration
+            self.recorded_calls.append(recorded_call)
         return wrapped_result
 
     def __get__(self, instance: Any | None, owner: Type[Any] | None = None) -> Any:
@@ -86,7 +198,7 @@ class RecordingMock:
     async def __aenter__(self) -> Any:
         result = await self._wrapped_item.__aenter__()
         wrapped_result = self._mocker.wrap_item_with_recording_mocks(result)
-        self.recorded_attribute_accesses.setdefault("__aenter__", []).append(wrapped_result)
+        self._record_attribute_access("__aenter__", wrapped_result)
         return wrapped_result
 
     async def __aexit__(
@@ -96,13 +208,13 @@ class RecordingMock:
         exc_tb: TracebackType | None,
     ) -> bool:
         result = await self._wrapped_item.__aexit__(exc_type, exc_val, exc_tb)
-        self.recorded_attribute_accesses.setdefault("__aexit__", []).append(result)
+        self._record_attribute_access("__aexit__", result)
         return result
 
     def __enter__(self) -> Any:
         result = self._wrapped_item.__enter__()
         wrapped_result = self._mocker.wrap_item_with_recording_mocks(result)
-        self.recorded_attribute_accesses.setdefault("__enter__", []).append(wrapped_result)
+        self._record_attribute_access("__enter__", wrapped_result)
         return wrapped_result
 
     def __exit__(
@@ -112,46 +224,170 @@ class RecordingMock:
         exc_tb: TracebackType | None,
     ) -> bool:
         result = self._wrapped_item.__exit__(exc_type, exc_val, exc_tb)
-        self.recorded_attribute_accesses.setdefault("__exit__", []).append(result)
+        self._record_attribute_access("__exit__", result)
         return result
 
     def __aiter__(self) -> Any:
         aiter_value = aiter(self._wrapped_item)
         wrapped_aiter = self._mocker.wrap_item_with_recording_mocks(item=aiter_value)
-        if "__aiter__" not in self.recorded_attribute_accesses:
-            self.recorded_attribute_accesses["__aiter__"] = []
-            self.recorded_async_attribute_access_indexes["__aiter__"] = set()
-        self.recorded_async_attribute_access_indexes["__aiter__"].add(len(self.recorded_attribute_accesses["__aiter__"]))
-        self.recorded_attribute_accesses["__aiter__"].append(wrapped_aiter)
+        self._record_attribute_access("__aiter__", wrapped_aiter, is_async=True)
         return wrapped_aiter
 
     async def __anext__(self) -> Any:
+        started_at = time.perf_counter()
         try:
             result = await anext(self._wrapped_item)
             wrapped_result = self._mocker.wrap_item_with_recording_mocks(item=result)
-            if "__anext__" not in self.recorded_attribute_accesses:
-                self.recorded_attribute_accesses["__anext__"] = []
-                self.recorded_async_attribute_access_indexes["__anext__"] = set()
-            self.recorded_async_attribute_access_indexes["__anext__"].add(len(self.recorded_attribute_accesses["__anext__"]))
-            self.recorded_attribute_accesses["__anext__"].append(wrapped_result)
+            self._record_attribute_access(
+                "__anext__",
+                wrapped_result,
+                is_async=True,
+                duration=time.perf_counter() - started_at,
+            )
             return wrapped_result
         except StopAsyncIteration:
-            if "__anext__" not in self.recorded_attribute_accesses:
-                self.recorded_attribute_accesses["__anext__"] = []
-                self.recorded_async_attribute_access_indexes["__anext__"] = set()
-            self.recorded_async_attribute_access_indexes["__anext__"].add(len(self.recorded_attribute_accesses["__anext__"]))
-            self.recorded_attribute_accesses["__anext__"].append(StopAsyncIteration())
+            self._record_attribute_access(
+                "__anext__",
+                StopAsyncIteration(),
+                is_async=True,
+                duration=time.perf_counter() - started_at,
+            )
             raise
 
 
+class _RecordingSpecialMethods:
+    """
+    The special methods that a RecordingMock only has when the type of its wrapped
+    item has them, so that checks like isinstance(mock, Iterable) or
+    hasattr(mock, "__len__") give the same answer as with the wrapped item.
+    """
+
+    def __iter__(self) -> Any:
+        iterator = iter(self._wrapped_item)
+        wrapped_iterator = self._mocker.wrap_item_with_recording_mocks(item=iterator)
+        self._record_attribute_access("__iter__", wrapped_iterator)
+        return wrapped_iterator
+
+    def __next__(self) -> Any:
+        started_at = time.perf_counter()
+        try:
+            result = next(self._wrapped_item)
+        except StopIteration:
+            self._record_attribute_access(
+                "__next__",
+                StopIteration(),
+                duration=time.perf_counter() - started_at,
+            )
+            raise
+        duration = time.perf_counter() - started_at
+        wrapped_result = self._mocker.wrap_item_with_recording_mocks(item=result)
+        self._record_attribute_access("__next__", wrapped_result, duration=duration)
+        return wrapped_result
+
+    def __len__(self) -> int:
+        result = len(self._wrapped_item)
+        self._record_attribute_access("__len__", result)
+        return result
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            result = self._wrapped_item[key]
+        except (KeyError, IndexError) as error:
+            self._record_attribute_access("__getitem__", error)
+            raise
+        wrapped_result = self._mocker.wrap_item_with_recording_mocks(item=result)
+        self._record_attribute_access("__getitem__", wrapped_result)
+        return wrapped_result
+
+    def __contains__(self, item: Any) -> bool:
+        result = item in self._wrapped_item
+        self._record_attribute_access("__contains__", result)
+        return result
+
+    def __bool__(self) -> bool:
+        result = bool(self._wrapped_item)
+        self._record_attribute_access("__bool__", result)
+        return result
+
+
+# The special methods of _RecordingSpecialMethods, and those of the wrapped type
+# that they depend on. Truthiness falls back to __len__, so __bool__ is recorded
+# for types that only have __len__.
+_OPTIONAL_SPECIAL_METHODS = {
+    "__iter__": ("__iter__",),
+    "__next__": ("__next__",),
+    "__len__": ("__len__",),
+    "__getitem__": ("__getitem__",),
+    "__contains__": ("__contains__",),
+    "__bool__": ("__bool__", "__len__"),
+}
+# The special methods of the RecordingMocks of each wrapped type.
+_special_method_names: weakref.WeakKeyDictionary[type, frozenset[str]] = (
+    weakref.WeakKeyDictionary()
+)
+# The subclass of RecordingMock with each set of special methods.
+_recording_mock_classes: dict[frozenset[str], type] = {}
+
+
+def _get_recording_mock_class(wrapped_type: type) -> type:
+    names = _special_method_names.get(wrapped_type)
+    if names is None:
+        names = frozenset(
+            name
+            for name, required_names in _OPTIONAL_SPECIAL_METHODS.items()
+            if any(hasattr(wrapped_type, n) for n in required_names)
+        )
+        _special_method_names[wrapped_type] = names
+    if not names:
+        return RecordingMock
+    recording_mock_class = _recording_mock_classes.get(names)
+    if recording_mock_class is None:
+        recording_mock_class = _recording_mock_classes.setdefault(
+            names,
+            type(
+                "RecordingMock",
+                (RecordingMock,),
+                {name: vars(_RecordingSpecialMethods)[name] for name in sorted(names)},
+            ),
+        )
+    return recording_mock_class
+
+
 class BasicRecordingMocker(RecordingMocker):
+    """
+    By default, the values of the types with a concrete codec in codec_registry
+    (see type_codecs) are returned as they are, and others are wrapped in a
+    RecordingMock.
+
+    With preserve_identity, an object returned more than once (ie. the same ORM
+    instance reached through different relations) is wrapped in the same
+    RecordingMock, so its interactions are recorded once and the encoder can refer
+    to it instead of encoding it again. Only use it for a mocker that wraps a single
+    dependency: each recording file gets its own copy of a shared mock, so an
+    object shared by several dependencies would replay the interactions of all of
+    them through each one.
+    """
+
     def __init__(
         self,
         concrete_types: list[Type] | None = None,
         additional_concrete_types: list[Type] | None = None,
+        record_durations: bool = False,
+        budget: RecordingBudget | None = None,
+        preserve_identity: bool = False,
+        codec_registry: CodecRegistry | None = None,
     ):
+        self.record_durations = record_durations
+        self.budget = budget
+        self._preserve_identity = preserve_identity
+        # Keyed by the id of the wrapped object. A mock keeps its wrapped object
+        # alive, so the id cannot be reused until the mock is collected, and the
+        # entry is removed then.
+        self._recording_mocks: dict[int, weakref.ref[RecordingMock]] = {}
+        # Reentrant since a collection within the lock may run the weakref callback.
+        self._recording_mocks_lock = threading.RLock()
         _concrete_types = (
-            [int, str, float, bool, type(None), Decimal, date, datetime, ObjectId]
+            [*(codec_registry or DEFAULT_CODEC_REGISTRY).concrete_types]
             if concrete_types is None
             else [*concrete_types]
         )
@@ -174,5 +410,29 @@ class BasicRecordingMocker(RecordingMocker):
             return frozenset(
                 {self.wrap_item_with_recording_mocks(item) for item in item}
             )
+        elif self._preserve_identity:
+            return self._get_recording_mock(item)
         else:
             return RecordingMock(wrapped_item=item, mocker=self)
+
+    def _get_recording_mock(self, item: Any) -> RecordingMock:
+        key = id(item)
+        with self._recording_mocks_lock:
+            mock_ref = self._recording_mocks.get(key)
+            mock = None if mock_ref is None else mock_ref()
+            if mock is None:
+                mock = RecordingMock(wrapped_item=item, mocker=self)
+                self._recording_mocks[key] = weakref.ref(
+                    mock, self._get_mock_collected_callback(key)
+                )
+            return mock
+
+    def _get_mock_collected_callback(
+        self, key: int
+    ) -> Callable[["weakref.ref[RecordingMock]"], None]:
+        def remove_collected_mock(mock_ref: "weakref.ref[RecordingMock]") -> None:
+            with self._recording_mocks_lock:
+                if self._recording_mocks.get(key) is mock_ref:
+                    del self._recording_mocks[key]
+
+        return remove_collected_mock
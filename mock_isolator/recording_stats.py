@@ -0,0 +1,136 @@
+import json
+import math
+from typing import Any
+
+from mock_isolator.recording_budget import TruncatedList
+from mock_isolator.recording_mock import RecordingMock
+
+RECORDING_STATS_FILENAME = "__recording_stats__.json"
+
+
+class _InteractionStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.durations: list[float] = []
+        self.payload_bytes = 0
+
+    def add(self, value: Any, duration: float | None) -> None:
+        self.count += 1
+        if duration is not None:
+            self.durations.append(duration)
+        self.payload_bytes += _payload_size(value)
+
+    def merge(self, other: "_InteractionStats") -> None:
+        self.count += other.count
+        self.durations.extend(other.durations)
+        self.payload_bytes += other.payload_bytes
+
+    def to_dict(self) -> dict[str, Any]:
+        durations = sorted(self.durations)
+        return {
+            "count": self.count,
+            "timed_count": len(durations),
+            "total_seconds": round(sum(durations), 6),
+            "p50_seconds": _percentile(durations, 50),
+            "p99_seconds": _percentile(durations, 99),
+            "payload_bytes": self.payload_bytes,
+        }
+
+
+def collect_recording_stats(mocks: dict[str, RecordingMock]) -> dict[str, Any]:
+    """
+    Summarize the interactions recorded by each top-level mock (keyed by its patch
+    path or dependency name): call counts, total, p50 and p99 latency and the
+    JSON size of the returned values. Each attribute is reported by its path from
+    the top-level mock, ie. "get().json" for `mock.get(...).json`. Latency is only
+    available for calls and awaited results recorded with record_durations.
+    """
+    patch_paths: dict[str, Any] = {}
+    for patch_path, mock in mocks.items():
+        attribute_stats = _collect_attribute_stats(mock)
+        total = _InteractionStats()
+        for stats in attribute_stats.values():
+            total.merge(stats)
+        patch_paths[patch_path] = {
+            **total.to_dict(),
+            "attributes": {
+                path: stats.to_dict()
+                for path, stats in sorted(
+                    attribute_stats.items(),
+                    key=lambda item: (-sum(item[1].durations), item[0]),
+                )
+            },
+        }
+    return {"patch_paths": patch_paths}
+
+
+def write_recording_stats(mocks: dict[str, RecordingMock], filepath: str) -> None:
+    with open(filepath, "w") as file:
+        json.dump(collect_recording_stats(mocks), file, indent=2)
+
+
+def _collect_attribute_stats(mock: RecordingMock) -> dict[str, _InteractionStats]:
+    attribute_stats: dict[str, _InteractionStats] = {}
+    visited: set[int] = set()
+    pending: list[tuple[str, RecordingMock]] = [("", mock)]
+    while pending:
+        path, current = pending.pop()
+        if id(current) in visited:
+            continue
+        visited.add(id(current))
+        for name, accesses in current.recorded_attribute_accesses.items():
+            attribute_path = f"{path}.{name}" if path else name
+            durations = current.recorded_attribute_access_durations.get(name, {})
+            stats = attribute_stats.setdefault(attribute_path, _InteractionStats())
+            for index, value in enumerate(accesses):
+                stats.add(value, durations.get(index))
+                pending.extend(
+                    (attribute_path, nested) for nested in _nested_mocks(value)
+                )
+        if current.recorded_calls:
+            call_path = f"{path}()"
+            stats = attribute_stats.setdefault(call_path, _InteractionStats())
+            for index, (_, result) in enumerate(current.recorded_calls):
+                stats.add(result, current.recorded_call_durations.get(index))
+                pending.extend((call_path, nested) for nested in _nested_mocks(result))
+    return attribute_stats
+
+
+def _nested_mocks(value: Any) -> list[RecordingMock]:
+    if isinstance(value, RecordingMock):
+        return [value]
+    if isinstance(value, dict):
+        return [mock for item in value.values() for mock in _nested_mocks(item)]
+    if isinstance(value, TruncatedList):
+        return _nested_mocks(value.recorded_items)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [mock for item in value for mock in _nested_mocks(item)]
+    return []
+
+
+def _payload_size(value: Any) -> int:
+    """The compact JSON size of a returned value, not counting nested mocks."""
+    if isinstance(value, RecordingMock):
+        return 0
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=_json_default))
+    except (TypeError, ValueError):
+        # ie. dicts with tuple keys, or circular references, which the stats are
+        # not worth failing the recording session for.
+        return len(repr(value))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, RecordingMock):
+        return None
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float | None:
+    """Nearest-rank percentile."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return round(sorted_values[rank - 1], 6)
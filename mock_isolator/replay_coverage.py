@@ -0,0 +1,404 @@
+"""
+Which recorded interactions are consumed while replaying, and pruning of the ones
+that never are (ie. attributes only read for debug logging, or a page fetched but
+ignored). Enable it for a test session, ie. in conftest.py:
+
+    coverage = ReplayCoverage()
+    MockRecordingSettings.set_replay_coverage(coverage)
+    yield
+    coverage.write(f".replay_coverage/{worker_id}.json")
+
+and rewrite the recordings without the entries that no test consumed:
+
+    python -m mock_isolator.replay_coverage .replay_coverage/*.json
+
+Mocks are identified by their index in the order in which they are decoded, so the
+coverage is kept per checksum of the recording it was measured against, and a
+recording is only pruned with the coverage of its current content: a recording
+that was pruned or recorded again since is skipped. Mocks stored in stream segments
+are not tracked, and entries replayed by stream key are kept, since they may be
+consumed out of order. The segment, blob and .npy files next to a pruned recording
+that it no longer refers to are removed.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+from typing import Any, Iterator, Tuple
+
+from mock_isolator.recording_checksum import add_checksum, get_checksum, split_checksum
+from mock_isolator.recording_files import (
+    compress_recording,
+    decompress_recording,
+    is_compressed_recording,
+    replace_recording_file,
+)
+from mock_isolator.type_codecs import DEFAULT_CODEC_REGISTRY, CodecRegistry
+
+
+class _MockUsage:
+    __slots__ = ("attributes", "calls")
+
+    def __init__(self) -> None:
+        # The number of accesses popped per attribute read while replaying.
+        self.attributes: dict[str, int] = {}
+        # The number of recorded calls consumed from the start.
+        self.calls = 0
+
+
+class _CoveredAccesses(dict):
+    """The recorded attribute accesses of a mock, noting the attributes read."""
+
+    def __init__(self, accesses: dict[str, Any], usage: _MockUsage):
+        super().__init__(accesses)
+        self.usage = usage
+
+    def __getitem__(self, name: str) -> Any:
+        self.usage.attributes.setdefault(name, 0)
+        return dict.__getitem__(self, name)
+
+
+class _CoveredStream(list):
+    """The recorded accesses of an attribute, counting those popped."""
+
+    def __init__(self, accesses: list[Any], name: str, usage: _MockUsage):
+        super().__init__(accesses)
+        self.name = name
+        self.usage = usage
+
+    def pop(self, index: Any = -1) -> Any:
+        self.usage.attributes[self.name] += 1
+        return list.pop(self, index)
+
+
+class _CoveredCalls(list):
+    """The recorded calls of a mock, noting the last one consumed."""
+
+    def __init__(self, calls: list[Any], usage: _MockUsage):
+        super().__init__(calls)
+        self.usage = usage
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, int) and index >= self.usage.calls:
+            self.usage.calls = index + 1
+        return list.__getitem__(self, index)
+
+
+class RecordingUsage:
+    """What was consumed from one load of a recording."""
+
+    def __init__(self, checksum: str) -> None:
+        # The checksum of the recording that was loaded, see get_checksum.
+        self.checksum = checksum
+        self.mocks: list[_MockUsage] = []
+
+    def cover(self, mocks: list[Any]) -> None:
+        """
+        Track the decoded ReplayingMocks, given in the order in which they were
+        decoded. Their recorded interactions are replaced with copies that note
+        what is consumed.
+        """
+        for mock in mocks:
+            usage = _MockUsage()
+            self.mocks.append(usage)
+            accesses = _CoveredAccesses(
+                object.__getattribute__(mock, "_recorded_attribute_accesses"), usage
+            )
+            stream_keys = object.__getattribute__(
+                mock, "_recorded_attribute_access_stream_keys"
+            )
+            for name, attribute_accesses in dict.items(accesses):
+                if type(attribute_accesses) is list and name not in stream_keys:
+                    dict.__setitem__(
+                        accesses, name, _CoveredStream(attribute_accesses, name, usage)
+                    )
+            object.__setattr__(mock, "_recorded_attribute_accesses", accesses)
+            object.__setattr__(
+                mock,
+                "_recorded_calls",
+                _CoveredCalls(object.__getattribute__(mock, "_recorded_calls"), usage),
+            )
+
+
+class ReplayCoverage:
+    """The usage of the recordings replayed in a test session, per filepath."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._recordings: dict[str, list[RecordingUsage]] = {}
+
+    def add_recording(self, filepath: str, serialized: str | bytes) -> RecordingUsage:
+        """Track a load of the recording, given its decompressed content."""
+        return self.add_recording_checksum(filepath, get_checksum(serialized))
+
+    def add_recording_checksum(self, filepath: str, checksum: str) -> RecordingUsage:
+        """Track a load of the recording, given the checksum of its content."""
+        usage = RecordingUsage(checksum)
+        with self._lock:
+            self._recordings.setdefault(os.path.abspath(filepath), []).append(usage)
+        return usage
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        The usage merged over every load of each recording with the same checksum,
+        as {"recordings": {filepath: {checksum: {mock index: {"attributes": ...,
+        "calls": n}}}}}. Mocks of which nothing was consumed are left out.
+        """
+        with self._lock:
+            recordings = {k: list(v) for k, v in self._recordings.items()}
+        coverage: dict[str, Any] = {}
+        for filepath, loads in recordings.items():
+            for load in loads:
+                mocks = coverage.setdefault(filepath, {}).setdefault(load.checksum, {})
+                for index, usage in enumerate(load.mocks):
+                    if usage.attributes or usage.calls:
+                        _merge_mock_usage(
+                            mocks,
+                            str(index),
+                            {"attributes": usage.attributes, "calls": usage.calls},
+                        )
+        return {"recordings": coverage}
+
+    def write(self, filepath: str) -> None:
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filepath, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+def _merge_mock_usage(
+    mocks: dict[str, dict[str, Any]], index: str, usage: dict[str, Any]
+) -> None:
+    merged = mocks.setdefault(index, {"attributes": {}, "calls": 0})
+    for name, count in usage["attributes"].items():
+        merged["attributes"][name] = max(merged["attributes"].get(name, 0), count)
+    merged["calls"] = max(merged["calls"], usage["calls"])
+
+
+def load_replay_coverage(
+    filepaths: list[str],
+) -> dict[str, dict[str, dict[str, Any]]]:
+    """
+    Merge the coverage written by ReplayCoverage.write (ie. by each worker), as
+    {filepath: {checksum: {mock index: usage}}}.
+    """
+    recordings: dict[str, dict[str, dict[str, Any]]] = {}
+    for filepath in filepaths:
+        with open(filepath, "r") as file:
+            coverage = json.load(file)
+        for recording_filepath, checksums in coverage["recordings"].items():
+            for checksum, mocks in checksums.items():
+                merged = recordings.setdefault(recording_filepath, {}).setdefault(
+                    checksum, {}
+                )
+                for index, usage in mocks.items():
+                    _merge_mock_usage(merged, index, usage)
+    return recordings
+
+
+def _iter_decoded_nodes(  # noqa: C901
+    root: list[Any], codec_registry: CodecRegistry
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield the container and key of each list and dict of the encoding in root[0],
+    in the order in which DictMockRecordingEncoder decodes them. Values are read
+    after they are yielded, so the caller may replace them.
+    """
+    pending: list[Tuple[Any, Any]] = [(root, 0)]
+    while pending:
+        container, key = pending.pop()
+        yield container, key
+        node = container[key]
+        children: list[Tuple[Any, Any]] = []
+        if isinstance(node, list):
+            children = [(node, i) for i in range(len(node))]
+        elif not isinstance(node, dict):
+            continue
+        elif "__type__" not in node:
+            children = [(node, k) for k in node]
+        elif node["__type__"] == "RecordingMock":
+            for accesses in node.get("recorded_attribute_accesses", {}).values():
+                if isinstance(accesses, list):
+                    children.extend((accesses, i) for i in range(len(accesses)))
+                elif "__repeat__" in accesses:
+                    children.append((accesses, "__repeat__"))
+            if "recorded_calls" in node:
+                children.append((node, "recorded_calls"))
+        elif node["__type__"] == "async_value":
+            children = [(node, "value")]
+        else:
+            codec = codec_registry.get_codec_by_tag(node["__type__"])
+            if codec is not None:
+                children = [(node, f) for f in codec.nested_fields if f in node]
+        pending.extend(
+            child
+            for child in reversed(children)
+            if isinstance(child[0][child[1]], (list, dict))
+        )
+
+
+def prune_encoding(
+    encoding: dict[str, Any],
+    mock_usages: dict[str, dict[str, Any]],
+    codec_registry: CodecRegistry = DEFAULT_CODEC_REGISTRY,
+) -> None:
+    """Remove the entries of the encoding that were not consumed, in place."""
+    root = [encoding]
+    mocks = [
+        container[key]
+        for container, key in _iter_decoded_nodes(root, codec_registry)
+        if isinstance(container[key], dict)
+        and container[key].get("__type__") == "RecordingMock"
+    ]
+    definitions = {mock["__id__"]: mock for mock in mocks if "__id__" in mock}
+    for index, mock in enumerate(mocks):
+        _prune_mock(mock, mock_usages.get(str(index)))
+    # A shared mock may now be reached through a reference first, so its
+    # definition is moved there.
+    defined_ids = set()
+    for container, key in _iter_decoded_nodes(root, codec_registry):
+        node = container[key]
+        if not isinstance(node, dict):
+            continue
+        if node.get("__type__") == "RecordingMock" and "__id__" in node:
+            if node["__id__"] in defined_ids:
+                container[key] = {"__type__": "ref", "id": node["__id__"]}
+            else:
+                defined_ids.add(node["__id__"])
+        elif node.get("__type__") == "ref" and node["id"] not in defined_ids:
+            container[key] = definitions[node["id"]]
+            defined_ids.add(node["id"])
+
+
+def _prune_mock(mock: dict[str, Any], usage: dict[str, Any] | None) -> None:
+    used_attributes = {} if usage is None else usage["attributes"]
+    accesses = mock.get("recorded_attribute_accesses", {})
+    stream_keys = mock.get("recorded_attribute_access_stream_keys", {})
+    durations = mock.get("recorded_attribute_access_durations", {})
+    for name in list(accesses):
+        if name not in used_attributes:
+            del accesses[name]
+            stream_keys.pop(name, None)
+            durations.pop(name, None)
+        elif isinstance(accesses[name], list) and name not in stream_keys:
+            # An attribute that was read but not popped (ie. before raising
+            # RecordingTruncatedError) keeps its first access.
+            count = max(used_attributes[name], 1)
+            del accesses[name][count:]
+            if isinstance(durations.get(name), list):
+                del durations[name][count:]
+    if mock.get("recorded_call_stream_keys") is None:
+        count = 0 if usage is None else usage["calls"]
+        del mock.get("recorded_calls", [])[count:]
+        if isinstance(mock.get("recorded_call_durations"), list):
+            del mock["recorded_call_durations"][count:]
+
+
+def _find_sidecar_names(encoding: Any) -> Iterator[Tuple[str, str]]:
+    """The extension and name of each sidecar file the encoding refers to."""
+    pending = [encoding]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, dict):
+            if isinstance(node.get("__segments__"), list):
+                for segment_name in node["__segments__"]:
+                    yield "segment", segment_name
+            elif "__type__" in node:
+                for extension in ["blob", "npy"]:
+                    if isinstance(node.get(extension), str):
+                        yield extension, node[extension]
+            pending.extend(node.values())
+
+
+def _remove_unreferenced_sidecar_files(filepath: str, encoding: Any) -> None:
+    """
+    Remove the sidecar files of the recording (see FileRecordingSidecarStore) that
+    neither it nor the segments it refers to refer to.
+    """
+    referenced: set[Tuple[str, str]] = set()
+    pending = [encoding]
+    while pending:
+        for extension, name in _find_sidecar_names(pending.pop()):
+            if (extension, name) in referenced:
+                continue
+            referenced.add((extension, name))
+            segment_filepath = f"{filepath}.{name}.segment"
+            if extension == "segment" and os.path.exists(segment_filepath):
+                with open(segment_filepath, "rb") as file:
+                    pending.append(json.loads(file.read()))
+    for extension in ["segment", "blob", "npy"]:
+        for sidecar_filepath in glob.glob(f"{glob.escape(filepath)}.*.{extension}"):
+            name = sidecar_filepath[len(filepath) + 1 : -len(extension) - 1]
+            if (extension, name) not in referenced:
+                os.remove(sidecar_filepath)
+
+
+def prune_recording(
+    filepath: str,
+    recording_coverage: dict[str, dict[str, Any]],
+    dry_run: bool = False,
+    codec_registry: CodecRegistry = DEFAULT_CODEC_REGISTRY,
+) -> Tuple[int, int]:
+    """
+    Rewrite the recording without the entries that were not consumed, along with
+    the sidecar files it no longer refers to, and return its size before and after.
+    The coverage of the recording is given per checksum, as by load_replay_coverage,
+    and a ValueError is raised when none of them is the checksum of its current
+    content.
+    """
+    with open(filepath, "rb") as file:
+        content = file.read()
+    serialized = decompress_recording(content)
+    mock_usages = recording_coverage.get(get_checksum(serialized))
+    if mock_usages is None:
+        raise ValueError(
+            f"The coverage of {filepath} was measured against other content, ie. "
+            "before it was pruned or recorded again."
+        )
+    encoding = json.loads(split_checksum(serialized)[0])
+    prune_encoding(encoding, mock_usages, codec_registry)
+    pruned = add_checksum(json.dumps(encoding, indent=2)).encode()
+    if is_compressed_recording(content):
+        pruned = compress_recording(pruned)
+    if not dry_run:
+        replace_recording_file(filepath, pruned)
+        _remove_unreferenced_sidecar_files(filepath, encoding)
+    return len(content), len(pruned)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mock_isolator.replay_coverage")
+    parser.add_argument(
+        "coverage", nargs="+", help="Coverage files written by ReplayCoverage."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report without rewriting."
+    )
+    args = parser.parse_args(argv)
+    total_before = total_after = 0
+    coverage = load_replay_coverage(args.coverage)
+    for filepath, recording_coverage in sorted(coverage.items()):
+        if not os.path.exists(filepath):
+            continue
+        try:
+            before, after = prune_recording(
+                filepath, recording_coverage, dry_run=args.dry_run
+            )
+        except ValueError as error:
+            print(f"Skipped: {error}", file=sys.stderr)
+            continue
+        total_before += before
+        total_after += after
+        print(f"{before:>14,} -> {after:>14,}  {filepath}")
+    print(f"{total_before:>14,} -> {total_after:>14,}  total")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
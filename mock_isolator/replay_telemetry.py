@@ -0,0 +1,177 @@
+"""
+Where the time of replaying goes: reading, parsing and decoding each recording, and
+the replay setup of the isolator functions, per recording and per test. Enable it
+for a test session, ie. in conftest.py:
+
+    telemetry = ReplayTelemetry()
+    MockRecordingSettings.set_replay_telemetry(telemetry)
+    yield
+    telemetry.write(f".replay_telemetry/{worker_id}.json")
+
+Tests are identified by the PYTEST_CURRENT_TEST environment variable that pytest
+sets. With trace_memory, tracemalloc traces the loads (which slows them down) to
+report the peak memory allocated while loading each recording, above the memory
+traced when the load started. tracemalloc has a single peak for the process, so the
+peak of loads that overlap another load (ie. from threads) is left out.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# The test of the loads and spans outside of pytest tests.
+NO_TEST = "<no test>"
+
+
+def get_current_test() -> str:
+    current_test = os.environ.get("PYTEST_CURRENT_TEST")
+    # ie. "tests/test_foo.py::test_bar (call)".
+    return NO_TEST if current_test is None else current_test.rsplit(" (", 1)[0]
+
+
+class RecordingLoad:
+    """How a recording was loaded, see MockRecordingStore."""
+
+    __slots__ = (
+        "filepath",
+        "test",
+        "source",
+        "bytes_read",
+        "read_seconds",
+        "parse_seconds",
+        "decode_seconds",
+        "decoded_mocks",
+        "tracemalloc_peak_bytes",
+    )
+
+    def __init__(self, filepath: str, test: str) -> None:
+        self.filepath = filepath
+        self.test = test
+        # "file", or "cache" and "shared" when it was not parsed again (see
+        # recording_cache and shared_recordings).
+        self.source = "file"
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.decode_seconds = 0.0
+        # Not counting the mocks of stream segments, which are decoded lazily.
+        self.decoded_mocks = 0
+        self.tracemalloc_peak_bytes: int | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ReplayTelemetry:
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self.loads: list[RecordingLoad] = []
+        # The test, name and duration of each span.
+        self.spans: list[tuple[str, str, float]] = []
+        # The memory traced when each load in progress started.
+        self._traced_memory_baselines: dict[RecordingLoad, int] = {}
+        self._overlapping_loads: set[RecordingLoad] = set()
+        self._started_tracing = False
+
+    def start_load(self, filepath: str) -> RecordingLoad:
+        load = RecordingLoad(os.path.abspath(filepath), get_current_test())
+        if self.trace_memory:
+            with self._lock:
+                if not self._traced_memory_baselines:
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        self._started_tracing = True
+                    tracemalloc.reset_peak()
+                else:
+                    # Their peaks are no longer their own.
+                    self._overlapping_loads.update(self._traced_memory_baselines)
+                    self._overlapping_loads.add(load)
+                self._traced_memory_baselines[load] = tracemalloc.get_traced_memory()[0]
+        return load
+
+    def finish_load(self, load: RecordingLoad) -> None:
+        with self._lock:
+            if load in self._traced_memory_baselines:
+                baseline = self._traced_memory_baselines.pop(load)
+                if load in self._overlapping_loads:
+                    self._overlapping_loads.remove(load)
+                else:
+                    load.tracemalloc_peak_bytes = (
+                        tracemalloc.get_traced_memory()[1] - baseline
+                    )
+                if not self._traced_memory_baselines and self._started_tracing:
+                    # Tracing slows down everything else, ie. the tests.
+                    tracemalloc.stop()
+                    self._started_tracing = False
+            self.loads.append(load)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the block, ie. the replay setup of an isolator function."""
+        test = get_current_test()
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started_at
+            with self._lock:
+                self.spans.append((test, name, duration))
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        The loads of the recordings, and their totals per test along with the total
+        duration of each span name.
+        """
+        with self._lock:
+            loads = list(self.loads)
+            spans = list(self.spans)
+        tests: dict[str, dict[str, Any]] = {}
+
+        def get_test(test: str) -> dict[str, Any]:
+            return tests.setdefault(
+                test,
+                {
+                    "recordings": 0,
+                    "cache_hits": 0,
+                    "bytes_read": 0,
+                    "read_seconds": 0.0,
+                    "parse_seconds": 0.0,
+                    "decode_seconds": 0.0,
+                    "decoded_mocks": 0,
+                    "tracemalloc_peak_bytes": None,
+                    "spans": {},
+                },
+            )
+
+        for load in loads:
+            totals = get_test(load.test)
+            totals["recordings"] += 1
+            totals["cache_hits"] += load.source != "file"
+            for name in [
+                "bytes_read",
+                "read_seconds",
+                "parse_seconds",
+                "decode_seconds",
+                "decoded_mocks",
+            ]:
+                totals[name] += getattr(load, name)
+            if load.tracemalloc_peak_bytes is not None:
+                totals["tracemalloc_peak_bytes"] = max(
+                    totals["tracemalloc_peak_bytes"] or 0, load.tracemalloc_peak_bytes
+                )
+        for test, name, duration in spans:
+            test_spans = get_test(test)["spans"]
+            test_spans[name] = test_spans.get(name, 0.0) + duration
+        return {"recordings": [load.to_dict() for load in loads], "tests": tests}
+
+    def write(self, filepath: str) -> None:
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filepath, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
@@ -1,24 +1,69 @@
 from types import TracebackType
 from typing import Any, Tuple, Type
 import asyncio
+import threading
+import time
+
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.recording_budget import (
+    RecordingSampledError,
+    RecordingTruncatedError,
+    SampledRecording,
+    TruncatedRecording,
+)
+from mock_isolator.stream_segments import SegmentedStream
+from mock_isolator.streams import get_stream_key
 
 
 class ReplayingMock:
     """
     Replays a recording (ie. from a RecordingMock) such that the originally wrapped
-    item is no longer needed.
+    item is no longer needed. Recordings of iteration or container methods are
+    replayed by a subclass that has them, see _ReplayingSpecialMethods.
     """
 
+    def __new__(
+        cls,
+        recorded_attribute_accesses: dict[str, list[Any] | dict[str, Any] | Any],
+        *args: Any,
+        **kwargs: Any,
+    ) -> "ReplayingMock":
+        if cls is ReplayingMock:
+            cls = _get_replaying_mock_class(recorded_attribute_accesses)
+        return object.__new__(cls)
+
     def __init__(
         self,
         recorded_attribute_accesses: dict[str, list[Any] | dict[str, Any] | Any],
         recorded_calls: list[Tuple[Tuple[Any, ...], dict[str, Any]]],
         target_type: Type[Any] | None = None,
+        recorded_attribute_access_stream_keys: (
+            dict[str, list[str | None]] | None
+        ) = None,
+        recorded_call_stream_keys: list[str | None] | None = None,
+        recorded_attribute_access_durations: (
+            dict[str, list[float | None] | float] | None
+        ) = None,
+        recorded_call_durations: list[float | None] | None = None,
     ):
         self._recorded_attribute_accesses = recorded_attribute_accesses
         self._recorded_calls = recorded_calls
         self._current_call_index = 0
         self._target_type = target_type
+        self._recorded_attribute_access_stream_keys = (
+            recorded_attribute_access_stream_keys or {}
+        )
+        self._recorded_call_stream_keys = recorded_call_stream_keys
+        self._recorded_attribute_access_durations = (
+            recorded_attribute_access_durations or {}
+        )
+        self._recorded_call_durations = recorded_call_durations
+        self._lock = threading.Lock()
+        self._unreplayed_call_indexes = (
+            None
+            if recorded_call_stream_keys is None
+            else list(range(len(recorded_calls)))
+        )
 
     def __getattribute__(self, name: str) -> Any:
         if name in [
@@ -26,6 +71,16 @@ class ReplayingMock:
             "_recorded_calls",
             "_current_call_index",
             "_target_type",
+            "_recorded_attribute_access_stream_keys",
+            "_recorded_call_stream_keys",
+            "_unreplayed_call_indexes",
+            "_recorded_attribute_access_durations",
+            "_recorded_call_durations",
+            "_lock",
+            "_pop_recorded_attribute_access",
+            "_replay_repeated_attribute",
+            "_replay_next_attribute_access",
+            "_replay_special_method",
             "__class__",
             "__dict__",
             "__getattribute__",
@@ -39,32 +94,118 @@ class ReplayingMock:
         if name in self._recorded_attribute_accesses:
             attribute = self._recorded_attribute_accesses[name]
             if isinstance(attribute, dict) and "__repeat__" in attribute:
-                return attribute["__repeat__"]
-            if isinstance(attribute, list):
-                result = attribute.pop(0)
-                # Check if this is an async value
-                if isinstance(result, dict) and result.get("__type__") == "async_value":
-                    async def wrapped_coroutine(*args, **kwargs):
-                        if isinstance(result["value"], Exception):
-                            raise result["value"]
-                        return result["value"]
-                    return wrapped_coroutine
-                return result
+                return self._replay_repeated_attribute(name, attribute["__repeat__"])
+            if isinstance(attribute, (list, SegmentedStream)):
+                return self._replay_next_attribute_access(name, attribute)
             return attribute
         raise AttributeError(f"Attribute {name} not found in replayed interactions.")
 
+    def _replay_repeated_attribute(self, name: str, result: Any) -> Any:
+        """The value of an attribute that was the same on every recorded access."""
+        if isinstance(result, TruncatedRecording):
+            raise _truncated_error(name, result)
+        if _is_async_value(result):
+            duration = self._recorded_attribute_access_durations.get(name)
+
+            async def repeated_coroutine(*args, **kwargs):
+                return await _replay_async_value(result, duration)
+
+            return repeated_coroutine
+        return result
+
+    def _replay_next_attribute_access(
+        self, name: str, accesses: list[Any] | SegmentedStream
+    ) -> Any:
+        """
+        The next recorded access of the attribute. Awaited results are replayed by the
+        returned coroutine function.
+        """
+        if name in self._recorded_attribute_access_stream_keys and _is_async_value(
+            accesses[0]
+        ):
+            # The recorded stream key is the one of the task that awaited the
+            # result, so defer picking the value until it is awaited.
+            async def deferred_coroutine(*args, **kwargs):
+                return await _replay_async_value(
+                    *self._pop_recorded_attribute_access(name)
+                )
+
+            return deferred_coroutine
+        result, duration = self._pop_recorded_attribute_access(name)
+        if _is_async_value(result):
+
+            async def wrapped_coroutine(*args, **kwargs):
+                return await _replay_async_value(result, duration)
+
+            return wrapped_coroutine
+        return result
+
+    def _pop_recorded_attribute_access(self, name: str) -> Tuple[Any, float | None]:
+        """
+        Pop the next recorded access of the attribute and its recorded duration. When
+        the accesses were recorded with stream keys, the next access recorded by the
+        current stream is popped. The TRUNCATED and SAMPLED markers are never popped,
+        so that every access past them raises RecordingTruncatedError.
+        """
+        key = get_stream_key()
+        with self._lock:
+            accesses = self._recorded_attribute_accesses[name]
+            if isinstance(accesses, SegmentedStream):
+                if accesses and isinstance(accesses.peek(), TruncatedRecording):
+                    raise _truncated_error(name, accesses.peek())
+                return accesses.pop_entry()
+            stream_keys = self._recorded_attribute_access_stream_keys.get(name)
+            index = 0 if stream_keys is None else _index_of_stream_key(stream_keys, key)
+            if index is None:
+                raise AttributeError(
+                    f"Attribute {name} not found in replayed interactions of stream "
+                    f"{key}."
+                )
+            if accesses and isinstance(accesses[index], TruncatedRecording):
+                raise _truncated_error(name, accesses[index])
+            if stream_keys is not None:
+                del stream_keys[index]
+            durations = self._recorded_attribute_access_durations.get(name)
+            duration = durations.pop(index) if isinstance(durations, list) else None
+            return accesses.pop(index), duration
+
     def __call__(self, *args: Tuple[Any, ...], **kwargs: dict[str, Any]) -> Any:
-        if self._current_call_index < len(self._recorded_calls):
-            result = self._recorded_calls[self._current_call_index]
-            self._current_call_index += 1
-            return result[1]
-        raise ValueError("No more recorded calls to replay.")
+        key = get_stream_key()
+        with self._lock:
+            if self._recorded_call_stream_keys is not None:
+                if not self._unreplayed_call_indexes:
+                    raise ValueError("No more recorded calls to replay.")
+                index = _index_of_stream_key(self._recorded_call_stream_keys, key)
+                if index is None:
+                    raise ValueError(
+                        f"No more recorded calls to replay in stream {key}."
+                    )
+                result = self._recorded_calls[self._unreplayed_call_indexes[index]][1]
+                if isinstance(result, TruncatedRecording):
+                    raise _truncated_error("__call__", result)
+                del self._recorded_call_stream_keys[index]
+                call_index = self._unreplayed_call_indexes.pop(index)
+            elif self._current_call_index < len(self._recorded_calls):
+                call_index = self._current_call_index
+                result = self._recorded_calls[call_index][1]
+                if isinstance(result, TruncatedRecording):
+                    raise _truncated_error("__call__", result)
+                self._current_call_index += 1
+            else:
+                raise ValueError("No more recorded calls to replay.")
+        if self._recorded_call_durations is not None:
+            delay = MockRecordingSettings.get_replay_delay(
+                self._recorded_call_durations[call_index]
+            )
+            if delay:
+                time.sleep(delay)
+        return self._recorded_calls[call_index][1]
 
     async def __aenter__(self) -> Any:
         if "__aenter__" in self._recorded_attribute_accesses:
             result = self._recorded_attribute_accesses["__aenter__"]
             if isinstance(result, list):
-                value = result.pop(0)
+                value, _ = self._pop_recorded_attribute_access("__aenter__")
                 if isinstance(value, dict) and "__repeat__" in value:
                     return value["__repeat__"]
                 return value
@@ -82,7 +223,7 @@ class ReplayingMock:
         if "__aexit__" in self._recorded_attribute_accesses:
             result = self._recorded_attribute_accesses["__aexit__"]
             if isinstance(result, list):
-                value = result.pop(0)
+                value, _ = self._pop_recorded_attribute_access("__aexit__")
                 if isinstance(value, dict) and "__repeat__" in value:
                     return value["__repeat__"]
                 return value
@@ -95,7 +236,7 @@ class ReplayingMock:
         if "__enter__" in self._recorded_attribute_accesses:
             result = self._recorded_attribute_accesses["__enter__"]
             if isinstance(result, list):
-                value = result.pop(0)
+                value, _ = self._pop_recorded_attribute_access("__enter__")
                 if isinstance(value, dict) and "__repeat__" in value:
                     return value["__repeat__"]
                 return value
@@ -113,7 +254,7 @@ class ReplayingMock:
         if "__exit__" in self._recorded_attribute_accesses:
             result = self._recorded_attribute_accesses["__exit__"]
             if isinstance(result, list):
-                value = result.pop(0)
+                value, _ = self._pop_recorded_attribute_access("__exit__")
                 if isinstance(value, dict) and "__repeat__" in value:
                     return value["__repeat__"]
                 return value
@@ -126,28 +267,176 @@ class ReplayingMock:
         if "__aiter__" in self._recorded_attribute_accesses:
             result = self._recorded_attribute_accesses["__aiter__"]
             if isinstance(result, list):
-                value = result.pop(0)
+                value, _ = self._pop_recorded_attribute_access("__aiter__")
                 if isinstance(value, dict) and value.get("__type__") == "async_value":
-                    return self
+                    return self if value["value"] is None else value["value"]
                 elif isinstance(value, dict) and "__repeat__" in value:
                     return value["__repeat__"]
                 return value
             elif isinstance(result, dict) and "__repeat__" in result:
-                return result["__repeat__"]
+                value = result["__repeat__"]
+                if _is_async_value(value):
+                    return self if value["value"] is None else value["value"]
+                return value
             return result
         raise AttributeError("No recorded __aiter__ result found.")
 
     async def __anext__(self) -> Any:
         if "__anext__" in self._recorded_attribute_accesses:
             result = self._recorded_attribute_accesses["__anext__"]
-            if isinstance(result, list):
-                value = result.pop(0)
+            if isinstance(result, (list, SegmentedStream)):
+                value, duration = self._pop_recorded_attribute_access("__anext__")
                 if isinstance(value, dict) and value.get("__type__") == "async_value":
-                    if isinstance(value["value"], StopAsyncIteration):
-                        raise value["value"]
-                    return value["value"]
+                    return await _replay_async_value(value, duration)
                 if isinstance(value, StopAsyncIteration):
                     raise value
                 return value
             return result
         raise StopAsyncIteration
+
+    def _replay_special_method(self, name: str) -> Any:
+        """
+        The next recorded result of a special method (ie. __len__), or NOT_RECORDED
+        when it was never called while recording.
+        """
+        if name not in self._recorded_attribute_accesses:
+            return NOT_RECORDED
+        result = self._recorded_attribute_accesses[name]
+        if isinstance(result, (list, SegmentedStream)):
+            value, duration = self._pop_recorded_attribute_access(name)
+            delay = MockRecordingSettings.get_replay_delay(duration)
+            if delay:
+                time.sleep(delay)
+            return value
+        elif isinstance(result, dict) and "__repeat__" in result:
+            if isinstance(result["__repeat__"], TruncatedRecording):
+                raise _truncated_error(name, result["__repeat__"])
+            return result["__repeat__"]
+        return result
+
+
+class _ReplayingSpecialMethods:
+    """
+    The special methods that a ReplayingMock only has when they were recorded, like
+    RecordingMock only has them when its wrapped item does.
+    """
+
+    def __iter__(self) -> Any:
+        result = self._replay_special_method("__iter__")
+        if result is NOT_RECORDED:
+            # Only __next__ was recorded, so it is an iterator, which iterates itself.
+            return self
+        return result
+
+    def __next__(self) -> Any:
+        result = self._replay_special_method("__next__")
+        if result is NOT_RECORDED:
+            raise StopIteration
+        if isinstance(result, StopIteration):
+            raise result
+        return result
+
+    def __len__(self) -> int:
+        result = self._replay_special_method("__len__")
+        if result is NOT_RECORDED:
+            # A TypeError lets list() and friends fall back to plain iteration.
+            raise TypeError("No recorded __len__ result found.")
+        return result
+
+    def __getitem__(self, key: Any) -> Any:
+        result = self._replay_special_method("__getitem__")
+        if result is NOT_RECORDED:
+            raise TypeError("No recorded __getitem__ result found.")
+        if isinstance(result, (KeyError, IndexError)):
+            raise result
+        return result
+
+    def __contains__(self, item: Any) -> bool:
+        result = self._replay_special_method("__contains__")
+        if result is NOT_RECORDED:
+            raise TypeError("No recorded __contains__ result found.")
+        return result
+
+    def __bool__(self) -> bool:
+        result = self._replay_special_method("__bool__")
+        return True if result is NOT_RECORDED else result
+
+
+# The special methods of _ReplayingSpecialMethods, and the recorded attributes that
+# they depend on. Iterators get __iter__, and a mock that only recorded __len__ gets
+# __bool__, so that its truthiness does not replay __len__.
+_OPTIONAL_SPECIAL_METHODS = {
+    "__iter__": ("__iter__", "__next__"),
+    "__next__": ("__next__",),
+    "__len__": ("__len__",),
+    "__getitem__": ("__getitem__",),
+    "__contains__": ("__contains__",),
+    "__bool__": ("__bool__", "__len__"),
+}
+# The subclass of ReplayingMock with each set of special methods.
+_replaying_mock_classes: dict[frozenset[str], type] = {}
+
+
+def _get_replaying_mock_class(recorded_attribute_accesses: dict[str, Any]) -> type:
+    names = frozenset(
+        name
+        for name, required_names in _OPTIONAL_SPECIAL_METHODS.items()
+        if any(n in recorded_attribute_accesses for n in required_names)
+    )
+    if not names:
+        return ReplayingMock
+    replaying_mock_class = _replaying_mock_classes.get(names)
+    if replaying_mock_class is None:
+        replaying_mock_class = _replaying_mock_classes.setdefault(
+            names,
+            type(
+                "ReplayingMock",
+                (ReplayingMock,),
+                {name: vars(_ReplayingSpecialMethods)[name] for name in sorted(names)},
+            ),
+        )
+    return replaying_mock_class
+
+
+# Returned by ReplayingMock._replay_special_method for special methods that were
+# never called while recording.
+NOT_RECORDED = object()
+
+
+def _is_async_value(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("__type__") == "async_value"
+
+
+async def _replay_async_value(value: dict[str, Any], duration: float | None) -> Any:
+    delay = MockRecordingSettings.get_replay_delay(duration)
+    if delay:
+        await asyncio.sleep(delay)
+    if isinstance(value["value"], Exception):
+        raise value["value"]
+    return value["value"]
+
+
+def _truncated_error(name: str, marker: TruncatedRecording) -> RecordingTruncatedError:
+    if isinstance(marker, SampledRecording):
+        return RecordingSampledError(
+            f"The recording of {name} was sampled by a recording budget with the "
+            "SAMPLE policy, which keeps entries to inspect but not to replay, so it "
+            "cannot be replayed any further. Record it with the TRUNCATE or FAIL "
+            "policy to replay it."
+        )
+    return RecordingTruncatedError(
+        f"The recording of {name} was truncated by a recording budget, so it cannot "
+        "be replayed any further."
+    )
+
+
+def _index_of_stream_key(stream_keys: list[str | None], key: str | None) -> int | None:
+    """
+    Index of the first entry recorded by the stream, or None when the stream has no
+    entries left. Replaying outside of any stream falls back to the oldest entry so
+    that it behaves like an ordinary recording.
+    """
+    try:
+        return stream_keys.index(key)
+    except ValueError:
+        return 0 if key is None else None
@@ -0,0 +1,175 @@
+"""
+Recordings shared between the worker processes of a test session (ie. with
+pytest-xdist's -n 32), enabled with MockRecordingSettings.set_shared_recordings(True)
+in the workers. The process that starts the workers owns the shared memory of the
+session, ie. in conftest.py:
+
+    def pytest_configure(config):
+        if not hasattr(config, "workerinput"):
+            start_shared_recordings()
+
+    def pytest_unconfigure(config):
+        if not hasattr(config, "workerinput"):
+            stop_shared_recordings()
+
+The first worker to load a recording publishes its encoding and the checksum of the
+file (for the replay coverage), serialized with marshal, in a
+multiprocessing.shared_memory block, and adds the block to the registry of the
+session. The other workers attach to the block and unmarshal the encoding rather
+than reading and parsing the file again. The encoding is unmarshalled whole and each
+worker decodes its own mocks from it, since mocks are replayed from Python objects
+that cannot live in shared memory: this saves the reads and the JSON parsing of every
+worker but the first, not the memory of the decoded mocks. Blocks are
+named after a hash of the recording's path, size and modification time, so a
+re-recorded file gets a new block. They outlive the workers that published them,
+until stop_shared_recordings unlinks them. Without a session, nothing is published.
+"""
+
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import IO, Any, Iterator
+
+from mock_isolator import __version__
+
+try:
+    import fcntl
+except ImportError:  # ie. on Windows, where blocks are not unlinked.
+    fcntl = None  # type: ignore
+
+# The registry of the session, inherited by the workers from the process that
+# started it.
+REGISTRY_ENVIRONMENT_VARIABLE = "MOCK_ISOLATOR_SHARED_RECORDINGS_REGISTRY"
+# The length of the payload that follows, written once the payload is.
+_HEADER = struct.Struct("<Q")
+# How long to wait for a block that another worker is still writing.
+PUBLISH_TIMEOUT = 5.0
+
+# Kept open, since on Windows a block is freed once no process has it open.
+_published_blocks: dict[str, shared_memory.SharedMemory] = {}
+_published_blocks_lock = threading.Lock()
+
+
+def get_shared_recording_name(filepath: str) -> str:
+    stat = os.stat(filepath)
+    key = f"{__version__}:{os.path.abspath(filepath)}:{stat.st_size}:{stat.st_mtime_ns}"
+    # Short enough for the name limits of every platform.
+    return f"mi_{hashlib.sha256(key.encode()).hexdigest()[:24]}"
+
+
+def start_shared_recordings() -> str:
+    """
+    Start a session in the process that starts the workers, before it starts them,
+    and return the filepath of its registry.
+    """
+    file_descriptor, registry_filepath = tempfile.mkstemp(
+        prefix="mock_isolator_shared_recordings_"
+    )
+    os.close(file_descriptor)
+    os.environ[REGISTRY_ENVIRONMENT_VARIABLE] = registry_filepath
+    return registry_filepath
+
+
+def stop_shared_recordings() -> None:
+    """Unlink the blocks published during the session, once its workers are done."""
+    registry_filepath = os.environ.pop(REGISTRY_ENVIRONMENT_VARIABLE, None)
+    if registry_filepath is None:
+        return
+    with _locked_registry(registry_filepath) as registry:
+        names = set(registry.read().split())
+    os.remove(registry_filepath)
+    for name in names:
+        try:
+            # Tracked, so that unlinking it also untracks it.
+            block = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        block.close()
+        block.unlink()
+
+
+@contextmanager
+def _locked_registry(registry_filepath: str) -> Iterator[IO[str]]:
+    with open(registry_filepath, "a+") as registry:
+        if fcntl is not None:
+            fcntl.flock(registry, fcntl.LOCK_EX)
+        registry.seek(0)
+        yield registry
+
+
+def _untrack(block: shared_memory.SharedMemory) -> None:
+    if os.name == "posix":
+        # Otherwise the block would be unlinked when this worker exits, while the
+        # others still attach to it.
+        resource_tracker.unregister(block._name, "shared_memory")  # type: ignore
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore
+    block = shared_memory.SharedMemory(name=name)
+    _untrack(block)
+    return block
+
+
+def read_shared_encoding(name: str) -> tuple[str, Any] | None:
+    """
+    The checksum of the recording and its published encoding, or None when no worker
+    published it.
+    """
+    try:
+        block = _attach(name)
+    except FileNotFoundError:
+        return None
+    try:
+        deadline = time.monotonic() + PUBLISH_TIMEOUT
+        while (length := _HEADER.unpack_from(block.buf)[0]) == 0:
+            if time.monotonic() > deadline:
+                # ie. the publishing worker crashed while writing it.
+                return None
+            time.sleep(0.001)
+        with block.buf[_HEADER.size : _HEADER.size + length] as payload:
+            return marshal.loads(payload)
+    finally:
+        block.close()
+
+
+def publish_shared_encoding(name: str, checksum: str, encoding: Any) -> None:
+    """
+    Publish the encoding with the checksum of the recording (see get_checksum),
+    unless another worker already did or no session runs.
+    """
+    registry_filepath = os.environ.get(REGISTRY_ENVIRONMENT_VARIABLE)
+    if registry_filepath is None or not os.path.exists(registry_filepath):
+        return
+    try:
+        payload = marshal.dumps((checksum, encoding))
+    except ValueError:
+        # The encoding is not made of the basic types marshal supports.
+        return
+    size = _HEADER.size + len(payload)
+    try:
+        if sys.version_info >= (3, 13):
+            block = shared_memory.SharedMemory(
+                name=name, create=True, size=size, track=False  # type: ignore
+            )
+        else:
+            block = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _untrack(block)
+    except FileExistsError:
+        return
+    # Registered before it is written, so that it is unlinked even if this worker
+    # crashes while writing it.
+    with _locked_registry(registry_filepath) as registry:
+        registry.write(f"{name}\n")
+    block.buf[_HEADER.size : size] = payload
+    _HEADER.pack_into(block.buf, 0, len(payload))
+    with _published_blocks_lock:
+        _published_blocks[name] = block
@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Tuple
+
+# The recorded attributes that are stored as segments when they are long enough.
+SEGMENTED_ATTRIBUTES = frozenset({"__anext__", "__next__"})
+DEFAULT_STREAM_SEGMENT_LENGTH = 1000
+
+_read_ahead_executor: ThreadPoolExecutor | None = None
+_read_ahead_executor_lock = threading.Lock()
+
+
+def _get_read_ahead_executor() -> ThreadPoolExecutor:
+    global _read_ahead_executor
+    with _read_ahead_executor_lock:
+        if _read_ahead_executor is None:
+            _read_ahead_executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="mock-isolator-read-ahead"
+            )
+        return _read_ahead_executor
+
+
+class SegmentedStream:
+    """
+    The recorded accesses of a stream attribute (ie. the items of an iterator)
+    loaded one segment at a time. While a segment is replayed, the next read_ahead
+    segments are loaded in the background, so that only those are in memory.
+    load_segment returns the decoded values of a segment and their durations.
+    """
+
+    def __init__(
+        self,
+        segment_names: list[str],
+        length: int,
+        load_segment: Callable[[str], Tuple[list[Any], list[float | None] | None]],
+        read_ahead: int = 1,
+    ):
+        self._segment_names = segment_names
+        self._length = length
+        self._load_segment = load_segment
+        self._read_ahead = read_ahead
+        self._next_segment_index = 0
+        self._pending_segments: deque[Future] = deque()
+        self._values: deque[Any] = deque()
+        self._durations: deque[float | None] = deque()
+        self._schedule_segments()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __getitem__(self, index: int) -> Any:
+        if index != 0:
+            raise IndexError("Only the next item of a SegmentedStream can be read.")
+        return self.peek()
+
+    def peek(self) -> Any:
+        self._fill()
+        return self._values[0]
+
+    def pop(self, index: int = 0) -> Any:
+        return self.pop_entry(index)[0]
+
+    def pop_entry(self, index: int = 0) -> Tuple[Any, float | None]:
+        """Pop the next value and its recorded duration."""
+        if index != 0:
+            raise IndexError("Only the next item of a SegmentedStream can be popped.")
+        self._fill()
+        value = self._values.popleft()
+        self._length -= 1
+        return value, self._durations.popleft()
+
+    def _fill(self) -> None:
+        while not self._values and self._pending_segments:
+            values, durations = self._pending_segments.popleft().result()
+            self._values.extend(values)
+            self._durations.extend(durations or [None] * len(values))
+            self._schedule_segments()
+
+    def _schedule_segments(self) -> None:
+        # Load the segment being replayed and read_ahead segments after it.
+        max_pending_segments = self._read_ahead + (0 if self._values else 1)
+        while len(self._pending_segments) < max_pending_segments and (
+            self._next_segment_index < len(self._segment_names)
+        ):
+            segment_name = self._segment_names[self._next_segment_index]
+            self._pending_segments.append(
+                _get_read_ahead_executor().submit(self._load_segment, segment_name)
+            )
+            self._next_segment_index += 1
+
+    def __repr__(self) -> str:
+        return f"SegmentedStream(length={self._length})"
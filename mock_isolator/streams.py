@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Coroutine, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_current_stream_key: ContextVar[str | None] = ContextVar(
+    "mock_isolator_stream_key", default=None
+)
+
+
+def get_stream_key() -> str | None:
+    """Return the logical stream key of the running task, if any."""
+    return _current_stream_key.get()
+
+
+@contextmanager
+def stream_key(key: str) -> Iterator[None]:
+    """
+    Tag every mock interaction made inside the block with a caller-supplied key so
+    that it is replayed to the same logical stream regardless of completion order:
+
+    >>> async def fetch_user(user_id):
+    ...     with stream_key(f"user-{user_id}"):
+    ...         return await client.get_user(user_id)
+    """
+    token = _current_stream_key.set(key)
+    try:
+        yield
+    finally:
+        _current_stream_key.reset(token)
+
+
+class StreamKeyTaskFactory:
+    """
+    An asyncio task factory that gives each task a stream key based on its spawn
+    order within its parent's stream, ie. the tasks created by
+    `asyncio.gather(a(), b())` are keyed "0" and "1" and a task spawned by "1" is
+    keyed "1.0".
+    """
+
+    def __init__(self) -> None:
+        self._spawn_counts: dict[str | None, int] = {}
+
+    def __call__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        coro: Coroutine[Any, Any, Any],
+        **kwargs: Any,
+    ) -> asyncio.Task[Any]:
+        child_key = _next_child_stream_key(self._spawn_counts)
+        context = kwargs.pop("context", None) or copy_context()
+        context.run(_current_stream_key.set, child_key)
+        return asyncio.Task(coro, loop=loop, context=context, **kwargs)
+
+
+def install_task_stream_keys(loop: asyncio.AbstractEventLoop | None = None) -> None:
+    """
+    Key the tasks spawned on the loop by spawn order. Install it in both RECORD and
+    REPLAY so that the recorded streams line up with the replayed ones.
+    """
+    (loop or asyncio.get_running_loop()).set_task_factory(StreamKeyTaskFactory())
+
+
+class StreamKeyThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    A ThreadPoolExecutor that runs each submitted function in a copy of the caller's
+    context with a stream key based on its submission order, ie. the functions of
+    `executor.map(fetch, ids)` are keyed "0", "1", ... in the order of `ids` no
+    matter which worker thread runs them. Use a new executor for each fan-out in
+    both RECORD and REPLAY so that the keys line up.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._spawn_counts: dict[str | None, int] = {}
+        self._spawn_lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        with self._spawn_lock:
+            child_key = _next_child_stream_key(self._spawn_counts)
+        context = copy_context()
+        context.run(_current_stream_key.set, child_key)
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+def _next_child_stream_key(spawn_counts: dict[str | None, int]) -> str:
+    parent_key = _current_stream_key.get()
+    spawn_index = spawn_counts.get(parent_key, 0)
+    spawn_counts[parent_key] = spawn_index + 1
+    return str(spawn_index) if parent_key is None else f"{parent_key}.{spawn_index}"
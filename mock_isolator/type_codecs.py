@@ -0,0 +1,405 @@
+"""
+The types of values that are recorded as they are, and how DictMockRecordingEncoder
+encodes and decodes them. Register a codec to support another type, ie.:
+
+    register_type_codec(
+        UUID,
+        "UUID",
+        encode=lambda item, context: {"value": str(item)},
+        decode=lambda encoded, context: UUID(encoded["value"]),
+    )
+
+BasicRecordingMocker then returns values of that type as they are instead of
+wrapping them in a RecordingMock, and the encoder stores them as
+{"__type__": "UUID", "value": ...}.
+"""
+
+import base64
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Type
+
+from bson import ObjectId
+
+from mock_isolator import numpy_arrays
+from mock_isolator.recording_budget import (
+    SAMPLED,
+    TRUNCATED,
+    SampledRecording,
+    TruncatedDict,
+    TruncatedList,
+    TruncatedRecording,
+)
+
+DEFAULT_BLOB_THRESHOLD = 64 * 1024
+
+
+class EncodeContext:
+    """
+    What codecs can use while encoding: encode_item encodes a nested value, and
+    values of at least blob_threshold bytes can be written to the sidecar store.
+    """
+
+    def __init__(
+        self,
+        encode_item: Callable[[Any], Any],
+        sidecar_store: Any = None,
+        blob_threshold: int = DEFAULT_BLOB_THRESHOLD,
+    ):
+        self.encode_item = encode_item
+        self.sidecar_store = sidecar_store
+        self.blob_threshold = blob_threshold
+
+
+class DecodeContext:
+    def __init__(self, decode_item: Callable[[Any], Any], sidecar_store: Any = None):
+        self.decode_item = decode_item
+        self.sidecar_store = sidecar_store
+
+
+class TypeCodec:
+    """
+    With a tag, encode returns the fields of the encoding, which is stored as
+    {"__type__": tag, **fields}, and decode gets that dict back. Without a tag, the
+    value is encoded as a JSON value (ie. str, list or dict) and decoded as such.
+    Concrete values are returned as they are by BasicRecordingMocker, while the
+    others are only encoded (ie. containers, whose items are wrapped, or values
+    that are only created while recording).
+
+    The nested_fields of the encoding hold a list or dict of values that the encoder
+    encodes (and decodes before calling decode) itself, without recursing, so that
+    nesting them is not bounded by the recursion limit.
+    """
+
+    __slots__ = ("type", "tag", "encode", "decode", "concrete", "nested_fields")
+
+    def __init__(
+        self,
+        type: Type,
+        tag: str | None,
+        encode: Callable[[Any, EncodeContext], Any],
+        decode: Callable[[Dict[str, Any], DecodeContext], Any] | None = None,
+        concrete: bool = True,
+        nested_fields: tuple[str, ...] = (),
+    ):
+        self.type = type
+        self.tag = tag
+        self.encode = encode
+        self.decode = decode
+        self.concrete = concrete
+        self.nested_fields = nested_fields
+
+
+class CodecRegistry:
+    """
+    Finds the codec of a value by its exact type with a dict lookup. Subclasses of
+    registered types use the codec of their nearest registered base class, which is
+    looked up along the MRO once and cached.
+    """
+
+    def __init__(self) -> None:
+        self._codecs_by_type: Dict[Type, TypeCodec] = {}
+        self._codecs_by_tag: Dict[str, TypeCodec] = {}
+        self._codecs_by_subclass: Dict[Type, TypeCodec | None] = {}
+        self._lock = threading.Lock()
+        # The types that are encoded as they are, which the encoder skips.
+        self.as_is_types: frozenset[Type] = frozenset()
+        # The codecs without nested fields, which the decoder runs right away.
+        self.leaf_codecs_by_tag: Dict[str, TypeCodec] = {}
+        # And the others, which it runs once their nested fields are decoded.
+        self.nested_codecs_by_tag: Dict[str, TypeCodec] = {}
+
+    def register(
+        self,
+        type: Type,
+        tag: str | None,
+        encode: Callable[[Any, EncodeContext], Any],
+        decode: Callable[[Dict[str, Any], DecodeContext], Any] | None = None,
+        concrete: bool = True,
+        nested_fields: tuple[str, ...] = (),
+    ) -> TypeCodec:
+        if tag is not None and decode is None:
+            raise ValueError(f"The codec of {type} has a tag but no decode function.")
+        if nested_fields and tag is None:
+            raise ValueError(f"The codec of {type} has nested_fields but no tag.")
+        codec = TypeCodec(type, tag, encode, decode, concrete, nested_fields)
+        with self._lock:
+            existing_codec = self._codecs_by_tag.get(tag) if tag else None
+            if existing_codec is not None and existing_codec.type is not type:
+                raise ValueError(
+                    f"Tag {tag} is already registered for {existing_codec.type}."
+                )
+            self._codecs_by_type[type] = codec
+            if tag is not None:
+                self._codecs_by_tag[tag] = codec
+            self._codecs_by_subclass = {}
+            self.as_is_types = frozenset(
+                codec.type
+                for codec in self._codecs_by_type.values()
+                if codec.encode is _encode_as_is
+            )
+            self.leaf_codecs_by_tag = {
+                tag: codec
+                for tag, codec in self._codecs_by_tag.items()
+                if not codec.nested_fields
+            }
+            self.nested_codecs_by_tag = {
+                tag: codec
+                for tag, codec in self._codecs_by_tag.items()
+                if codec.nested_fields
+            }
+        return codec
+
+    def get_codec(self, item_type: Type) -> TypeCodec | None:
+        codec = self._codecs_by_type.get(item_type)
+        if codec is not None:
+            return codec
+        try:
+            return self._codecs_by_subclass[item_type]
+        except KeyError:
+            pass
+        codec = next(
+            (
+                self._codecs_by_type[base]
+                for base in item_type.__mro__[1:]
+                if base in self._codecs_by_type
+            ),
+            None,
+        )
+        self._codecs_by_subclass[item_type] = codec
+        return codec
+
+    def get_codec_by_tag(self, tag: str) -> TypeCodec | None:
+        return self._codecs_by_tag.get(tag)
+
+    @property
+    def types(self) -> tuple[Type, ...]:
+        return tuple(self._codecs_by_type)
+
+    @property
+    def concrete_types(self) -> tuple[Type, ...]:
+        return tuple(
+            codec.type for codec in self._codecs_by_type.values() if codec.concrete
+        )
+
+
+def _encode_as_is(item: Any, context: EncodeContext) -> Any:
+    return item
+
+
+def _encode_dict(item: dict, context: EncodeContext) -> Any:
+    return {k: context.encode_item(v) for k, v in item.items()}
+
+
+def _encode_list(item: list, context: EncodeContext) -> Any:
+    return [context.encode_item(i) for i in item]
+
+
+def _encode_items(item: Any, context: EncodeContext) -> Dict[str, Any]:
+    return {"value": list(item)}
+
+
+def _get_decode_items(
+    item_type: Type,
+) -> Callable[[Dict[str, Any], DecodeContext], Any]:
+    def decode_items(encoded: Dict[str, Any], context: DecodeContext) -> Any:
+        return item_type(encoded["value"])
+
+    return decode_items
+
+
+def _encode_as_string(item: Any, context: EncodeContext) -> Dict[str, Any]:
+    return {"value": str(item)}
+
+
+def _encode_isoformat(item: date, context: EncodeContext) -> Dict[str, Any]:
+    return {"value": item.isoformat()}
+
+
+def _encode_binary(
+    item: bytes | bytearray | memoryview, context: EncodeContext
+) -> Dict[str, Any]:
+    if isinstance(item, memoryview) and not item.c_contiguous:
+        item = item.tobytes()
+    nbytes = item.nbytes if isinstance(item, memoryview) else len(item)
+    if context.sidecar_store is not None and nbytes >= context.blob_threshold:
+        return {"blob": context.sidecar_store.write_blob(item)}
+    return {"value": base64.b64encode(item).decode()}
+
+
+def _decode_binary(
+    encoded: Dict[str, Any], context: DecodeContext
+) -> bytes | bytearray | memoryview:
+    """
+    Blobs are memory-mapped, and recorded memoryviews are replayed as views of the
+    mapping without a copy. Recorded bytes and bytearrays are copied out of it once,
+    since replaying them as memoryviews would change their type (ie. no .decode()),
+    and CPython cannot create bytes over a memory-mapped buffer.
+    """
+    if "blob" in encoded:
+        if context.sidecar_store is None:
+            raise ValueError(
+                f"Blob {encoded['blob']} is stored next to the recording, but no "
+                "sidecar store was given."
+            )
+        view = context.sidecar_store.read_blob(str(encoded["blob"]))
+    else:
+        view = memoryview(base64.b64decode(str(encoded["value"])))
+    if encoded["__type__"] == "memoryview":
+        return view
+    if encoded["__type__"] == "bytearray":
+        return bytearray(view)
+    return view.obj if isinstance(view.obj, bytes) else view.tobytes()
+
+
+def _encode_array(item: Any, context: EncodeContext) -> Dict[str, Any]:
+    numpy_arrays.check_array_is_encodable(item)
+    if context.sidecar_store is not None and item.nbytes >= context.blob_threshold:
+        return {"npy": context.sidecar_store.write_array(item)}
+    return {"value": base64.b64encode(numpy_arrays.array_to_npy_bytes(item)).decode()}
+
+
+def _decode_array(encoded: Dict[str, Any], context: DecodeContext) -> Any:
+    if "npy" in encoded:
+        if context.sidecar_store is None:
+            raise ValueError(
+                f"Array {encoded['npy']} is stored next to the recording, but no "
+                "sidecar store was given."
+            )
+        return context.sidecar_store.read_array(str(encoded["npy"]))
+    return numpy_arrays.array_from_npy_bytes(base64.b64decode(str(encoded["value"])))
+
+
+def _encode_error_args(
+    item: KeyError | IndexError, context: EncodeContext
+) -> Dict[str, Any]:
+    return {"args": list(item.args)}
+
+
+def _get_decode_error(
+    error_type: Type[Exception],
+) -> Callable[[Dict[str, Any], DecodeContext], Any]:
+    def decode_error(encoded: Dict[str, Any], context: DecodeContext) -> Any:
+        return error_type(*encoded.get("args", []))
+
+    return decode_error
+
+
+def register_default_codecs(registry: CodecRegistry) -> None:
+    for json_type in [int, str, float, bool, type(None)]:
+        registry.register(json_type, None, _encode_as_is)
+    # The encoder walks dicts and lists itself.
+    registry.register(dict, None, _encode_dict, concrete=False)
+    registry.register(list, None, _encode_list, concrete=False)
+    registry.register(
+        Decimal,
+        "Decimal",
+        _encode_as_string,
+        lambda encoded, context: Decimal(str(encoded["value"])),
+    )
+    registry.register(
+        date,
+        "date",
+        _encode_isoformat,
+        lambda encoded, context: date.fromisoformat(str(encoded["value"])),
+    )
+    registry.register(
+        datetime,
+        "datetime",
+        _encode_isoformat,
+        lambda encoded, context: datetime.fromisoformat(str(encoded["value"])),
+    )
+    registry.register(
+        ObjectId,
+        "ObjectId",
+        _encode_as_string,
+        lambda encoded, context: ObjectId(str(encoded["value"])),
+    )
+    for binary_type in [bytes, bytearray, memoryview]:
+        registry.register(
+            binary_type, binary_type.__name__, _encode_binary, _decode_binary
+        )
+    for array_type in numpy_arrays.ARRAY_TYPES:
+        registry.register(array_type, "ndarray", _encode_array, _decode_array)
+    # The items of sets are wrapped by BasicRecordingMocker, and tuples in a
+    # RecordingMock.
+    for items_type in [tuple, set, frozenset]:
+        registry.register(
+            items_type,
+            items_type.__name__,
+            _encode_items,
+            _get_decode_items(items_type),
+            concrete=False,
+            nested_fields=("value",),
+        )
+    # Only created while recording.
+    registry.register(
+        TruncatedRecording,
+        "truncated",
+        lambda item, context: {},
+        lambda encoded, context: TRUNCATED,
+        concrete=False,
+    )
+    registry.register(
+        SampledRecording,
+        "sampled",
+        lambda item, context: {},
+        lambda encoded, context: SAMPLED,
+        concrete=False,
+    )
+    registry.register(
+        TruncatedList,
+        "truncated_list",
+        lambda item, context: {"value": item.recorded_items, "length": item.length},
+        lambda encoded, context: TruncatedList(
+            encoded["value"], int(encoded["length"])
+        ),
+        concrete=False,
+        nested_fields=("value",),
+    )
+    registry.register(
+        TruncatedDict,
+        "truncated_dict",
+        lambda item, context: {"value": dict(item), "length": item.length},
+        lambda encoded, context: TruncatedDict(
+            encoded["value"], int(encoded["length"])
+        ),
+        concrete=False,
+        nested_fields=("value",),
+    )
+    for stop_type in [StopAsyncIteration, StopIteration]:
+        registry.register(
+            stop_type,
+            stop_type.__name__,
+            lambda item, context: {},
+            _get_decode_error(stop_type),
+            concrete=False,
+        )
+    for error_type in [KeyError, IndexError]:
+        registry.register(
+            error_type,
+            error_type.__name__,
+            _encode_error_args,
+            _get_decode_error(error_type),
+            concrete=False,
+            nested_fields=("args",),
+        )
+
+
+DEFAULT_CODEC_REGISTRY = CodecRegistry()
+register_default_codecs(DEFAULT_CODEC_REGISTRY)
+
+
+def register_type_codec(
+    type: Type,
+    tag: str | None,
+    encode: Callable[[Any, EncodeContext], Any],
+    decode: Callable[[Dict[str, Any], DecodeContext], Any] | None = None,
+    concrete: bool = True,
+    nested_fields: tuple[str, ...] = (),
+) -> TypeCodec:
+    """Register a codec in the registry used by default, see CodecRegistry."""
+    return DEFAULT_CODEC_REGISTRY.register(
+        type, tag, encode, decode, concrete, nested_fields
+    )
@@ -4,4 +4,10 @@ from enum import Enum
 class MockIsolatorMode(Enum):
     RECORD = "RECORD"
     REPLAY = "REPLAY"
-    INTERACTIVE = "INTERACTIVE"
\ No newline at end of file
+    INTERACTIVE = "INTERACTIVE"
+
+
+class RecordingBudgetPolicy(Enum):
+    FAIL = "FAIL"
+    TRUNCATE = "TRUNCATE"
+    SAMPLE = "SAMPLE"
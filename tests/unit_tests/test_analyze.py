@@ -0,0 +1,121 @@
+import io
+import json
+import os
+from contextlib import ExitStack
+
+from mock_isolator import convert, recording_cache
+from mock_isolator.analyze import _iter_json_events, analyze_recordings, main
+from mock_isolator.isolator import isolate_dependencies_with_mocks
+from mock_isolator.mock_recording_encoder import (
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.types import MockIsolatorMode
+
+
+class Catalog:
+    def __init__(self):
+        self.name = "catalog"
+
+    def get_products(self, page: int) -> list[dict[str, str]]:
+        return [{"sku": f"sku-{i}", "description": "x" * 100} for i in range(10)]
+
+
+def _record_catalog(filepath: str, pages: int) -> None:
+    mock = RecordingMock(Catalog(), BasicRecordingMocker())
+    for page in range(pages):
+        mock.get_products(page)
+        assert mock.name == "catalog"
+    get_json_file_mock_interaction_recording_store().store_recorded_mock_interactions_to_file(
+        mock, filepath
+    )
+
+
+def test_analyze_recordings(tmp_path) -> None:
+    prefix = f"{tmp_path}/test_catalog_"
+    _record_catalog(f"{prefix}catalog.json", pages=3)
+    _record_catalog(f"{prefix}other_catalog.json", pages=1)
+
+    report = analyze_recordings([prefix], top=5)
+
+    assert report["files"] == 2
+    assert report["bytes_per_patch_path"] == {
+        "catalog": os.path.getsize(f"{prefix}catalog.json"),
+        "other_catalog": os.path.getsize(f"{prefix}other_catalog.json"),
+    }
+    assert list(report["bytes_per_attribute"])[0] == "catalog.get_products"
+    assert "catalog.get_products" in report["bytes_per_mock_path"]
+    assert len(report["largest_subtrees"]) == 5
+    assert report["largest_subtrees"][0]["json_path"] == "$"
+    # name is repeated in both recordings, and get_products in the one with a single
+    # page since the pages were called with different arguments.
+    assert report["repeat_compaction"]["repeated_attributes"] == 3
+    assert report["repeat_compaction"]["listed_attributes"] == 1
+    # All the pages of products are identical.
+    assert report["estimated_savings"]["deduplicated_subtrees_bytes"] > 3 * 1000
+    assert report["estimated_savings"]["gzip_compact_json_bytes"] > 0
+
+
+def test_analyze_recordings_counts_sidecar_files(tmp_path) -> None:
+    _record_catalog(f"{tmp_path}/catalog.json", pages=1)
+    with open(f"{tmp_path}/catalog.json.0123.blob", "wb") as file:
+        file.write(b"x" * 1000)
+
+    report = analyze_recordings([str(tmp_path)])
+
+    assert report["sidecar_bytes"] == 1000
+    assert report["file_bytes"] == report["bytes_per_patch_path"]["catalog"]
+    assert report["file_bytes"] == os.path.getsize(f"{tmp_path}/catalog.json") + 1000
+
+
+def test_iter_json_events_reads_scalars_split_across_chunks() -> None:
+    events = _iter_json_events(
+        io.StringIO('{"a": [-12.5e3, "b\\"c", true], "d": {}}'), chunk_size=2
+    )
+
+    assert list(events) == [
+        ("start", "{"),
+        ("key", "a"),
+        ("start", "["),
+        ("value", -12.5e3),
+        ("value", 'b"c'),
+        ("value", True),
+        ("end", None),
+        ("key", "d"),
+        ("start", "{"),
+        ("end", None),
+        ("end", None),
+    ]
+
+
+def test_analyze_main_prints_json_report_for_directory(tmp_path, capsys) -> None:
+    _record_catalog(f"{tmp_path}/catalog.json", pages=1)
+
+    assert main([str(tmp_path), "--json"]) == 0
+
+    report = json.loads(capsys.readouterr().out)
+    assert list(report["bytes_per_patch_path"]) == ["catalog"]
+
+
+def test_command_line_tools_skip_recording_stats(tmp_path, capsys) -> None:
+    with ExitStack() as exit_stack:
+        mocks = isolate_dependencies_with_mocks(
+            exit_stack,
+            [Catalog()],
+            ["catalog"],
+            MockIsolatorMode.RECORD,
+            f"{tmp_path}/test_x.",
+            record_stats=True,
+        )
+        mocks["catalog"].get_products(0)
+    assert sorted(os.listdir(tmp_path)) == [
+        "test_x.__recording_stats__.json",
+        "test_x.catalog.json",
+    ]
+
+    assert main([str(tmp_path), "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["files"] == 1
+    assert recording_cache.main([str(tmp_path)]) == 0
+    assert "Cached 1 recordings." in capsys.readouterr().out
+    assert convert.main(["--format", "compact", "--jobs", "1", str(tmp_path)]) == 0
+    assert "Converted 1 recordings" in capsys.readouterr().out
@@ -0,0 +1,56 @@
+import os
+
+from mock_isolator.convert import main
+from mock_isolator.mock_recording_encoder import (
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.recording_files import GZIP_MAGIC
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+
+
+class Weather:
+    def get_forecast(self, city: str) -> list[dict[str, str]]:
+        return [{"city": city, "day": str(day), "sky": "clear"} for day in range(7)]
+
+
+def _record_forecast(filepath: str, city: str) -> None:
+    mock = RecordingMock(Weather(), BasicRecordingMocker())
+    mock.get_forecast(city)
+    get_json_file_mock_interaction_recording_store().store_recorded_mock_interactions_to_file(
+        mock, filepath
+    )
+
+
+def test_convert_recordings_to_compressed_compact_json(tmp_path, capsys) -> None:
+    (tmp_path / "nested").mkdir()
+    filepaths = [f"{tmp_path}/test_a_weather.json", f"{tmp_path}/nested/test_b.json"]
+    for filepath, city in zip(filepaths, ["Oslo", "Lima"]):
+        _record_forecast(filepath, city)
+    sizes = [os.path.getsize(filepath) for filepath in filepaths]
+
+    assert main(["--format", "compact", "--gzip", "--jobs", "2", str(tmp_path)]) == 0
+    assert "Converted 2 recordings" in capsys.readouterr().out
+    for filepath, size in zip(filepaths, sizes):
+        assert os.path.getsize(filepath) < size
+        with open(filepath, "rb") as file:
+            assert file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    store = get_json_file_mock_interaction_recording_store()
+    forecast = store.load_recorded_mock_interactions_from_file(filepaths[1])
+    assert forecast.get_forecast("Oslo")[0] == {
+        "city": "Lima",
+        "day": "0",
+        "sky": "clear",
+    }
+
+    # Running it again, ie. after an interruption, leaves converted files as they are.
+    _record_forecast(filepaths[0], "Oslo")
+    assert main(["--format", "compact", "--gzip", "--jobs", "2", str(tmp_path)]) == 0
+    assert "Converted 1 recordings" in capsys.readouterr().out
+
+    # Edited recordings are validated rather than given a new checksum.
+    with open(filepaths[0], "w") as file:
+        file.write('{"recorded_calls": {}}')
+    assert main(["--jobs", "2", str(tmp_path)]) == 1
+    assert "Expected __type__" in capsys.readouterr().err
+    with open(filepaths[0]) as file:
+        assert file.read() == '{"recorded_calls": {}}'
@@ -1,9 +1,24 @@
+import glob
+import json
+import mmap
 import os
+import sys
+from datetime import datetime
+from decimal import Decimal
 
+import pytest
+
+from mock_isolator import mock_recording_encoder
 from mock_isolator.mock_recording_encoder import (
+    DictEncodingType,
     DictMockRecordingEncoder,
+    FileRecordingSidecarStore,
+    JsonMockRecordingInteractionSerializer,
+    MockRecordingInteractionSerializer,
+    MockRecordingStore,
     get_json_file_mock_interaction_recording_store,
 )
+from mock_isolator.recording_checksum import CHECKSUM_KEY, get_checksum
 from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
 from mock_isolator.replaying_mock import ReplayingMock
 
@@ -231,3 +246,457 @@ def test_record_and_replay_interactions_with_empty_async_indexes():
     assert isinstance(decoded, ReplayingMock)
     assert "attr1" in decoded._recorded_attribute_accesses
     assert "sync_only_attr" in decoded._recorded_attribute_accesses
+
+
+def test_encode_and_decode_durations():
+    def slow_function(x: int) -> int:
+        return x
+
+    mock = RecordingMock(
+        wrapped_item=slow_function, mocker=BasicRecordingMocker(record_durations=True)
+    )
+    mock(1)
+    mock(2)
+    mock.recorded_call_durations = {0: 0.1234567, 1: 0.2}
+
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    assert encoded["recorded_call_durations"] == [0.123457, 0.2]
+
+    decoded = encoder.decode_recording_mock_interactions(encoded)
+    assert decoded._recorded_call_durations == [0.123457, 0.2]
+    assert decoded(1) == 1
+    assert decoded(2) == 2
+
+
+class MessageStream:
+    def __init__(self, count: int):
+        self._messages = iter(range(count))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return {"message": next(self._messages)}
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_store_and_replay_segmented_stream(tmp_path):
+    mock = RecordingMock(wrapped_item=MessageStream(25), mocker=BasicRecordingMocker())
+    assert [message async for message in mock] == [{"message": i} for i in range(25)]
+
+    recording_store = MockRecordingStore(
+        DictMockRecordingEncoder(stream_segment_length=10),
+        JsonMockRecordingInteractionSerializer(),
+    )
+    filepath = f"{tmp_path}/stream.json"
+    recording_store.store_recorded_mock_interactions_to_file(mock, filepath)
+    # 25 messages and the StopAsyncIteration in 3 segments.
+    assert len(glob.glob(f"{filepath}.*.segment")) == 3
+    with open(filepath) as file:
+        stream_iterator = json.load(file)["recorded_attribute_accesses"]["__aiter__"]
+    accesses = stream_iterator["__repeat__"]["value"]["recorded_attribute_accesses"]
+    assert accesses["__anext__"]["length"] == 26
+
+    replayed = recording_store.load_recorded_mock_interactions_from_file(filepath)
+    assert [message async for message in replayed] == [
+        {"message": i} for i in range(25)
+    ]
+
+
+def test_encode_and_decode_stop_async_iteration():
+    mock = RecordingMock(wrapped_item=object(), mocker=BasicRecordingMocker())
+    mock._record_attribute_access("__anext__", StopAsyncIteration(), is_async=True)
+
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    assert encoded["recorded_attribute_accesses"]["__anext__"] == {
+        "__repeat__": {
+            "__type__": "async_value",
+            "value": {"__type__": "StopAsyncIteration"},
+        }
+    }
+    decoded = encoder.decode_recording_mock_interactions(encoded)
+    value = decoded._recorded_attribute_accesses["__anext__"]["__repeat__"]["value"]
+    assert isinstance(value, StopAsyncIteration)
+
+
+class Cursor:
+    def __init__(self, count: int):
+        self._count = count
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield {"id": i}
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def test_store_and_replay_sync_iteration(tmp_path):
+    mock = RecordingMock(wrapped_item=Cursor(25), mocker=BasicRecordingMocker())
+    assert len(mock) == 25
+    assert list(mock) == [{"id": i} for i in range(25)]
+
+    recording_store = MockRecordingStore(
+        DictMockRecordingEncoder(stream_segment_length=10),
+        JsonMockRecordingInteractionSerializer(),
+    )
+    filepath = f"{tmp_path}/cursor.json"
+    recording_store.store_recorded_mock_interactions_to_file(mock, filepath)
+    # 25 rows and the StopIteration in 3 segments.
+    assert len(glob.glob(f"{filepath}.*.segment")) == 3
+
+    replayed = recording_store.load_recorded_mock_interactions_from_file(filepath)
+    assert len(replayed) == 25
+    assert list(replayed) == [{"id": i} for i in range(25)]
+
+
+class JsonBytesSerializer(MockRecordingInteractionSerializer[DictEncodingType, bytes]):
+    def serialize_encoded_mock_interactions(
+        self, encoded_interactions: DictEncodingType
+    ) -> bytes:
+        return json.dumps(encoded_interactions).encode()
+
+    def deserialize_encoded_mock_interactions(
+        self, serialized_interactions: bytes
+    ) -> DictEncodingType:
+        return json.loads(serialized_interactions.decode())
+
+
+def test_replay_segments_of_a_bytes_serializer(tmp_path):
+    mock = RecordingMock(wrapped_item=Cursor(25), mocker=BasicRecordingMocker())
+    assert list(mock) == [{"id": i} for i in range(25)]
+
+    encoder = DictMockRecordingEncoder(stream_segment_length=10)
+    sidecar_store = FileRecordingSidecarStore(
+        JsonBytesSerializer(), f"{tmp_path}/cursor.json"
+    )
+    encoded = encoder.encode_recording_mock_interactions(mock, sidecar_store)
+    assert len(glob.glob(f"{tmp_path}/cursor.json.*.bytes.segment")) == 3
+    replayed = encoder.decode_recording_mock_interactions(encoded, sidecar_store)
+    assert list(replayed) == [{"id": i} for i in range(25)]
+
+
+def test_segments_of_streams_kept_in_the_recording_are_removed(tmp_path):
+    mocker = BasicRecordingMocker()
+    author = RecordingMock(wrapped_item=object(), mocker=mocker)
+    author._record_attribute_access("name", "Ursula")
+    rows = RecordingMock(wrapped_item=object(), mocker=mocker)
+    for i in range(25):
+        rows._record_attribute_access("__next__", {"id": i})
+    # Its first segment is the same as the first segment of rows, and it reaches
+    # the author, which is shared, so it is kept in the recording.
+    rows_with_author = RecordingMock(wrapped_item=object(), mocker=mocker)
+    for i in range(25):
+        row = {"id" if i < 10 else "row": i}
+        rows_with_author._record_attribute_access("__next__", row)
+    rows_with_author._record_attribute_access("__next__", author)
+    mock = RecordingMock(wrapped_item=object(), mocker=mocker)
+    mock._record_attribute_access("rows", rows)
+    mock._record_attribute_access("rows_with_author", rows_with_author)
+    mock._record_attribute_access("author", author)
+
+    recording_store = MockRecordingStore(
+        DictMockRecordingEncoder(stream_segment_length=10),
+        JsonMockRecordingInteractionSerializer(),
+    )
+    filepath = f"{tmp_path}/rows.json"
+    recording_store.store_recorded_mock_interactions_to_file(mock, filepath)
+    with open(filepath) as file:
+        accesses = json.load(file)["recorded_attribute_accesses"]
+    rows_accesses = accesses["rows"]["__repeat__"]["recorded_attribute_accesses"]
+    segment_names = rows_accesses["__next__"]["__segments__"]
+    assert sorted(glob.glob(f"{filepath}.*.segment")) == sorted(
+        f"{filepath}.{segment_name}.segment" for segment_name in segment_names
+    )
+    rows_with_author_accesses = accesses["rows_with_author"]["__repeat__"][
+        "recorded_attribute_accesses"
+    ]
+    assert len(rows_with_author_accesses["__next__"]) == 26
+
+
+def test_encode_and_decode_lookup_errors():
+    mock = RecordingMock(wrapped_item={"id": 1}, mocker=BasicRecordingMocker())
+    mock._record_attribute_access("__getitem__", KeyError("name"))
+    mock._record_attribute_access("__getitem__", IndexError())
+
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    assert encoded["recorded_attribute_accesses"]["__getitem__"] == [
+        {"__type__": "KeyError", "args": ["name"]},
+        {"__type__": "IndexError", "args": []},
+    ]
+    decoded = encoder.decode_recording_mock_interactions(encoded)
+    with pytest.raises(KeyError, match="name"):
+        decoded["name"]
+    with pytest.raises(IndexError):
+        decoded[5]
+
+
+class Author:
+    def __init__(self, name: str):
+        self.name = name
+        self.books: list["Book"] = []
+
+
+class Book:
+    def __init__(self, title: str, author: Author):
+        self.title = title
+        self.author = author
+        author.books.append(self)
+
+
+class Library:
+    def __init__(self):
+        self.author = Author("Ursula")
+        Book("Earthsea", self.author)
+        Book("The Dispossessed", self.author)
+
+    def get_author(self) -> Author:
+        return self.author
+
+
+def test_encode_and_decode_shared_and_cyclic_mocks():
+    mock = RecordingMock(
+        wrapped_item=Library(), mocker=BasicRecordingMocker(preserve_identity=True)
+    )
+    author = mock.get_author()
+    assert mock.get_author() is author
+    for book in author.books:
+        assert book.author is author
+        assert book.author.name == "Ursula"
+
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    # Each access to get_author is a new bound method returning the same author.
+    first_call, second_call = [
+        get_author["recorded_calls"][0]["value"][1]
+        for get_author in encoded["recorded_attribute_accesses"]["get_author"]
+    ]
+    assert first_call["__id__"] == 0
+    assert second_call == {"__type__": "ref", "id": 0}
+    for encoded_book in first_call["recorded_attribute_accesses"]["books"][
+        "__repeat__"
+    ]:
+        # Accessing the author twice is compacted since it is the same mock.
+        assert encoded_book["recorded_attribute_accesses"]["author"] == {
+            "__repeat__": {"__type__": "ref", "id": 0}
+        }
+
+    decoded = encoder.decode_recording_mock_interactions(encoded)
+    replayed_author = decoded.get_author()
+    assert decoded.get_author() is replayed_author
+    for book in replayed_author.books:
+        assert book.author is replayed_author
+    assert replayed_author.name == "Ursula"
+
+
+class Orders:
+    def list_orders(self) -> list[dict]:
+        return [
+            {
+                "status": "shipped",
+                "created_at": datetime(2024, 1, 1),
+                "total": Decimal(total),
+                "note": "left with the neighbour next door",
+            }
+            for total in ["1.0", "1.00", "1.0"]
+        ]
+
+
+def test_decode_equal_values_into_shared_objects():
+    mock = RecordingMock(wrapped_item=Orders(), mocker=BasicRecordingMocker())
+    mock.list_orders()
+    encoder = DictMockRecordingEncoder(intern_max_length=24)
+    # Each value is a separate object after parsing.
+    encoded = json.loads(json.dumps(encoder.encode_recording_mock_interactions(mock)))
+
+    first, second, third = encoder.decode_recording_mock_interactions(
+        encoded
+    ).list_orders()
+    assert first["status"] is second["status"] is third["status"]
+    assert first["created_at"] is second["created_at"] is third["created_at"]
+    assert first["total"] is third["total"]
+    # Equal but differently encoded values stay distinct.
+    assert str(second["total"]) == "1.00"
+    # Longer than intern_max_length.
+    assert first["note"] == second["note"]
+    assert first["note"] is not second["note"]
+
+
+class LinkedNode:
+    def __init__(self, depth: int, next: "LinkedNode | None" = None):
+        self.depth = depth
+        self.next = next
+
+
+def test_encode_and_decode_recordings_deeper_than_the_recursion_limit():
+    depth = sys.getrecursionlimit() * 2
+    head = LinkedNode(0)
+    for i in range(depth):
+        head = LinkedNode(i + 1, head)
+    mock = RecordingMock(wrapped_item=head, mocker=BasicRecordingMocker())
+    node = mock
+    while (next_node := node.next) is not None:
+        node = next_node
+    assert node.depth == 0
+
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    decoded = encoder.decode_recording_mock_interactions(encoded)
+    for _ in range(depth):
+        decoded = decoded.next
+    assert decoded.depth == 0
+    assert decoded.next is None
+
+
+def test_decode_in_order_past_the_recursion_depth_of_the_decoder():
+    # Tuples nested deeper than the decoder recurses, around the mock that the
+    # following accesses refer to.
+    nested = {"__type__": "RecordingMock", "__id__": 1}
+    for _ in range(mock_recording_encoder.MAX_DECODE_RECURSION_DEPTH * 2):
+        nested = {"__type__": "tuple", "value": [nested, "x"]}
+    encoded = {
+        "__type__": "RecordingMock",
+        "recorded_attribute_accesses": {
+            "nested": [nested],
+            "same": [{"__type__": "ref", "id": 1}],
+            "after": [{"__type__": "RecordingMock"}],
+        },
+    }
+    decoded_mocks: list[ReplayingMock] = []
+    replayed = DictMockRecordingEncoder().decode_recording_mock_interactions(
+        encoded, decoded_mocks=decoded_mocks
+    )
+    value = replayed.nested
+    for _ in range(mock_recording_encoder.MAX_DECODE_RECURSION_DEPTH * 2):
+        assert type(value) is tuple and value[1] == "x"
+        value = value[0]
+    assert value is replayed.same
+    assert decoded_mocks == [replayed, value, replayed.after]
+
+
+def test_decode_reference_to_undefined_mock():
+    encoder = DictMockRecordingEncoder()
+    with pytest.raises(ValueError, match="undefined mock 3"):
+        encoder.decode_recording_mock_interactions(
+            {
+                "__type__": "RecordingMock",
+                "recorded_attribute_accesses": {
+                    "attr": [{"__type__": "ref", "id": 3}]
+                },
+            }
+        )
+
+
+def test_only_edited_recordings_are_validated(tmp_path, monkeypatch):
+    mock = RecordingMock(wrapped_item=Library(), mocker=BasicRecordingMocker())
+    mock.get_author().name
+    recording_store = get_json_file_mock_interaction_recording_store()
+    filepath = f"{tmp_path}/library.json"
+    recording_store.store_recorded_mock_interactions_to_file(mock, filepath)
+    with open(filepath) as file:
+        recording = json.load(file)
+    assert recording[CHECKSUM_KEY] == get_checksum(
+        JsonMockRecordingInteractionSerializer().serialize_encoded_mock_interactions(
+            DictMockRecordingEncoder().encode_recording_mock_interactions(mock)
+        )
+    )
+
+    def fail_validation(*args):
+        raise AssertionError("A recording with a valid checksum was validated.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(mock_recording_encoder, "validate_recording", fail_validation)
+        replayed = recording_store.load_recorded_mock_interactions_from_file(filepath)
+    assert replayed.get_author().name == "Ursula"
+
+    # Edited by hand, keeping the checksum.
+    get_author = recording["recorded_attribute_accesses"]["get_author"]["__repeat__"]
+    author = get_author["recorded_calls"][0]["value"][1]
+    author["recorded_attribute_accesses"]["name"] = "Ursula"
+    with open(filepath, "w") as file:
+        json.dump(recording, file, indent=2)
+    with pytest.raises(
+        TypeError,
+        match=r"got <class 'str'> at \$\.recorded_attribute_accesses\.get_author"
+        r"\.__repeat__\.recorded_calls\[0\]\.value\[1\]"
+        r"\.recorded_attribute_accesses\.name$",
+    ):
+        recording_store.load_recorded_mock_interactions_from_file(filepath)
+
+
+def test_decode_reports_the_path_of_invalid_nodes():
+    encoder = DictMockRecordingEncoder()
+    with pytest.raises(
+        ValueError,
+        match=r"Unknown __type__ UUID in the recording at \$\.recorded_calls\[1\]",
+    ):
+        encoder.decode_recording_mock_interactions(
+            {
+                "__type__": "RecordingMock",
+                "recorded_calls": [1, {"__type__": "UUID", "value": "1"}],
+            }
+        )
+    with pytest.raises(TypeError, match=r"at \$\.recorded_attribute_accesses\.attr$"):
+        encoder.decode_recording_mock_interactions(
+            {"__type__": "RecordingMock", "recorded_attribute_accesses": {"attr": 1}}
+        )
+
+
+def test_encode_and_decode_small_binary_values():
+    def read(key: str):
+        return {"bytes": b"\x00\xff", "bytearray": bytearray(b"ab")}[key]
+
+    mock = RecordingMock(wrapped_item=read, mocker=BasicRecordingMocker())
+    assert mock("bytes") == b"\x00\xff"
+    assert mock("bytearray") == bytearray(b"ab")
+
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    assert encoded["recorded_calls"][0]["value"][1] == {
+        "__type__": "bytes",
+        "value": "AP8=",
+    }
+    decoded = encoder.decode_recording_mock_interactions(encoded)
+    assert decoded("bytes") == b"\x00\xff"
+    replayed_bytearray = decoded("bytearray")
+    assert isinstance(replayed_bytearray, bytearray)
+    assert replayed_bytearray == bytearray(b"ab")
+
+
+def test_store_and_replay_large_binary_values_as_blobs(tmp_path):
+    image = bytes(range(256)) * 1024
+
+    class ObjectStorage:
+        def get_object(self, key: str) -> bytes:
+            return image
+
+        def get_object_view(self, key: str) -> memoryview:
+            return memoryview(image)
+
+    mock = RecordingMock(wrapped_item=ObjectStorage(), mocker=BasicRecordingMocker())
+    assert mock.get_object("a.png") == image
+    assert mock.get_object_view("a.png") == image
+
+    recording_store = get_json_file_mock_interaction_recording_store()
+    filepath = f"{tmp_path}/storage.json"
+    recording_store.store_recorded_mock_interactions_to_file(mock, filepath)
+    # The same content is stored once.
+    assert len(glob.glob(f"{filepath}.*.blob")) == 1
+    assert os.path.getsize(filepath) < 10_000
+
+    replayed = recording_store.load_recorded_mock_interactions_from_file(filepath)
+    replayed_bytes = replayed.get_object("a.png")
+    assert isinstance(replayed_bytes, bytes)
+    assert replayed_bytes == image
+    replayed_view = replayed.get_object_view("a.png")
+    assert isinstance(replayed_view, memoryview)
+    # A view of the memory-mapped blob rather than a copy of it.
+    assert isinstance(replayed_view.obj, mmap.mmap)
+    assert replayed_view.readonly
+    assert replayed_view == image
@@ -1,7 +1,24 @@
+import importlib
 import os
-from contextlib import ExitStack
+import sys
+from importlib.machinery import SourceFileLoader
+from types import ModuleType
+from typing import Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, ExitStack
 
-from mock_isolator.isolator import isolate_module_with_mocks, isolate_dependencies_with_mocks
+import pytest
+
+from mock_isolator.isolator import (
+    isolate_dependencies_with_mocks,
+    isolate_dependencies_with_mocks_async,
+    isolate_modules_with_import_hook,
+    isolate_module_with_mocks,
+    isolate_module_with_mocks_async,
+    isolate_modules_with_mocks,
+)
+from mock_isolator.import_hook import MockedModule
+from mock_isolator.mock_recording_encoder import MockRecordingStore
 from mock_isolator.types import MockIsolatorMode
 
 
@@ -107,4 +124,251 @@ def test_isolate_dependencies_with_mocks():
         
         # Even with different inputs, should still get recorded results
         result = process_numbers(mocked_deps["calculator"], 4, 5)
-        assert result == (5, 6)  # Still matches record mode results
\ No newline at end of file
+        assert result == (5, 6)  # Still matches record mode results
+
+
+
+def _exercise_file1_and_file4_in_mode(
+    mode: MockIsolatorMode,
+    recording_filepath_prefix: str,
+    global_state: int,
+    share_dependencies: bool = False,
+) -> Tuple[Tuple[int], int, bool]:
+    with ExitStack() as stack:
+        isolate_modules_with_mocks(
+            exit_stack=stack,
+            module_filepaths=[
+                "tests/unit_tests/test_module_mocking_isolator_module_1/file1.py",
+                "tests/unit_tests/test_module_mocking_isolator_module_1/file4.py",
+            ],
+            modules_to_mock=[
+                "tests.unit_tests.test_module_mocking_isolator_module_2.file2",
+            ],
+            mode=mode,
+            recording_filepath_prefix=recording_filepath_prefix,
+            share_dependencies=share_dependencies,
+        )
+        import tests.unit_tests.test_module_mocking_isolator_module_1.file1 as file1
+        import tests.unit_tests.test_module_mocking_isolator_module_1.file4 as file4
+
+        file1.global_state = global_state
+        return (
+            file1.File1Class().do_things_with_imported_function(),
+            file4.get_file2_x(),
+            file1.do_file2_things is file4.do_file2_things,
+        )
+
+
+def test_isolate_modules_with_mocks(tmp_path):
+    recording_filepath_prefix = f"{tmp_path}/test_isolate_modules_"
+    assert _exercise_file1_and_file4_in_mode(
+        MockIsolatorMode.RECORD, recording_filepath_prefix, global_state=3
+    ) == ((3,), 1, False)
+    # Each module gets its own recording, as with isolate_module_with_mocks.
+    module_1_path = "tests.unit_tests.test_module_mocking_isolator_module_1"
+    assert sorted(os.listdir(tmp_path)) == [
+        f"test_isolate_modules_{module_1_path}.{name}.do_file2_things.json"
+        for name in ("file1", "file4")
+    ]
+    assert _exercise_file1_and_file4_in_mode(
+        MockIsolatorMode.REPLAY, recording_filepath_prefix, global_state=4
+    ) == ((3,), 1, False)
+
+
+def test_isolate_modules_with_mocks_sharing_dependencies(tmp_path, monkeypatch):
+    recording_filepath_prefix = f"{tmp_path}/test_isolate_modules_"
+    assert _exercise_file1_and_file4_in_mode(
+        MockIsolatorMode.RECORD,
+        recording_filepath_prefix,
+        global_state=3,
+        share_dependencies=True,
+    ) == ((3,), 1, True)
+    # Both modules import do_file2_things, which is recorded once.
+    file2_path = "tests.unit_tests.test_module_mocking_isolator_module_2.file2"
+    assert os.listdir(tmp_path) == [
+        f"test_isolate_modules_{file2_path}.do_file2_things.json"
+    ]
+    loaded_filepaths = []
+    load = MockRecordingStore.load_recorded_mock_interactions_from_file
+
+    def record_load(store: MockRecordingStore, filepath: str) -> Any:
+        loaded_filepaths.append(filepath)
+        return load(store, filepath)
+
+    monkeypatch.setattr(
+        MockRecordingStore, "load_recorded_mock_interactions_from_file", record_load
+    )
+    assert _exercise_file1_and_file4_in_mode(
+        MockIsolatorMode.REPLAY,
+        recording_filepath_prefix,
+        global_state=4,
+        share_dependencies=True,
+    ) == ((3,), 1, True)
+    # Once for both modules.
+    assert (
+        loaded_filepaths.count(
+            f"{recording_filepath_prefix}{file2_path}.do_file2_things.json"
+        )
+        == 1
+    )
+    assert len(set(loaded_filepaths)) == len(loaded_filepaths)
+
+
+def _exercise_file1_with_import_hook(
+    mode: MockIsolatorMode, recording_filepath_prefix: str, global_state: int
+) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    file2_path = "tests.unit_tests.test_module_mocking_isolator_module_2.file2"
+    with ExitStack() as stack:
+        isolate_modules_with_import_hook(
+            exit_stack=stack,
+            modules_to_mock=[
+                file2_path,
+                "tests.unit_tests.test_module_mocking_isolator_module_2.file3",
+            ],
+            mode=mode,
+            recording_filepath_prefix=recording_filepath_prefix,
+        )
+        import tests.unit_tests.test_module_mocking_isolator_module_1.file1 as file1
+
+        assert isinstance(sys.modules[file2_path], MockedModule)
+        f1 = file1.File1Class()
+        file1.global_state = global_state
+        results = (
+            f1.do_things_with_module_alias(),
+            f1.do_things_with_imported_module(),
+        )
+    # The module under test is reloaded next time.
+    assert "tests.unit_tests.test_module_mocking_isolator_module_1.file1" not in (
+        sys.modules
+    )
+    return results
+
+
+def test_isolate_modules_with_import_hook(tmp_path, monkeypatch):
+    import tests.unit_tests.test_module_mocking_isolator_module_1 as module_1
+    import tests.unit_tests.test_module_mocking_isolator_module_2 as module_2
+
+    # The module under test is imported after the hook is installed.
+    monkeypatch.delitem(sys.modules, f"{module_1.__name__}.file1", raising=False)
+    monkeypatch.delattr(module_1, "file1", raising=False)
+    # Already imported modules are replaced while isolated, and put back after.
+    file2 = importlib.import_module(f"{module_2.__name__}.file2")
+    recording_filepath_prefix = f"{tmp_path}/test_import_hook_"
+    assert _exercise_file1_with_import_hook(
+        MockIsolatorMode.RECORD, recording_filepath_prefix, global_state=1
+    ) == ((1, 1), (1, 1))
+    assert sys.modules[f"{module_2.__name__}.file2"] is file2
+    assert sorted(os.listdir(tmp_path)) == [
+        "test_import_hook_tests.unit_tests.test_module_mocking_isolator_module_2."
+        f"{name}.json"
+        for name in ("file2", "file3")
+    ]
+
+    # In replay mode, the mocked modules are not imported at all.
+    for name in ("file2", "file3"):
+        monkeypatch.delitem(sys.modules, f"{module_2.__name__}.{name}", raising=False)
+        monkeypatch.delattr(module_2, name, raising=False)
+    executed_modules = []
+    exec_module = SourceFileLoader.exec_module
+
+    def record_exec_module(loader: SourceFileLoader, module: ModuleType) -> None:
+        executed_modules.append(module.__name__)
+        exec_module(loader, module)
+
+    monkeypatch.setattr(SourceFileLoader, "exec_module", record_exec_module)
+    assert _exercise_file1_with_import_hook(
+        MockIsolatorMode.REPLAY, recording_filepath_prefix, global_state=2
+    ) == ((1, 1), (1, 1))
+    assert executed_modules == [f"{module_1.__name__}.file1"]
+    assert f"{module_2.__name__}.file2" not in sys.modules
+
+
+@pytest.mark.asyncio
+async def test_isolate_module_with_mocks_async():
+    """Replay the recordings of test_isolate_module_with_mocks from async code."""
+    async with AsyncExitStack() as stack:
+        await isolate_module_with_mocks_async(
+            exit_stack=stack,
+            module_filepath="tests/unit_tests/test_module_mocking_isolator_module_1/file1.py",
+            modules_to_mock=[
+                "tests.unit_tests.test_module_mocking_isolator_module_2.file2",
+                "tests.unit_tests.test_module_mocking_isolator_module_2.file3",
+            ],
+            mode=MockIsolatorMode.REPLAY,
+            recording_filepath_prefix=os.path.join(
+                os.path.dirname(__file__),
+                "test_module_mocking_isolator_files/test_isolate_module_",
+            ),
+        )
+        import tests.unit_tests.test_module_mocking_isolator_module_1.file1 as file1
+
+        file1.global_state = 2
+        assert file1.File1Class().do_things_with_imported_function() == (3,)
+
+
+@pytest.mark.asyncio
+async def test_isolate_dependencies_with_mocks_async(tmp_path):
+    class Greeter:
+        def greet(self, name: str) -> str:
+            return f"Hello, {name}"
+
+    recording_filepath_prefix = f"{tmp_path}/test_greeters_"
+    with ThreadPoolExecutor(thread_name_prefix="recordings") as executor:
+        async with AsyncExitStack() as stack:
+            mocked_deps = await isolate_dependencies_with_mocks_async(
+                exit_stack=stack,
+                dependencies=[Greeter(), Greeter()],
+                dependency_names=["english", "formal"],
+                mode=MockIsolatorMode.RECORD,
+                recording_filepath_prefix=recording_filepath_prefix,
+                executor=executor,
+            )
+            assert mocked_deps["english"].greet("Ada") == "Hello, Ada"
+            assert mocked_deps["formal"].greet("Dr. Lovelace") == "Hello, Dr. Lovelace"
+        # The recordings are written once the stack exits.
+        assert sorted(os.listdir(tmp_path)) == [
+            "test_greeters_english.json",
+            "test_greeters_formal.json",
+        ]
+
+        async with AsyncExitStack() as stack:
+            mocked_deps = await isolate_dependencies_with_mocks_async(
+                exit_stack=stack,
+                dependencies=[Greeter(), Greeter()],
+                dependency_names=["english", "formal"],
+                mode=MockIsolatorMode.REPLAY,
+                recording_filepath_prefix=recording_filepath_prefix,
+                executor=executor,
+            )
+            assert mocked_deps["english"].greet("Grace") == "Hello, Ada"
+            assert mocked_deps["formal"].greet("Grace") == "Hello, Dr. Lovelace"
+
+
+def test_isolate_dependencies_that_share_an_object(tmp_path):
+    class Session:
+        def __init__(self):
+            self.count = 0
+
+        def next_id(self, prefix: str) -> str:
+            self.count += 1
+            return f"{prefix}-{self.count}"
+
+    class Repository:
+        def __init__(self, session: Session):
+            self.session = session
+
+    session = Session()
+    for mode in [MockIsolatorMode.RECORD, MockIsolatorMode.REPLAY]:
+        with ExitStack() as stack:
+            mocked_deps = isolate_dependencies_with_mocks(
+                exit_stack=stack,
+                dependencies=[Repository(session), Repository(session)],
+                dependency_names=["a", "b"],
+                mode=mode,
+                recording_filepath_prefix=f"{tmp_path}/test_shared_session_",
+            )
+            ids = (
+                mocked_deps["a"].session.next_id("x"),
+                mocked_deps["b"].session.next_id("y"),
+            )
+        assert ids == ("x-1", "y-2")
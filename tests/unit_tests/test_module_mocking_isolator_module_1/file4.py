@@ -0,0 +1,5 @@
+from tests.unit_tests.test_module_mocking_isolator_module_2.file2 import do_file2_things
+
+
+def get_file2_x() -> int:
+    return do_file2_things().x
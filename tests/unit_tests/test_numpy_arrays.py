@@ -0,0 +1,69 @@
+import glob
+import json
+import os
+
+import pytest
+
+from mock_isolator.mock_recording_encoder import (
+    DictMockRecordingEncoder,
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+
+np = pytest.importorskip("numpy")
+
+
+class FeatureStore:
+    def __init__(self, features):
+        self.features = features
+
+    def get_features(self, key: str):
+        return self.features
+
+
+def test_small_arrays_are_inlined():
+    features = np.arange(12, dtype=np.float32).reshape(3, 4)
+    mock = RecordingMock(FeatureStore(features), BasicRecordingMocker())
+    assert mock.get_features("a") is features
+
+    encoder = DictMockRecordingEncoder()
+    encoding = encoder.encode_recording_mock_interactions(mock)
+    assert '"__type__": "ndarray", "value"' in json.dumps(encoding)
+
+    replayed = encoder.decode_recording_mock_interactions(encoding)
+    replayed_features = replayed.get_features("a")
+    assert replayed_features.dtype == np.float32
+    assert replayed_features.shape == (3, 4)
+    np.testing.assert_array_equal(replayed_features, features)
+
+
+def test_large_arrays_are_memory_mapped_on_replay(tmp_path):
+    # Not contiguous, to check that the stored array keeps its values.
+    features = np.arange(200_000, dtype=np.int64).reshape(1000, 200)[:, ::2]
+    mock = RecordingMock(FeatureStore(features), BasicRecordingMocker())
+    mock.get_features("a")
+    mock.get_features("b")
+
+    recording_store = get_json_file_mock_interaction_recording_store()
+    filepath = f"{tmp_path}/features.json"
+    recording_store.store_recorded_mock_interactions_to_file(mock, filepath)
+    # The same content is stored once.
+    assert len(glob.glob(f"{filepath}.*.npy")) == 1
+    assert os.path.getsize(filepath) < 10_000
+
+    replayed = recording_store.load_recorded_mock_interactions_from_file(filepath)
+    replayed_features = replayed.get_features("a")
+    assert isinstance(replayed_features, np.memmap)
+    assert not replayed_features.flags.writeable
+    assert replayed_features.dtype == np.int64
+    assert replayed_features.shape == (1000, 100)
+    np.testing.assert_array_equal(replayed_features, features)
+
+
+def test_object_arrays_are_not_supported():
+    mock = RecordingMock(
+        FeatureStore(np.array([{"a": 1}], dtype=object)), BasicRecordingMocker()
+    )
+    mock.get_features("a")
+    with pytest.raises(TypeError, match="pickle"):
+        DictMockRecordingEncoder().encode_recording_mock_interactions(mock)
@@ -0,0 +1,162 @@
+import gc
+
+import pytest
+
+from mock_isolator.mock_recording_encoder import DictMockRecordingEncoder
+from mock_isolator.recording_budget import (
+    SAMPLED,
+    TRUNCATED,
+    RecordingBudget,
+    RecordingBudgetExceededError,
+    RecordingSampledError,
+    RecordingTruncatedError,
+    TruncatedDict,
+    TruncatedList,
+)
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.types import RecordingBudgetPolicy
+
+
+class Sensor:
+    def __init__(self):
+        self.polls = 0
+
+    def poll(self) -> int:
+        self.polls += 1
+        return self.polls
+
+    def rows(self, count: int) -> list[int]:
+        return list(range(count))
+
+    def columns(self, count: int) -> dict[str, int]:
+        return {f"column_{i}": i for i in range(count)}
+
+
+def record(budget: RecordingBudget) -> RecordingMock:
+    return RecordingMock(Sensor(), BasicRecordingMocker(budget=budget))
+
+
+def replay(mock: RecordingMock):
+    encoder = DictMockRecordingEncoder()
+    return encoder.decode_recording_mock_interactions(
+        encoder.encode_recording_mock_interactions(mock)
+    )
+
+
+def test_fail_policy_raises_in_the_recorded_code() -> None:
+    mock = record(RecordingBudget(max_entries_per_attribute=3))
+    poll = mock.poll
+    assert [poll() for _ in range(3)] == [1, 2, 3]
+    with pytest.raises(RecordingBudgetExceededError, match="max_entries_per_attribute"):
+        poll()
+
+
+def test_fail_policy_limits_the_session_bytes() -> None:
+    budget = RecordingBudget(max_bytes_per_session=1000)
+    mock = record(budget)
+    mock.rows(10)
+    with pytest.raises(RecordingBudgetExceededError, match="max_bytes_per_session"):
+        mock.rows(1000)
+    assert budget.session_bytes <= 1000
+
+
+def test_fail_policy_limits_the_attribute_bytes() -> None:
+    mock = record(RecordingBudget(max_bytes_per_attribute=1000))
+    rows = mock.rows
+    for _ in range(4):
+        rows(20)
+    # The calls of other mocks have their own budget.
+    mock.rows(20)
+    with pytest.raises(
+        RecordingBudgetExceededError,
+        match="max_bytes_per_attribute=1000 exceeded by the calls of rows",
+    ):
+        rows(20)
+
+
+def test_budget_forgets_the_mocks_that_are_collected() -> None:
+    budget = RecordingBudget(max_entries_per_mock=10)
+    mock = record(budget)
+    for _ in range(3):
+        mock.poll()
+    assert len(budget._mock_usage) == 4
+    del mock
+    gc.collect()
+    assert not budget._mock_usage
+    assert budget.session_entries == 6
+
+
+def test_truncate_policy_records_a_marker_that_replay_enforces() -> None:
+    mock = record(
+        RecordingBudget(max_entries_per_mock=3, policy=RecordingBudgetPolicy.TRUNCATE)
+    )
+    poll = mock.poll
+    # The recorded code keeps getting the real values.
+    assert [poll() for _ in range(5)] == [1, 2, 3, 4, 5]
+    assert poll.recorded_calls == [
+        (((), {}), 1),
+        (((), {}), 2),
+        (((), {}), 3),
+        (((), {}), TRUNCATED),
+    ]
+
+    replayed_poll = replay(mock).poll
+    assert [replayed_poll() for _ in range(3)] == [1, 2, 3]
+    with pytest.raises(RecordingTruncatedError):
+        replayed_poll()
+    with pytest.raises(RecordingTruncatedError):
+        replayed_poll()
+
+
+def test_truncate_policy_truncates_containers() -> None:
+    mock = record(
+        RecordingBudget(max_container_length=3, policy=RecordingBudgetPolicy.TRUNCATE)
+    )
+    assert mock.rows(10) == list(range(10))
+    assert mock.columns(5) == {f"column_{i}": i for i in range(5)}
+
+    replayed = replay(mock)
+    rows = replayed.rows(10)
+    assert isinstance(rows, TruncatedList)
+    assert len(rows) == 10
+    assert rows[2] == 2
+    with pytest.raises(RecordingTruncatedError):
+        rows[3]
+    with pytest.raises(RecordingTruncatedError):
+        list(rows)
+    columns = replayed.columns(5)
+    assert isinstance(columns, TruncatedDict)
+    assert columns["column_0"] == 0
+    with pytest.raises(RecordingTruncatedError):
+        columns["column_4"]
+
+
+def test_sample_policy_grows_logarithmically() -> None:
+    mock = record(
+        RecordingBudget(
+            max_entries_per_attribute=2, policy=RecordingBudgetPolicy.SAMPLE
+        )
+    )
+    poll = mock.poll
+    for _ in range(100):
+        poll()
+    # The first 2, the marker in place of the 1st past the budget, then the 2nd,
+    # 4th, ... 64th.
+    recorded_results = [result for _, result in poll.recorded_calls]
+    assert recorded_results == [1, 2, SAMPLED, 4, 6, 10, 18, 34, 66]
+
+    # The sampled calls are not replayed in place of the calls that were skipped.
+    replayed_poll = replay(mock).poll
+    assert [replayed_poll() for _ in range(2)] == [1, 2]
+    with pytest.raises(RecordingSampledError, match="SAMPLE policy"):
+        replayed_poll()
+
+
+def test_sample_policy_samples_containers() -> None:
+    mock = record(
+        RecordingBudget(max_container_length=10, policy=RecordingBudgetPolicy.SAMPLE)
+    )
+    assert mock.rows(100) == list(range(100))
+    assert mock.recorded_attribute_accesses["rows"][0].recorded_calls[0][1] == list(
+        range(0, 100, 10)
+    )
@@ -0,0 +1,87 @@
+import glob
+
+from mock_isolator.mock_recording_encoder import (
+    DictMockRecordingEncoder,
+    JsonMockRecordingInteractionSerializer,
+    MockRecordingStore,
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.recording_cache import main
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+
+
+class Inventory:
+    def __init__(self, count: int):
+        self.count = count
+
+    def get_stock(self, sku: str) -> dict[str, int]:
+        return {"count": self.count}
+
+
+class CountingSerializer(JsonMockRecordingInteractionSerializer):
+    def __init__(self):
+        self.deserialized = 0
+
+    def deserialize_encoded_mock_interactions(self, serialized_interactions):
+        self.deserialized += 1
+        return super().deserialize_encoded_mock_interactions(serialized_interactions)
+
+
+def _record_inventory(filepath: str, count: int) -> None:
+    mock = RecordingMock(Inventory(count), BasicRecordingMocker())
+    mock.get_stock("a")
+    get_json_file_mock_interaction_recording_store().store_recorded_mock_interactions_to_file(
+        mock, filepath
+    )
+
+
+def test_recordings_are_loaded_from_the_cache(tmp_path) -> None:
+    filepath = f"{tmp_path}/inventory.json"
+    _record_inventory(filepath, count=3)
+    serializer = CountingSerializer()
+    recording_store = MockRecordingStore(
+        DictMockRecordingEncoder(), serializer, use_cache=True
+    )
+
+    assert recording_store.load_recorded_mock_interactions_from_file(
+        filepath
+    ).get_stock("a") == {"count": 3}
+    assert recording_store.load_recorded_mock_interactions_from_file(
+        filepath
+    ).get_stock("a") == {"count": 3}
+    assert serializer.deserialized == 1
+    cache_filepaths = glob.glob(f"{tmp_path}/__mockcache__/inventory.json.*.marshal")
+    assert len(cache_filepaths) == 1
+
+    # A new recording has another key, and replaces the stale cache.
+    _record_inventory(filepath, count=5)
+    assert recording_store.load_recorded_mock_interactions_from_file(
+        filepath
+    ).get_stock("a") == {"count": 5}
+    assert serializer.deserialized == 2
+    new_cache_filepaths = glob.glob(f"{tmp_path}/__mockcache__/*")
+    assert len(new_cache_filepaths) == 1
+    assert new_cache_filepaths != cache_filepaths
+
+
+def test_warm_the_cache_for_a_directory(tmp_path, capsys) -> None:
+    _record_inventory(f"{tmp_path}/test_a_inventory.json", count=3)
+    (tmp_path / "nested").mkdir()
+    _record_inventory(f"{tmp_path}/nested/test_b_inventory.json", count=4)
+
+    assert main([str(tmp_path)]) == 0
+    assert capsys.readouterr().out == "Cached 2 recordings.\n"
+    assert len(glob.glob(f"{tmp_path}/**/__mockcache__/*.marshal", recursive=True)) == 2
+
+    serializer = CountingSerializer()
+    recording_store = MockRecordingStore(DictMockRecordingEncoder(), serializer)
+    MockRecordingSettings.set_recording_cache(True)
+    try:
+        replayed = recording_store.load_recorded_mock_interactions_from_file(
+            f"{tmp_path}/nested/test_b_inventory.json"
+        )
+    finally:
+        MockRecordingSettings.set_recording_cache(False)
+    assert replayed.get_stock("a") == {"count": 4}
+    assert serializer.deserialized == 0
@@ -1,4 +1,7 @@
 import asyncio
+import gc
+import time
+from collections.abc import Container, Iterable, Iterator
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 
@@ -322,4 +325,143 @@ async def test_recording_mock_async_iteration_with_websocket_like_behavior():
     assert "__aiter__" in mock.recorded_attribute_accesses
     wrapped_iterator = mock.recorded_attribute_accesses["__aiter__"][0]
     assert "__anext__" in wrapped_iterator.recorded_attribute_accesses
-    assert len(wrapped_iterator.recorded_attribute_accesses["__anext__"]) == 3  # 2 messages + StopAsyncIteration
\ No newline at end of file
+    assert len(wrapped_iterator.recorded_attribute_accesses["__anext__"]) == 3  # 2 messages + StopAsyncIteration
+
+def test_recording_mock_records_call_durations() -> None:
+    def slow_function() -> int:
+        time.sleep(0.01)
+        return 1
+
+    mock = RecordingMock(slow_function, BasicRecordingMocker(record_durations=True))
+    mock()
+    assert mock.recorded_call_durations[0] >= 0.01
+
+    mock = RecordingMock(slow_function, BasicRecordingMocker())
+    mock()
+    assert mock.recorded_call_durations == {}
+
+
+@pytest.mark.asyncio
+async def test_recording_mock_records_async_durations() -> None:
+    class AsyncClass:
+        async def slow_method(self) -> int:
+            await asyncio.sleep(0.01)
+            return 1
+
+    mock = RecordingMock(AsyncClass(), BasicRecordingMocker(record_durations=True))
+    await mock.slow_method()
+    assert mock.recorded_attribute_access_durations["slow_method"][0] >= 0.01
+
+
+def test_recording_mock_sync_iteration(mocker: BasicRecordingMocker) -> None:
+    def fetch_rows():
+        yield from ["row1", "row2"]
+
+    mock = RecordingMock(fetch_rows, mocker)
+    assert list(mock()) == ["row1", "row2"]
+
+    generator = mock.recorded_calls[0][1]
+    wrapped_iterator = generator.recorded_attribute_accesses["__iter__"][0]
+    accesses = wrapped_iterator.recorded_attribute_accesses["__next__"]
+    assert accesses[:2] == ["row1", "row2"]
+    assert isinstance(accesses[2], StopIteration)
+    # Generators have no length, so list() falls back to plain iteration.
+    assert "__len__" not in generator.recorded_attribute_accesses
+
+
+def test_recording_mock_container_methods(mocker: BasicRecordingMocker) -> None:
+    class Row:
+        def __init__(self):
+            self._values = {"id": 1}
+
+        def __len__(self) -> int:
+            return len(self._values)
+
+        def __getitem__(self, key: str) -> int:
+            return self._values[key]
+
+        def __contains__(self, key: str) -> bool:
+            return key in self._values
+
+    mock = RecordingMock(Row(), mocker)
+    assert len(mock) == 1
+    assert mock["id"] == 1
+    with pytest.raises(KeyError):
+        mock["name"]
+    assert "id" in mock
+    assert mock
+
+    accesses = mock.recorded_attribute_accesses
+    assert accesses["__len__"] == [1]
+    assert accesses["__getitem__"][0] == 1
+    assert isinstance(accesses["__getitem__"][1], KeyError)
+    assert accesses["__contains__"] == [True]
+    assert accesses["__bool__"] == [True]
+
+
+def test_recording_mock_is_truthy_without_len_or_bool(
+    mocker: BasicRecordingMocker,
+) -> None:
+    mock = RecordingMock(object(), mocker)
+    assert mock
+    assert mock.recorded_attribute_accesses == {}
+
+
+def test_recording_mock_only_has_the_special_methods_of_its_item(
+    mocker: BasicRecordingMocker,
+) -> None:
+    for item in [asyncio, time.sleep, object()]:
+        mock = RecordingMock(item, mocker)
+        assert not isinstance(mock, Iterable)
+        assert not hasattr(mock, "__len__")
+        assert not hasattr(mock, "__getitem__")
+    mock = RecordingMock(iter([1]), mocker)
+    assert isinstance(mock, Iterator)
+    assert not hasattr(mock, "__len__")
+    assert isinstance(RecordingMock({"id": 1}, mocker), Container)
+    assert isinstance(mock, RecordingMock)
+
+
+def test_mocker_wraps_the_same_object_in_the_same_mock() -> None:
+    class Session:
+        pass
+
+    session = Session()
+    mocker = BasicRecordingMocker(preserve_identity=True)
+    mock = mocker.wrap_item_with_recording_mocks(session)
+    assert mocker.wrap_item_with_recording_mocks(session) is mock
+    assert mocker.wrap_item_with_recording_mocks(Session()) is not mock
+
+    del mock
+    gc.collect()
+    assert mocker._recording_mocks == {}
+
+    mocker = BasicRecordingMocker()
+    assert mocker.wrap_item_with_recording_mocks(
+        session
+    ) is not mocker.wrap_item_with_recording_mocks(session)
+
+
+@pytest.mark.asyncio
+async def test_recording_mock_notices_overridden_methods(
+    mocker: BasicRecordingMocker,
+) -> None:
+    class Client:
+        def fetch(self) -> str:
+            return "sync"
+
+    async def fetch() -> str:
+        return "async"
+
+    first, second = Client(), Client()
+    assert RecordingMock(first, mocker).fetch() == "sync"
+    # The instance, then the class, override the method checked before.
+    second.fetch = fetch  # type: ignore
+    assert await RecordingMock(second, mocker).fetch() == "async"
+    assert RecordingMock(first, mocker).fetch() == "sync"
+
+    async def fetch_method(self: Client) -> str:
+        return "async"
+
+    Client.fetch = fetch_method  # type: ignore
+    assert await RecordingMock(first, mocker).fetch() == "async"
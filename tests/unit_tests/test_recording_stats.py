@@ -0,0 +1,80 @@
+import json
+import os
+import time
+from contextlib import ExitStack
+
+from mock_isolator.isolator import isolate_dependencies_with_mocks
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.recording_stats import (
+    RECORDING_STATS_FILENAME,
+    collect_recording_stats,
+)
+from mock_isolator.types import MockIsolatorMode
+
+
+class Response:
+    def __init__(self, body: str):
+        self.body = body
+
+
+class HttpClient:
+    def get(self, url: str) -> Response:
+        time.sleep(0.01)
+        return Response(body=f"<html>{url}</html>")
+
+    def ping(self) -> bool:
+        return True
+
+
+def test_collect_recording_stats() -> None:
+    mock = RecordingMock(HttpClient(), BasicRecordingMocker(record_durations=True))
+    for url in ["a", "b", "c"]:
+        assert mock.get(url).body == f"<html>{url}</html>"
+    mock.ping()
+
+    stats = collect_recording_stats({"client": mock})["patch_paths"]["client"]
+    # The slowest attributes come first.
+    assert list(stats["attributes"])[0] == "get()"
+    assert set(stats["attributes"]) == {"get", "get()", "get().body", "ping", "ping()"}
+    get_stats = stats["attributes"]["get()"]
+    assert get_stats["count"] == 3
+    assert get_stats["timed_count"] == 3
+    assert get_stats["total_seconds"] >= 0.03
+    assert 0.01 <= get_stats["p50_seconds"] <= get_stats["p99_seconds"]
+    # Returned mocks are reported under their own path instead of as payload.
+    assert get_stats["payload_bytes"] == 0
+    assert stats["attributes"]["get().body"]["payload_bytes"] == 3 * len(
+        json.dumps("<html>a</html>")
+    )
+    assert stats["attributes"]["get"]["p50_seconds"] is None
+    assert stats["count"] == 3 + 3 + 3 + 1 + 1
+
+
+def test_collect_recording_stats_of_values_that_are_not_json() -> None:
+    class Grid:
+        def cells(self) -> dict[tuple[int, int], str]:
+            return {(0, 1): "a", (2, 3): "b"}
+
+    mock = RecordingMock(Grid(), BasicRecordingMocker())
+    cells = mock.cells()
+    stats = collect_recording_stats({"grid": mock})["patch_paths"]["grid"]
+    assert stats["attributes"]["cells()"]["payload_bytes"] == len(repr(cells))
+
+
+def test_isolate_dependencies_with_mocks_writes_stats(tmp_path) -> None:
+    recording_filepath_prefix = f"{tmp_path}/test_stats_"
+    with ExitStack() as stack:
+        mocked_deps = isolate_dependencies_with_mocks(
+            exit_stack=stack,
+            dependencies=[HttpClient()],
+            dependency_names=["client"],
+            mode=MockIsolatorMode.RECORD,
+            recording_filepath_prefix=recording_filepath_prefix,
+            record_stats=True,
+        )
+        mocked_deps["client"].get("a")
+
+    assert os.path.exists(f"{recording_filepath_prefix}client.json")
+    with open(f"{recording_filepath_prefix}{RECORDING_STATS_FILENAME}") as file:
+        stats = json.load(file)
+    assert stats["patch_paths"]["client"]["attributes"]["get()"]["count"] == 1
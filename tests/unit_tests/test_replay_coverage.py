@@ -0,0 +1,134 @@
+import glob
+import json
+import os
+from typing import Iterator
+
+import pytest
+
+from mock_isolator.mock_recording_encoder import (
+    DictMockRecordingEncoder,
+    JsonMockRecordingInteractionSerializer,
+    MockRecordingStore,
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.recording_checksum import split_checksum
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.replay_coverage import ReplayCoverage, load_replay_coverage, main
+from mock_isolator.type_codecs import DEFAULT_BLOB_THRESHOLD
+
+
+class Author:
+    name = "Ursula"
+
+
+class Catalog:
+    def __init__(self):
+        self.author = Author()
+        self.version = "1.2"
+
+    @property
+    def featured_author(self) -> Author:
+        return self.author
+
+    def get_page(self, page: int) -> list[str]:
+        return [f"book-{page}-{i}" for i in range(3)]
+
+
+def _replay(filepath: str, coverage: ReplayCoverage) -> None:
+    store = get_json_file_mock_interaction_recording_store()
+    MockRecordingSettings.set_replay_coverage(coverage)
+    try:
+        catalog = store.load_recorded_mock_interactions_from_file(filepath)
+    finally:
+        MockRecordingSettings.set_replay_coverage(None)
+    assert catalog.featured_author.name == "Ursula"
+    assert catalog.get_page(0) == ["book-0-0", "book-0-1", "book-0-2"]
+
+
+def test_prune_the_entries_that_were_not_replayed(tmp_path, capsys) -> None:
+    catalog = RecordingMock(Catalog(), BasicRecordingMocker())
+    # Only logged, and an extra page that is ignored.
+    assert catalog.version == "1.2"
+    assert catalog.author.name == "Ursula"
+    assert catalog.featured_author.name == "Ursula"
+    for page in range(3):
+        catalog.get_page(page)
+    filepath = f"{tmp_path}/catalog.json"
+    store = get_json_file_mock_interaction_recording_store()
+    store.store_recorded_mock_interactions_to_file(catalog, filepath)
+    size = os.path.getsize(filepath)
+
+    # Each worker of a session writes its own coverage.
+    for worker in range(2):
+        coverage = ReplayCoverage()
+        _replay(filepath, coverage)
+        coverage.write(f"{tmp_path}/coverage/{worker}.json")
+    coverage_filepaths = [f"{tmp_path}/coverage/{i}.json" for i in range(2)]
+    assert list(load_replay_coverage(coverage_filepaths)) == [filepath]
+
+    assert main(coverage_filepaths) == 0
+    assert os.path.getsize(filepath) < size
+    with open(filepath) as file:
+        serialized, is_checksum_valid = split_checksum(file.read())
+    assert is_checksum_valid
+    encoding = json.loads(serialized)
+    assert set(encoding["recorded_attribute_accesses"]) == {
+        "featured_author",
+        "get_page",
+    }
+    assert len(encoding["recorded_attribute_accesses"]["get_page"]) == 1
+
+    # The coverage was measured against the recording before it was pruned, so
+    # pruning again leaves it as it is.
+    with open(filepath) as file:
+        pruned = file.read()
+    capsys.readouterr()
+    assert main(coverage_filepaths) == 0
+    assert f"Skipped: The coverage of {filepath}" in capsys.readouterr().err
+    with open(filepath) as file:
+        assert file.read() == pruned
+
+    # The author was first recorded under the pruned author attribute.
+    _replay(filepath, ReplayCoverage())
+    replayed = store.load_recorded_mock_interactions_from_file(filepath)
+    with pytest.raises(AttributeError):
+        replayed.version
+
+
+class Archive:
+    cover = b"\x01" * DEFAULT_BLOB_THRESHOLD
+    logo = b"\x02" * DEFAULT_BLOB_THRESHOLD
+
+    def get_rows(self) -> Iterator[dict[str, int]]:
+        return iter([{"id": i} for i in range(5)])
+
+
+def test_prune_removes_the_sidecar_files_no_longer_referenced(tmp_path) -> None:
+    archive = RecordingMock(Archive(), BasicRecordingMocker())
+    assert archive.cover == Archive.cover
+    assert archive.logo == Archive.logo
+    assert list(archive.get_rows()) == [{"id": i} for i in range(5)]
+    filepath = f"{tmp_path}/archive.json"
+    store = MockRecordingStore(
+        DictMockRecordingEncoder(stream_segment_length=2),
+        JsonMockRecordingInteractionSerializer(),
+    )
+    store.store_recorded_mock_interactions_to_file(archive, filepath)
+    # 2 blobs, and 5 rows and the StopIteration in 3 segments.
+    assert len(glob.glob(f"{filepath}.*")) == 5
+
+    coverage = ReplayCoverage()
+    MockRecordingSettings.set_replay_coverage(coverage)
+    try:
+        replayed = store.load_recorded_mock_interactions_from_file(filepath)
+    finally:
+        MockRecordingSettings.set_replay_coverage(None)
+    assert replayed.logo == Archive.logo
+    coverage.write(f"{tmp_path}/coverage.json")
+    assert main([f"{tmp_path}/coverage.json"]) == 0
+
+    [logo_filepath] = glob.glob(f"{filepath}.*")
+    assert logo_filepath.endswith(".blob")
+    replayed = store.load_recorded_mock_interactions_from_file(filepath)
+    assert replayed.logo == Archive.logo
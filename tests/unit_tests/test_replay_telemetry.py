@@ -0,0 +1,107 @@
+import json
+import tracemalloc
+from contextlib import ExitStack
+
+import pytest
+
+from mock_isolator.isolator import isolate_dependencies_with_mocks
+from mock_isolator.mock_recording_encoder import (
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.replay_telemetry import ReplayTelemetry
+from mock_isolator.types import MockIsolatorMode
+
+
+class Inventory:
+    def get_stock(self, sku: str) -> dict[str, int]:
+        return {"sku_count": len(sku), "stock": 12}
+
+    def get_warehouses(self) -> list[str]:
+        return ["north", "south"]
+
+
+def test_replay_telemetry_per_recording_and_test(tmp_path) -> None:
+    prefix = f"{tmp_path}/test_inventory_"
+    with ExitStack() as exit_stack:
+        mocks = isolate_dependencies_with_mocks(
+            exit_stack, [Inventory()], ["inventory"], MockIsolatorMode.RECORD, prefix
+        )
+        mocks["inventory"].get_stock("A-1")
+        mocks["inventory"].get_warehouses()
+
+    telemetry = ReplayTelemetry(trace_memory=True)
+    MockRecordingSettings.set_replay_telemetry(telemetry)
+    try:
+        with ExitStack() as exit_stack:
+            mocks = isolate_dependencies_with_mocks(
+                exit_stack, [], ["inventory"], MockIsolatorMode.REPLAY, prefix
+            )
+            assert mocks["inventory"].get_stock("A-1")["stock"] == 12
+    finally:
+        MockRecordingSettings.set_replay_telemetry(None)
+
+    report = telemetry.to_dict()
+    [load] = report["recordings"]
+    assert load["filepath"] == f"{prefix}inventory.json"
+    assert load["test"].endswith("::test_replay_telemetry_per_recording_and_test")
+    assert load["source"] == "file"
+    assert load["bytes_read"] > 0
+    # The root mock and the mocks returned by its methods.
+    assert load["decoded_mocks"] == 3
+    assert load["tracemalloc_peak_bytes"] > 0
+    assert not tracemalloc.is_tracing()
+    test = report["tests"][load["test"]]
+    assert test["recordings"] == 1
+    assert test["cache_hits"] == 0
+    assert set(test["spans"]) == {"isolate_dependencies_with_mocks"}
+
+    telemetry.write(f"{tmp_path}/telemetry/report.json")
+    with open(f"{tmp_path}/telemetry/report.json") as file:
+        assert json.load(file)["tests"] == report["tests"]
+
+
+def test_replay_telemetry_stops_tracing_after_a_failed_load(tmp_path) -> None:
+    filepath = f"{tmp_path}/test_inventory_inventory.json"
+    with open(filepath, "w") as file:
+        file.write('{"__type__": "Inventory"}')
+    store = get_json_file_mock_interaction_recording_store()
+    telemetry = ReplayTelemetry(trace_memory=True)
+    MockRecordingSettings.set_replay_telemetry(telemetry)
+    try:
+        with pytest.raises(ValueError, match="RecordingMock"):
+            store.load_recorded_mock_interactions_from_file(filepath)
+    finally:
+        MockRecordingSettings.set_replay_telemetry(None)
+    assert not tracemalloc.is_tracing()
+    [load] = telemetry.loads
+    assert load.filepath == filepath
+
+
+def test_replay_telemetry_peak_is_relative_to_the_start_of_the_load() -> None:
+    telemetry = ReplayTelemetry(trace_memory=True)
+    tracemalloc.start()
+    try:
+        allocated_before = bytearray(10_000_000)
+        load = telemetry.start_load("recording.json")
+        allocated_during = bytearray(1_000_000)
+        telemetry.finish_load(load)
+        assert 1_000_000 <= load.tracemalloc_peak_bytes < 2_000_000
+        del allocated_before, allocated_during
+    finally:
+        tracemalloc.stop()
+
+
+def test_replay_telemetry_leaves_out_the_peak_of_overlapping_loads() -> None:
+    telemetry = ReplayTelemetry(trace_memory=True)
+    first = telemetry.start_load("first.json")
+    second = telemetry.start_load("second.json")
+    telemetry.finish_load(first)
+    third = telemetry.start_load("third.json")
+    telemetry.finish_load(second)
+    telemetry.finish_load(third)
+    assert [load.tracemalloc_peak_bytes for load in telemetry.loads] == [None] * 3
+    assert not tracemalloc.is_tracing()
+    alone = telemetry.start_load("alone.json")
+    telemetry.finish_load(alone)
+    assert alone.tracemalloc_peak_bytes is not None
@@ -1,9 +1,13 @@
 import asyncio
+import time
+from collections.abc import Iterable, Iterator, Sized
 from typing import Any, Tuple
 
 import pytest
 
+from mock_isolator.mock_recording_settings import MockRecordingSettings
 from mock_isolator.replaying_mock import ReplayingMock
+from mock_isolator.stream_segments import SegmentedStream
 
 
 @pytest.fixture
@@ -307,3 +311,104 @@ async def test_replaying_mock_aiter_with_repeat() -> None:
         messages.append(message)
     
     assert messages == ["message1", "message2"]
+
+
+@pytest.fixture
+def replay_latency():
+    yield MockRecordingSettings.set_replay_latency
+    MockRecordingSettings.set_replay_latency(scale=None)
+
+
+def test_call_replays_scaled_duration(replay_latency) -> None:
+    mock = ReplayingMock(
+        recorded_attribute_accesses={},
+        recorded_calls=[((), "slow"), ((), "fast")],
+        recorded_call_durations=[0.05, None],
+    )
+    replay_latency(scale=0.5)
+    started_at = time.perf_counter()
+    assert mock() == "slow"
+    assert time.perf_counter() - started_at >= 0.025
+    assert mock() == "fast"
+
+
+@pytest.mark.asyncio
+async def test_async_method_replays_capped_duration(replay_latency) -> None:
+    mock = ReplayingMock(
+        recorded_attribute_accesses={
+            "slow_method": [{"__type__": "async_value", "value": 1}]
+        },
+        recorded_calls=[],
+        recorded_attribute_access_durations={"slow_method": [10.0]},
+    )
+    replay_latency(scale=1.0, max_delay=0.02)
+    started_at = time.perf_counter()
+    assert await mock.slow_method() == 1
+    assert 0.02 <= time.perf_counter() - started_at < 1.0
+
+
+def test_durations_are_not_replayed_by_default() -> None:
+    mock = ReplayingMock(
+        recorded_attribute_accesses={},
+        recorded_calls=[((), "slow")],
+        recorded_call_durations=[10.0],
+    )
+    started_at = time.perf_counter()
+    assert mock() == "slow"
+    assert time.perf_counter() - started_at < 1.0
+
+
+@pytest.mark.asyncio
+async def test_segmented_stream_is_loaded_lazily_with_read_ahead() -> None:
+    loaded_segments: list[str] = []
+
+    def load_segment(segment_name: str):
+        loaded_segments.append(segment_name)
+        start = int(segment_name) * 2
+        values = [{"__type__": "async_value", "value": i} for i in (start, start + 1)]
+        return values, None
+
+    stream = SegmentedStream(
+        segment_names=["0", "1", "2", "3"],
+        length=8,
+        load_segment=load_segment,
+        read_ahead=1,
+    )
+    mock = ReplayingMock(
+        recorded_attribute_accesses={"__anext__": stream}, recorded_calls=[]
+    )
+
+    async def wait_for_read_ahead(count: int) -> None:
+        for _ in range(100):
+            if len(loaded_segments) >= count:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+    assert await mock.__anext__() == 0
+    await wait_for_read_ahead(2)
+    # The segment being replayed and the one read ahead.
+    assert sorted(loaded_segments) == ["0", "1"]
+    assert await mock.__anext__() == 1
+    assert await mock.__anext__() == 2
+    await wait_for_read_ahead(3)
+    assert sorted(loaded_segments) == ["0", "1", "2"]
+    assert [await mock.__anext__() for _ in range(5)] == [3, 4, 5, 6, 7]
+    assert len(stream) == 0
+
+
+def test_replaying_mock_only_has_the_special_methods_that_were_recorded(
+    replaying_mock: ReplayingMock,
+) -> None:
+    assert not isinstance(replaying_mock, Iterable)
+    assert not isinstance(replaying_mock, Sized)
+    assert replaying_mock
+    iterator = ReplayingMock({"__next__": [1, StopIteration()]}, [])
+    assert isinstance(iterator, Iterator)
+    assert not isinstance(iterator, Sized)
+    assert list(iterator) == [1]
+    rows = ReplayingMock({"__len__": [0]}, [])
+    assert isinstance(rows, Sized)
+    # Truthiness does not replay __len__.
+    assert rows
+    assert len(rows) == 0
@@ -0,0 +1,101 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from mock_isolator import mock_recording_encoder
+from mock_isolator.mock_recording_encoder import (
+    DictMockRecordingEncoder,
+    JsonMockRecordingInteractionSerializer,
+    MockRecordingStore,
+    get_json_file_mock_interaction_recording_store,
+)
+from mock_isolator.mock_recording_settings import MockRecordingSettings
+from mock_isolator.recording_checksum import get_checksum
+from mock_isolator.recording_files import read_recording_file
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.replay_coverage import ReplayCoverage
+from mock_isolator.shared_recordings import (
+    get_shared_recording_name,
+    read_shared_encoding,
+    start_shared_recordings,
+    stop_shared_recordings,
+)
+
+
+class Rates:
+    def get_rate(self, currency: str) -> float:
+        return {"EUR": 1.1, "GBP": 1.3}[currency]
+
+
+class CountingSerializer(JsonMockRecordingInteractionSerializer):
+    def __init__(self):
+        self.deserialized = 0
+
+    def deserialize_encoded_mock_interactions(self, serialized_interactions):
+        self.deserialized += 1
+        return super().deserialize_encoded_mock_interactions(serialized_interactions)
+
+
+def _replay_in_worker(filepath: str) -> tuple[float, int]:
+    MockRecordingSettings.set_shared_recordings(True)
+    serializer = CountingSerializer()
+    store = MockRecordingStore(DictMockRecordingEncoder(), serializer)
+    rates = store.load_recorded_mock_interactions_from_file(filepath)
+    return rates.get_rate("GBP"), serializer.deserialized
+
+
+def test_workers_decode_recordings_published_by_another_worker(tmp_path) -> None:
+    rates = RecordingMock(Rates(), BasicRecordingMocker())
+    rates.get_rate("GBP")
+    filepath = f"{tmp_path}/rates.json"
+    get_json_file_mock_interaction_recording_store().store_recorded_mock_interactions_to_file(
+        rates, filepath
+    )
+    name = get_shared_recording_name(filepath)
+    # Without a session, nothing is published.
+    assert _replay_in_worker(filepath) == (1.3, 1)
+    MockRecordingSettings.set_shared_recordings(False)
+    assert read_shared_encoding(name) is None
+
+    start_shared_recordings()
+    try:
+        context = multiprocessing.get_context("spawn")
+        # The block outlives the worker that published it.
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            assert executor.submit(_replay_in_worker, filepath).result() == (1.3, 1)
+        assert read_shared_encoding(name) is not None
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+            results = list(executor.map(_replay_in_worker, [filepath] * 2))
+        assert results == [(1.3, 0), (1.3, 0)]
+    finally:
+        stop_shared_recordings()
+    assert read_shared_encoding(name) is None
+
+
+def test_shared_recordings_carry_the_checksum_for_the_replay_coverage(
+    tmp_path, monkeypatch
+) -> None:
+    rates = RecordingMock(Rates(), BasicRecordingMocker())
+    rates.get_rate("GBP")
+    filepath = f"{tmp_path}/rates.json"
+    store = get_json_file_mock_interaction_recording_store()
+    store.store_recorded_mock_interactions_to_file(rates, filepath)
+    checksum = get_checksum(read_recording_file(filepath))
+
+    start_shared_recordings()
+    MockRecordingSettings.set_shared_recordings(True)
+    coverage = ReplayCoverage()
+    try:
+        store.load_recorded_mock_interactions_from_file(filepath)
+        assert read_shared_encoding(get_shared_recording_name(filepath))[0] == checksum
+
+        MockRecordingSettings.set_replay_coverage(coverage)
+        # A shared recording is not read from disk, even for the coverage.
+        monkeypatch.setattr(mock_recording_encoder, "read_recording_file", None)
+        store.load_recorded_mock_interactions_from_file(filepath).get_rate("GBP")
+    finally:
+        MockRecordingSettings.set_replay_coverage(None)
+        MockRecordingSettings.set_shared_recordings(False)
+        stop_shared_recordings()
+    assert [list(loads) for loads in coverage.to_dict()["recordings"].values()] == [
+        [checksum]
+    ]
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mock_isolator.mock_recording_encoder import DictMockRecordingEncoder
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.replaying_mock import ReplayingMock
+from mock_isolator.streams import (
+    StreamKeyThreadPoolExecutor,
+    get_stream_key,
+    install_task_stream_keys,
+    stream_key,
+)
+
+
+class UserClient:
+    async def fetch(self, user_id: int) -> str:
+        # The first users take the longest so that completion order is reversed.
+        await asyncio.sleep(0.01 * (5 - user_id))
+        return f"user-{user_id}"
+
+    def lookup(self, user_id: int) -> str:
+        return f"name-{user_id}"
+
+
+async def fetch_all(client: UserClient) -> list[str]:
+    return await asyncio.gather(*(client.fetch(i) for i in range(5)))
+
+
+def _record_and_reload(mock: RecordingMock) -> ReplayingMock:
+    encoder = DictMockRecordingEncoder()
+    encoded = encoder.encode_recording_mock_interactions(mock)
+    return encoder.decode_recording_mock_interactions(json.loads(json.dumps(encoded)))
+
+
+@pytest.mark.asyncio
+async def test_gather_replays_per_task_streams() -> None:
+    install_task_stream_keys()
+    recording_mock = RecordingMock(UserClient(), BasicRecordingMocker())
+    assert await fetch_all(recording_mock) == [f"user-{i}" for i in range(5)]
+    # Completion order was reversed, but each access is tagged with its task.
+    assert recording_mock.recorded_attribute_accesses["fetch"][0] == "user-4"
+    assert recording_mock.recorded_attribute_access_stream_keys["fetch"][0] == "4"
+
+    replaying_mock = _record_and_reload(recording_mock)
+    install_task_stream_keys()
+    assert await fetch_all(replaying_mock) == [f"user-{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_nested_tasks_are_keyed_by_spawn_path() -> None:
+    install_task_stream_keys()
+
+    async def child() -> str | None:
+        return get_stream_key()
+
+    async def parent() -> list[str | None]:
+        return await asyncio.gather(child(), child())
+
+    assert await asyncio.gather(parent(), parent()) == [["0.0", "0.1"], ["1.0", "1.1"]]
+
+
+@pytest.mark.asyncio
+async def test_caller_supplied_stream_keys() -> None:
+    async def lookup(client: UserClient, user_id: int) -> str:
+        with stream_key(f"user-{user_id}"):
+            await asyncio.sleep(0.01 * (3 - user_id))
+            return client.lookup(user_id)
+
+    recording_mock = RecordingMock(UserClient(), BasicRecordingMocker())
+    await asyncio.gather(*(lookup(recording_mock, i) for i in range(3)))
+    assert recording_mock.recorded_attribute_access_stream_keys["lookup"] == {
+        0: "user-2",
+        1: "user-1",
+        2: "user-0",
+    }
+    lookup_mock = recording_mock.recorded_attribute_accesses["lookup"][0]
+    assert lookup_mock.recorded_call_stream_keys == {0: "user-2"}
+
+    replaying_mock = _record_and_reload(recording_mock)
+
+    async def replay_lookup(user_id: int) -> str:
+        with stream_key(f"user-{user_id}"):
+            return replaying_mock.lookup(user_id)
+
+    # Replay in a different order than the recording completed in.
+    assert [await replay_lookup(i) for i in range(3)] == [
+        "name-0",
+        "name-1",
+        "name-2",
+    ]
+
+
+def test_replay_without_stream_keys_falls_back_to_recorded_order() -> None:
+    mock = ReplayingMock(
+        recorded_attribute_accesses={"attr": ["a", "b"]},
+        recorded_calls=[((), "first"), ((), "second")],
+        recorded_attribute_access_stream_keys={"attr": ["1", "0"]},
+        recorded_call_stream_keys=["1", "0"],
+    )
+    assert mock.attr == "a"
+    assert mock.attr == "b"
+    assert mock() == "first"
+    assert mock() == "second"
+    with pytest.raises(ValueError, match="No more recorded calls to replay."):
+        mock()
+
+
+def test_replay_from_an_unrecorded_stream_fails() -> None:
+    mock = ReplayingMock(
+        recorded_attribute_accesses={"attr": ["a", "b"]},
+        recorded_calls=[((), "first")],
+        recorded_attribute_access_stream_keys={"attr": ["0", "1"]},
+        recorded_call_stream_keys=["0"],
+    )
+    with stream_key("1"):
+        assert mock.attr == "b"
+        with pytest.raises(AttributeError, match="attr not found"):
+            mock.attr
+        with pytest.raises(ValueError, match="No more recorded calls"):
+            mock()
+    with stream_key("0"):
+        assert mock.attr == "a"
+        assert mock() == "first"
+
+
+def test_thread_pool_replays_per_worker_streams() -> None:
+    def lookup(client: UserClient, user_id: int) -> str:
+        time.sleep(0.01 * (5 - user_id))
+        return client.lookup(user_id)
+
+    recording_mock = RecordingMock(UserClient(), BasicRecordingMocker())
+    with StreamKeyThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(lookup, [recording_mock] * 5, range(5)))
+    assert results == [f"name-{i}" for i in range(5)]
+    assert recording_mock.recorded_attribute_access_stream_keys["lookup"][0] == "4"
+
+    replaying_mock = _record_and_reload(recording_mock)
+    with StreamKeyThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lookup, [replaying_mock] * 5, range(5)))
+    assert results == [f"name-{i}" for i in range(5)]
+
+
+def test_concurrent_recording_and_replay_lose_no_interactions() -> None:
+    recording_mock = RecordingMock(UserClient(), BasicRecordingMocker())
+    lookup = recording_mock.lookup
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lookup, range(2000)))
+    assert len(lookup.recorded_calls) == 2000
+
+    replaying_mock = ReplayingMock(
+        recorded_attribute_accesses={},
+        recorded_calls=[((), i) for i in range(2000)],
+    )
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        replayed = list(executor.map(lambda _: replaying_mock(), range(2000)))
+    assert sorted(replayed) == list(range(2000))
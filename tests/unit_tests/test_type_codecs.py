@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+import pytest
+
+from mock_isolator.mock_recording_encoder import (
+    DictMockRecordingEncoder,
+    DictMockRecordingEncoderValueTypes,
+)
+from mock_isolator.recording_mock import BasicRecordingMocker, RecordingMock
+from mock_isolator.type_codecs import CodecRegistry, register_default_codecs
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class Palette:
+    def get_id(self) -> UUID:
+        return UUID("12345678-1234-5678-1234-567812345678")
+
+    def get_colors(self) -> list[Color]:
+        return [Color.RED, Color.BLUE]
+
+    def get_prices(self) -> OrderedDict:
+        return OrderedDict(red=Decimal("1.50"))
+
+
+def get_registry() -> CodecRegistry:
+    registry = CodecRegistry()
+    register_default_codecs(registry)
+    registry.register(
+        UUID,
+        "UUID",
+        encode=lambda item, context: {"value": str(item)},
+        decode=lambda encoded, context: UUID(encoded["value"]),
+    )
+    # Registered once for every Enum.
+    enums = {"Color": Color}
+    registry.register(
+        Enum,
+        "Enum",
+        encode=lambda item, context: {"enum": type(item).__name__, "name": item.name},
+        decode=lambda encoded, context: enums[encoded["enum"]][encoded["name"]],
+    )
+    return registry
+
+
+def test_registered_types_are_recorded_and_replayed() -> None:
+    registry = get_registry()
+    mock = RecordingMock(Palette(), BasicRecordingMocker(codec_registry=registry))
+    assert isinstance(mock.get_id(), UUID)
+    assert mock.get_colors() == [Color.RED, Color.BLUE]
+    assert mock.get_prices() == {"red": Decimal("1.50")}
+
+    encoder = DictMockRecordingEncoder(codec_registry=registry)
+    encoding = encoder.encode_recording_mock_interactions(mock)
+    get_id = encoding["recorded_attribute_accesses"]["get_id"]["__repeat__"]
+    # A call is encoded as a tuple of its arguments and result.
+    assert get_id["recorded_calls"][0]["value"][1] == {
+        "__type__": "UUID",
+        "value": "12345678-1234-5678-1234-567812345678",
+    }
+
+    replayed = encoder.decode_recording_mock_interactions(encoding)
+    assert replayed.get_id() == UUID("12345678-1234-5678-1234-567812345678")
+    assert replayed.get_colors() == [Color.RED, Color.BLUE]
+    assert replayed.get_prices() == {"red": Decimal("1.50")}
+
+
+def test_subclasses_use_the_codec_of_their_nearest_registered_base() -> None:
+    registry = get_registry()
+    assert registry.get_codec(Color).tag == "Enum"
+    assert registry.get_codec(OrderedDict) is registry.get_codec(dict)
+    assert registry.get_codec(Palette) is None
+
+    class Shade(Enum):
+        DARK = 1
+
+    registry.register(
+        Shade,
+        "Shade",
+        encode=lambda item, context: {"name": item.name},
+        decode=lambda encoded, context: Shade[encoded["name"]],
+    )
+    # The cached lookups are invalidated by the registration.
+    assert registry.get_codec(Shade).tag == "Shade"
+    assert registry.get_codec(Color).tag == "Enum"
+
+
+def test_unregistered_types_and_tags_are_rejected() -> None:
+    encoder = DictMockRecordingEncoder()
+    mock = RecordingMock(Palette(), BasicRecordingMocker(concrete_types=[UUID]))
+    mock.get_id()
+    with pytest.raises(TypeError, match="register_type_codec"):
+        encoder.encode_recording_mock_interactions(mock)
+    with pytest.raises(ValueError, match="Unknown __type__ UUID"):
+        encoder.decode_recording_mock_interactions(
+            {
+                "__type__": "RecordingMock",
+                "recorded_calls": [{"__type__": "UUID", "value": "1"}],
+            }
+        )
+
+
+def test_value_types_alias_lists_the_default_registry_types() -> None:
+    assert isinstance(Decimal("1.5"), DictMockRecordingEncoderValueTypes)
+    assert isinstance({"a": [1, (2,)]}, DictMockRecordingEncoderValueTypes)
+    assert not isinstance(UUID(int=1), DictMockRecordingEncoderValueTypes)